@@ -1,6 +1,7 @@
 const express = require('express');
 const cors = require('cors');
 const { createProxyMiddleware } = require('http-proxy-middleware');
+const crypto = require('crypto');
 
 const app = express();
 
@@ -27,8 +28,12 @@ const corsOptions = {
     'apikey',
     'x-client-info',
     'x-my-custom-header',
-    'x-supabase-api-version'
+    'x-supabase-api-version',
+    'x-request-id',
+    'traceparent',
+    'tracestate'
   ],
+  exposedHeaders: ['X-Request-ID'],
   credentials: true,
   maxAge: 86400 // 24 hours
 };
@@ -36,6 +41,22 @@ const corsOptions = {
 // Enable CORS with options
 app.use(cors(corsOptions));
 
+// Give every request an X-Request-ID and a W3C traceparent, which the proxies
+// forward, so the backend services' spans for one request share a trace
+const TRACEPARENT = /^00-[0-9a-f]{32}-[0-9a-f]{16}-[0-9a-f]{2}$/;
+app.use((req, res, next) => {
+  if (!req.headers['x-request-id']) {
+    req.headers['x-request-id'] = crypto.randomUUID();
+  }
+  if (!TRACEPARENT.test(req.headers['traceparent'] || '')) {
+    // Sampled root context; the gateway itself records no spans
+    req.headers['traceparent'] = `00-${crypto.randomBytes(16).toString('hex')}-${crypto.randomBytes(8).toString('hex')}-01`;
+    delete req.headers['tracestate'];
+  }
+  res.setHeader('X-Request-ID', req.headers['x-request-id']);
+  next();
+});
+
 // Only apply express.json() to non-proxied routes
 app.use(express.json());
 
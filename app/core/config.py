@@ -35,6 +35,16 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = _config.get("DATABASE_URL")
     SQLALCHEMY_DATABASE_URI: Optional[str] = DATABASE_URL
 
+    # Connection pool
+    DB_POOL_PROFILE: str = _config["DB_POOL_PROFILE"]
+    DB_POOL_SIZE: int = _config["DB_POOL_SIZE"]
+    DB_MAX_OVERFLOW: int = _config["DB_MAX_OVERFLOW"]
+    DB_POOL_TIMEOUT: int = _config["DB_POOL_TIMEOUT"]
+    DB_POOL_RECYCLE: int = _config["DB_POOL_RECYCLE"]
+    DB_POOL_SLOW_CHECKOUT_MS: int = _config["DB_POOL_SLOW_CHECKOUT_MS"]
+    DB_MAX_CONNECTIONS: int = _config["DB_MAX_CONNECTIONS"]
+    WEB_CONCURRENCY: int = _config["WEB_CONCURRENCY"]
+
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = _config["BACKEND_CORS_ORIGINS"]
     
@@ -0,0 +1,147 @@
+"""
+Connection pool sizing and instrumentation for the auth database.
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Checkout wait histogram bucket upper bounds, in milliseconds
+CHECKOUT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+class PoolMetrics:
+    """Checkout wait histogram and timeout counter for one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bucket_counts = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)  # Last bucket is +Inf
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.timeouts = 0
+
+    def observe_checkout(self, wait_ms: float) -> None:
+        with self._lock:
+            self.bucket_counts[bisect.bisect_left(CHECKOUT_BUCKETS_MS, wait_ms)] += 1
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def histogram(self) -> List[Dict[str, Any]]:
+        """Cumulative bucket counts, Prometheus style."""
+        with self._lock:
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(CHECKOUT_BUCKETS_MS + ["+Inf"], self.bucket_counts):
+                cumulative += count
+                buckets.append({"le": bound, "count": cumulative})
+            return buckets
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe_timeout()
+            logger.error(f"Connection pool checkout timed out after {self._timeout}s ({self.status()})")
+            raise
+        finally:
+            wait_ms = (time.perf_counter() - start) * 1000
+            self.metrics.observe_checkout(wait_ms)
+            if wait_ms >= settings.DB_POOL_SLOW_CHECKOUT_MS:
+                logger.warning(f"Waited {wait_ms:.1f}ms for a database connection ({self.status()})")
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+def pool_sizing() -> Dict[str, int]:
+    """
+    Work out pool_size and max_overflow for this process.
+
+    When DB_MAX_CONNECTIONS is set it is shared equally by WEB_CONCURRENCY
+    workers, half of each share kept open and half as overflow, so adding
+    workers cannot exhaust the server's max_connections. Otherwise
+    DB_POOL_SIZE and DB_MAX_OVERFLOW are used as given.
+    """
+    if settings.DB_MAX_CONNECTIONS:
+        per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+        size = max(1, per_worker // 2)
+        return {"pool_size": size, "max_overflow": per_worker - size}
+    return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Build create_engine() keyword arguments for the configured pool profile.
+
+    The "pgbouncer" profile (PgBouncer in transaction pooling mode) uses
+    NullPool and disables driver-side prepared statement caches, which break
+    when consecutive transactions run on different server connections.
+    """
+    if settings.DB_POOL_PROFILE.lower() == "pgbouncer":
+        connect_args: Dict[str, Any] = {}
+        options: Dict[str, Any] = {"poolclass": NullPool}
+        if "+asyncpg" in database_url:
+            connect_args["statement_cache_size"] = 0
+            options["prepared_statement_cache_size"] = 0
+        elif "+psycopg" in database_url and "+psycopg2" not in database_url:
+            connect_args["prepare_threshold"] = None
+        if connect_args:
+            options["connect_args"] = connect_args
+        logger.info("Using PgBouncer transaction-mode pool profile (NullPool, no prepared statement caching)")
+        return options
+
+    sizing = pool_sizing()
+    logger.info(f"Connection pool: pool_size={sizing['pool_size']} max_overflow={sizing['max_overflow']} "
+                f"timeout={settings.DB_POOL_TIMEOUT}s workers={settings.WEB_CONCURRENCY}")
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        **sizing,
+    }
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Gauges and checkout histogram for an engine's pool."""
+    pool = engine.pool
+    status: Dict[str, Any] = {"class": type(pool).__name__, "profile": settings.DB_POOL_PROFILE}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update({
+            "checkouts": metrics.checkouts,
+            "checkout_wait_ms_avg": round(metrics.wait_ms_total / metrics.checkouts, 3) if metrics.checkouts else 0.0,
+            "checkout_wait_ms_max": round(metrics.wait_ms_max, 3),
+            "checkout_timeouts": metrics.timeouts,
+            "checkout_wait_ms_histogram": metrics.histogram(),
+        })
+    return status
@@ -1,8 +1,8 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
-from typing import Generator
+from typing import Any, Dict, Generator
 from ..core.config import settings
+from .pool import engine_options, pool_status
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -14,15 +14,7 @@ RAILWAY_PUBLIC_PORT = "29421"
 DATABASE_URL = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{RAILWAY_PUBLIC_HOST}:{RAILWAY_PUBLIC_PORT}/railway"
 
 # Create engine with connection pooling
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -60,6 +52,12 @@ def verify_database_connection() -> bool:
     finally:
         db.close()
 
+def get_pool_status() -> Dict[str, Any]:
+    """
+    Connection pool gauges and checkout wait histogram, for health checks.
+    """
+    return pool_status(engine)
+
 def init_db() -> None:
     """
     Initialize database with required tables and initial data.
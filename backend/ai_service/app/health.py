@@ -1,10 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
 from datetime import datetime
 import os
 import logging
 import httpx
 import asyncio  # Added for sleep
 
+from app.openai_client import client as openai_client
+from app.readiness import warmup
+
 router = APIRouter(prefix="/api")
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,14 @@ class HealthCheck:
         self.cv_service_connection = "ok"
         self.cv_service_details = {}
 
+@router.get("/ready")
+async def readiness_check():
+    """Readiness check: 503 until the startup warm-up has finished."""
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if warmup is None or warmup.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready", "steps": {}} if warmup is None else warmup.status()
+    )
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint that verifies OpenAI API and CV Service connectivity."""
@@ -30,14 +42,10 @@ async def health_check():
     # Check OpenAI API connection
     if OPENAI_API_KEY:
         try:
-            # Import here to avoid loading the module if API key isn't set
-            from openai import OpenAI
-            
-            # Create a client and make a minimal API call to check connectivity
+            # Make a minimal API call with the shared client to check connectivity
             start_time = datetime.utcnow()
-            client = OpenAI(api_key=OPENAI_API_KEY)
             # Just call models.list() without any parameters
-            models = client.models.list()
+            models = openai_client.models.list()
             end_time = datetime.utcnow()
             
             # Calculate response time in milliseconds
@@ -7,10 +7,17 @@ import logging
 from datetime import datetime
 import json
 import httpx
-from openai import OpenAI
 from tenacity import retry, stop_after_attempt, wait_exponential
 from urllib.parse import urljoin
 
+from app.openai_client import client
+
+# Outgoing calls join the request's trace (needs backend/ on PYTHONPATH)
+try:
+    from shared.tracing import traced_transport
+except ImportError:
+    traced_transport = None
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -25,11 +32,6 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     logger.warning("OPENAI_API_KEY environment variable is not set. AI features will not work correctly.")
 
-# Initialize OpenAI client
-client = None
-if OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
 # CV Service URL
 CV_SERVICE_URL = os.getenv("CV_SERVICE_URL", "http://localhost:8002")
 CV_SERVICE_AUTH_TOKEN = os.getenv("CV_SERVICE_AUTH_TOKEN")
@@ -146,7 +148,7 @@ async def fetch_cv_data(cv_id: str, token: str) -> Dict[str, Any]:
     # Normal flow for non-test CV IDs
     response = None
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=10.0, transport=traced_transport() if traced_transport else None) as client:
             headers = {"Authorization": f"Bearer {token}"}
             logger.info(f"[{fetch_id}] Attempting GET request to CV service...")
             response = await client.get(full_url, headers=headers)
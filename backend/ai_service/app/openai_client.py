@@ -0,0 +1,71 @@
+"""
+OpenAI client shared by the AI routers, created on first use.
+
+Importing `openai` pulls in httpx, pydantic models for the whole API and
+more, which made up most of the service's import time. `client` is truthy
+when OPENAI_API_KEY is set, like the client it stands in for, so the
+routers can keep checking `if not client`. The `openai` import and the
+client construction only happen when an attribute is first used, or
+during the startup warm-up (see app/readiness.py).
+
+Chat completions run inside an `openai.chat.completions` span recording the
+model and token usage, so LLM latency shows up in the request's trace.
+"""
+import os
+import logging
+import threading
+from contextlib import nullcontext
+from functools import wraps
+from typing import Any, Callable, Optional
+
+# LLM call spans (needs backend/ on PYTHONPATH)
+try:
+    from shared.tracing import span
+except ImportError:
+    span = None
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+def _traced_completion(create: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap `chat.completions.create` in a span with the model and token counts."""
+    @wraps(create)
+    def traced(*args, **kwargs):
+        attributes = {"gen_ai.system": "openai", "gen_ai.request.model": kwargs.get("model", "")}
+        with span("openai.chat.completions", attributes) if span else nullcontext() as current:
+            response = create(*args, **kwargs)
+            usage = getattr(response, "usage", None)
+            if current is not None and usage is not None:
+                current.set_attribute("gen_ai.usage.input_tokens", usage.prompt_tokens)
+                current.set_attribute("gen_ai.usage.output_tokens", usage.completion_tokens)
+            return response
+    return traced
+
+class LazyOpenAIClient:
+    """Stand-in for `openai.OpenAI` that builds the real client on first attribute access."""
+
+    def __init__(self, api_key: Optional[str]):
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self._api_key)
+
+    def load(self) -> Any:
+        """The underlying client, importing `openai` and creating it if needed."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    created = OpenAI(api_key=self._api_key)
+                    created.chat.completions.create = _traced_completion(created.chat.completions.create)
+                    self._client = created
+                    logger.info("OpenAI client created")
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.load(), name)
+
+client = LazyOpenAIClient(OPENAI_API_KEY)
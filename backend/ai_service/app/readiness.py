@@ -0,0 +1,37 @@
+"""
+Startup warm-up and readiness for the AI service.
+
+The `openai` package is imported and the shared client created in the
+background after the port is bound (see app/openai_client.py). `/api/ready`
+returns 503 until that is done, while `/api/health` keeps checking the
+OpenAI API and the CV service. A failed step is retried every
+WARMUP_RETRY_SECONDS. The step is run by shared.readiness.WarmUp; without
+it, `warmup` is None, the client is created on first use and the service is
+ready at once.
+"""
+import logging
+from typing import Any, Dict
+
+from app.openai_client import client
+
+# Warm-up runner shared by the backend services (needs backend/ on PYTHONPATH)
+try:
+    from shared.readiness import WarmUp
+except ImportError:
+    WarmUp = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def load_openai_client() -> Dict[str, Any]:
+    """Import `openai` and create the client; without an API key the routers serve mock data."""
+    if not client:
+        return {"configured": False}
+    client.load()
+    return {"configured": True}
+
+if WarmUp is not None:
+    warmup = WarmUp([("openai_client", load_openai_client)])
+else:
+    warmup = None
+    logger.warning("shared.readiness not available - the service is ready without a warm-up")
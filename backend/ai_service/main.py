@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-import openai
 from typing import Optional, Dict, Any
 
 # Load environment variables from .env file
@@ -23,11 +22,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ai_service")
 
+# Fast JSON encoding shared by the backend services (needs backend/ on PYTHONPATH)
+try:
+    from shared.responses import FastJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+    logger.warning("shared.responses not available - using FastAPI's default JSON encoding")
+
 # Create FastAPI app
 app = FastAPI(
     title="CandidateV AI Optimization Service",
     description="AI-powered CV optimization and analysis for the CandidateV application",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
 # Import routers after creating app to avoid circular imports
@@ -36,6 +43,8 @@ from app.analysis import router as analysis_router
 from app.optimization import router as optimization_router
 from app.job_match import router as job_match_router
 from app.cover_letter import router as cover_letter_router
+from app.openai_client import client as openai_client
+from app.readiness import warmup
 
 # Configure CORS
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost,http://localhost:3000,https://candidate-v-frontend.vercel.app").split(",")
@@ -50,7 +59,7 @@ app.add_middleware(
 # Add request ID and logging middleware
 @app.middleware("http")
 async def add_request_id_and_log(request: Request, call_next):
-    request_id = str(uuid.uuid4())
+    request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
     request.state.request_id = request_id
     
     start_time = time.time()
@@ -65,12 +74,6 @@ async def add_request_id_and_log(request: Request, call_next):
     response.headers["X-Request-ID"] = request_id
     return response
 
-# Initialize OpenAI client
-openai_api_key = os.getenv("OPENAI_API_KEY")
-openai_client = None
-if openai_api_key:
-    openai_client = openai.OpenAI(api_key=openai_api_key)
-
 def get_mock_analysis() -> Dict[str, Any]:
     """Return mock analysis data when OpenAI is not available"""
     return {
@@ -142,15 +145,34 @@ app.include_router(cover_letter_router)
 @app.on_event("startup")
 async def startup():
     logger.info("Starting up AI Optimization Service")
+    # Load the OpenAI client in the background (gates /api/ready)
+    if warmup is not None:
+        warmup.start()
 
 @app.on_event("shutdown")
 async def shutdown():
+    if warmup is not None:
+        await warmup.stop()
     logger.info("Shutting down AI Optimization Service")
 
 @app.get("/")
 async def root():
     return {"message": "CandidateV AI Optimization Service"}
 
+# Prometheus metrics at /metrics, outside the other middleware
+try:
+    from shared.metrics import instrument
+    instrument(app, "ai_service")
+except ImportError:
+    logger.warning("shared.metrics not available - /metrics is disabled")
+
+# Tracing goes outermost, so its span covers the metrics middleware as well
+try:
+    from shared.tracing import setup_tracing
+    setup_tracing(app, "ai_service")
+except ImportError:
+    logger.warning("shared.tracing not available - requests are not traced")
+
 # Run debug server if executed directly
 if __name__ == "__main__":
     import uvicorn
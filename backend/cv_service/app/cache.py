@@ -0,0 +1,174 @@
+"""
+Read-through cache of serialized CVs.
+
+Entries are keyed by (cv_id, version) and hold the JSON-encoded response body,
+so a hit skips loading the section relationships, serialization and JSON
+encoding. Readers still run a single indexed query for the CV's current
+version and owner. A stale version can never be served, even across
+processes, and the owner check always comes from the database.
+
+The local tier is an in-process LRU bounded by entry count and bytes. An
+optional shared tier (Redis, enabled with CV_CACHE_REDIS_URL) lets workers
+share warm entries. Write paths call invalidate() synchronously after
+committing, so memory held by superseded versions is released immediately.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger("cv_service.cache")
+
+# Environment variables
+CACHE_ENABLED = os.getenv("CV_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("CV_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("CV_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_REDIS_URL = os.getenv("CV_CACHE_REDIS_URL")
+CACHE_SHARED_TTL_SECONDS = int(os.getenv("CV_CACHE_SHARED_TTL_SECONDS", "3600"))
+
+# Approximate per-entry bookkeeping overhead (key tuple, OrderedDict node, strings)
+ENTRY_OVERHEAD_BYTES = 200
+
+class CVCache:
+    """LRU cache of CV response bodies with an optional shared Redis tier."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES, redis_url: Optional[str] = CACHE_REDIS_URL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # cv_id -> (version, user_id, body); one version per CV is kept
+        self._entries: "OrderedDict[str, Tuple[int, str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._shared = self._connect_shared(redis_url)
+
+    @staticmethod
+    def _connect_shared(redis_url: Optional[str]):
+        if not redis_url:
+            return None
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_timeout=0.25, socket_connect_timeout=0.25)
+            logger.info("Shared CV cache tier enabled")
+            return client
+        except ImportError:
+            logger.warning("CV_CACHE_REDIS_URL is set but redis is not installed - using local cache only")
+            return None
+
+    @staticmethod
+    def _shared_key(cv_id: str, version: int) -> str:
+        return f"cv:{cv_id}:{version}"
+
+    @staticmethod
+    def _size(body: bytes) -> int:
+        return len(body) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, cv_id: str, version: int, user_id: str) -> Optional[bytes]:
+        """Return the cached body for this exact version and owner, if present."""
+        cv_id = str(cv_id)
+        with self._lock:
+            entry = self._entries.get(cv_id)
+            if entry is not None and entry[0] == version and entry[1] == str(user_id):
+                self._entries.move_to_end(cv_id)
+                self.hits += 1
+                return entry[2]
+
+        if self._shared is not None:
+            try:
+                body = self._shared.get(self._shared_key(cv_id, version))
+            except Exception as e:
+                logger.warning(f"Shared CV cache read failed: {str(e)}")
+                body = None
+            if body is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._put_local(cv_id, version, str(user_id), body)
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, cv_id: str, version: int, user_id: str, body: bytes) -> None:
+        """Store the body for a CV version in both tiers."""
+        cv_id = str(cv_id)
+        self._put_local(cv_id, version, str(user_id), body)
+        if self._shared is not None:
+            try:
+                self._shared.set(self._shared_key(cv_id, version), body, ex=CACHE_SHARED_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Shared CV cache write failed: {str(e)}")
+
+    def _put_local(self, cv_id: str, version: int, user_id: str, body: bytes) -> None:
+        size = self._size(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(cv_id, None)
+            if old is not None:
+                if old[0] > version:
+                    # A newer version is already cached; keep it
+                    self._entries[cv_id] = old
+                    return
+                self._bytes -= self._size(old[2])
+            self._entries[cv_id] = (version, user_id, body)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted[2])
+                self.evictions += 1
+
+    def invalidate(self, cv_id: str, version: Optional[int] = None) -> None:
+        """
+        Drop a CV from the cache.
+
+        Args:
+            cv_id: The CV to drop
+            version: The version that was current before the write, so its
+                shared-tier copy can be deleted too
+        """
+        cv_id = str(cv_id)
+        with self._lock:
+            old = self._entries.pop(cv_id, None)
+            if old is not None:
+                self._bytes -= self._size(old[2])
+            self.invalidations += 1
+        if self._shared is not None:
+            versions = {v for v in (version, old[0] if old else None) if v is not None}
+            if versions:
+                try:
+                    self._shared.delete(*[self._shared_key(cv_id, v) for v in versions])
+                except Exception as e:
+                    logger.warning(f"Shared CV cache invalidation failed: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio and memory usage of the local tier."""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "shared_tier": self._shared is not None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+cv_cache = CVCache()
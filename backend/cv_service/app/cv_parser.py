@@ -0,0 +1,409 @@
+"""
+CV upload parsing pipeline.
+
+Starlette has already spooled the upload (in memory for small files, on
+disk for larger ones) by the time the route runs. Request bodies larger than
+the upload cap are refused by UploadSizeLimit as they arrive, before the
+multipart form is read. The document type is sniffed from the first bytes
+rather than trusted from the client. The CPU-heavy text extraction and
+section segmentation run in a process of their own for each upload, at most
+CV_PARSER_WORKERS at a time, so they never block the event loop. The
+document is streamed to the process through a pipe in chunks. A parse that
+runs over its time limit has its process killed, without affecting other
+uploads being parsed.
+"""
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import re
+import logging
+import zipfile
+from typing import Dict, Any, List, Optional, Set
+
+from fastapi import HTTPException, UploadFile, status
+
+# Set up logging
+logger = logging.getLogger("cv_service.cv_parser")
+
+# Environment variables
+MAX_UPLOAD_BYTES = int(os.getenv("CV_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("CV_UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+PARSER_WORKERS = int(os.getenv("CV_PARSER_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSER_MAX_PENDING = int(os.getenv("CV_PARSER_MAX_PENDING", str(PARSER_WORKERS * 4)))
+PARSER_TIMEOUT_SECONDS = float(os.getenv("CV_PARSER_TIMEOUT_SECONDS", "30"))
+PARSER_MAX_PAGES = int(os.getenv("CV_PARSER_MAX_PAGES", "20"))
+
+# Bytes needed to sniff the document type
+SNIFF_BYTES = 2048
+
+# Room for the multipart boundaries, part headers and other form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+SUPPORTED_TYPES = {PDF_MIME: "pdf", DOCX_MIME: "docx"}
+
+# Heading keywords used for section segmentation, in match order
+SECTION_HEADINGS = {
+    "summary": ["summary", "profile", "professional summary", "personal statement", "about me", "objective"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "career history"],
+    "education": ["education", "academic background", "qualifications", "education and training"],
+    "skills": ["skills", "technical skills", "key skills", "core competencies", "competencies"],
+    "languages": ["languages"],
+    "projects": ["projects", "personal projects", "key projects"],
+    "certifications": ["certifications", "certificates", "licenses and certifications", "courses"],
+    "references": ["references", "referees"],
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+LINKEDIN_RE = re.compile(r"(?:https?://)?(?:www\.)?linkedin\.com/in/[\w-]+/?", re.IGNORECASE)
+SKILL_SPLIT_RE = re.compile(r"[,;\n•·|]+")
+
+class CVParseError(Exception):
+    """Base error for upload parsing failures."""
+    pass
+
+class UploadTooLargeError(CVParseError):
+    """The upload exceeds CV_UPLOAD_MAX_BYTES."""
+    pass
+
+class UnsupportedDocumentError(CVParseError):
+    """The upload is not a PDF or DOCX document."""
+    pass
+
+class ParserBusyError(CVParseError):
+    """Too many parse jobs are already pending."""
+    pass
+
+class ParserTimeoutError(CVParseError):
+    """The parse job did not finish within CV_PARSER_TIMEOUT_SECONDS."""
+    pass
+
+class UploadSizeLimit:
+    """
+    ASGI middleware refusing multipart request bodies over the upload cap with 413.
+
+    Checks Content-Length up front, and counts the bytes of bodies sent
+    without one as they are received, so an oversized upload is cut off
+    instead of being read into Starlette's form parser in full.
+    parse_upload() still enforces the exact cap on the file itself.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit"
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            logger.info(f"Refused a {int(content_length)} byte upload to {scope['path']}")
+            await _send_too_large(send, detail)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI passes HTTPExceptions raised while reading the body through as they are
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def _send_too_large(send, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def sniff_document_type(head: bytes) -> Optional[str]:
+    """
+    Identify the document MIME type from its leading bytes.
+
+    Uses libmagic when available and falls back to checking magic numbers.
+    """
+    try:
+        import magic
+        mime = magic.from_buffer(head, mime=True)
+        if mime in SUPPORTED_TYPES:
+            return mime
+        # libmagic may report DOCX as a plain zip from a short header
+        if mime not in ("application/zip", "application/octet-stream"):
+            return None
+    except Exception:
+        # python-magic missing or libmagic not installed
+        pass
+
+    if head.startswith(b"%PDF-"):
+        return PDF_MIME
+    if head.startswith(b"PK\x03\x04"):
+        # DOCX is a zip container; its first entries name the OOXML parts
+        if b"[Content_Types].xml" in head or b"word/" in head or b"_rels/" in head:
+            return DOCX_MIME
+    return None
+
+async def sniff_upload(file: UploadFile, max_bytes: int) -> str:
+    """
+    Check an upload's size and sniff its type from its first bytes.
+
+    Returns:
+        The sniffed MIME type
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds max_bytes
+        UnsupportedDocumentError: If the upload is not a PDF or DOCX
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+    await file.seek(0)
+    mime = sniff_document_type(await file.read(SNIFF_BYTES))
+    if mime is None:
+        raise UnsupportedDocumentError("Only PDF and DOCX files are supported")
+    return mime
+
+# --- Worker-side functions (run inside a parser process) ---
+
+def _extract_pdf_text(source) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(source)
+    pages = []
+    for page in reader.pages[:PARSER_MAX_PAGES]:
+        pages.append(page.extract_text() or "")
+    return "\n".join(pages)
+
+def _extract_docx_text(source) -> str:
+    from docx import Document
+
+    document = Document(source)
+    lines = [paragraph.text for paragraph in document.paragraphs]
+    # Many CV templates lay out sections in tables
+    for table in document.tables:
+        for row in table.rows:
+            seen = set()
+            for cell in row.cells:
+                # Merged cells are repeated once per grid column
+                if id(cell._tc) in seen:
+                    continue
+                seen.add(id(cell._tc))
+                lines.extend(paragraph.text for paragraph in cell.paragraphs)
+    return "\n".join(lines)
+
+def _match_heading(line: str) -> Optional[str]:
+    """Return the section key if the line looks like a section heading."""
+    normalized = re.sub(r"[^a-z ]", "", line.lower()).strip()
+    if not normalized or len(normalized) > 40:
+        return None
+    for section, headings in SECTION_HEADINGS.items():
+        if normalized in headings:
+            return section
+    return None
+
+def segment_sections(text: str) -> Dict[str, str]:
+    """
+    Split extracted text into sections keyed by SECTION_HEADINGS.
+
+    Text before the first heading is returned under "header".
+    """
+    sections: Dict[str, List[str]] = {"header": []}
+    current = "header"
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        section = _match_heading(line)
+        if section:
+            current = section
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(line)
+    return {key: "\n".join(lines) for key, lines in sections.items() if lines}
+
+def _extract_personal_info(header: str, text: str) -> Dict[str, Any]:
+    personal_info: Dict[str, Any] = {}
+    lines = [line for line in header.splitlines() if line.strip()]
+    if lines and not EMAIL_RE.search(lines[0]) and len(lines[0].split()) <= 5:
+        personal_info["full_name"] = lines[0].strip()
+
+    email = EMAIL_RE.search(text)
+    if email:
+        personal_info["email"] = email.group(0)
+    phone = PHONE_RE.search(header or text)
+    if phone:
+        personal_info["phone"] = phone.group(0).strip()
+    linkedin = LINKEDIN_RE.search(text)
+    if linkedin:
+        personal_info["linkedin"] = linkedin.group(0)
+    return personal_info
+
+def _split_skills(section: str) -> List[str]:
+    skills = []
+    seen = set()
+    for item in SKILL_SPLIT_RE.split(section):
+        skill = item.strip(" -*\t")
+        if skill and len(skill) <= 100 and skill.lower() not in seen:
+            seen.add(skill.lower())
+            skills.append(skill)
+    return skills
+
+def parse_cv_document(kind: str, document: bytes) -> Dict[str, Any]:
+    """
+    Extract text from a PDF/DOCX document and segment it into CV sections.
+
+    Args:
+        kind: The document kind, "pdf" or "docx"
+        document: The document's bytes
+    """
+    stream = io.BytesIO(document)
+    try:
+        if kind == "pdf":
+            text = _extract_pdf_text(stream)
+        elif kind == "docx":
+            text = _extract_docx_text(stream)
+        else:
+            raise ValueError(f"Unsupported document kind: {kind}")
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Corrupt DOCX document: {str(e)}")
+
+    sections = segment_sections(text)
+    return {
+        "personal_info": _extract_personal_info(sections.get("header", ""), text),
+        "summary": sections.get("summary"),
+        "skills": _split_skills(sections.get("skills", "")),
+        "sections": {key: value for key, value in sections.items() if key not in ("header", "summary", "skills")},
+        "character_count": len(text),
+    }
+
+def _parser_process(kind: str, conn) -> None:
+    """Entry point of a parser process: read the document from the pipe in chunks, send back the result."""
+    document = io.BytesIO()
+    while True:
+        chunk = conn.recv_bytes()
+        if not chunk:
+            break
+        document.write(chunk)
+    try:
+        conn.send(("ok", parse_cv_document(kind, document.getvalue())))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+# --- Event-loop side ---
+
+_context = None
+_slots: Optional[asyncio.Semaphore] = None
+_pending: Optional[asyncio.Semaphore] = None
+_running: Set[multiprocessing.process.BaseProcess] = set()
+
+def get_context():
+    """
+    Multiprocessing context for parser processes, chosen on first use.
+
+    A fork server with this module preloaded where the platform has one, so
+    each parse starts from a fork with the service's imports already done;
+    spawn elsewhere.
+    """
+    global _context
+    if _context is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            _context = multiprocessing.get_context("forkserver")
+            _context.set_forkserver_preload([__name__])
+        else:
+            _context = multiprocessing.get_context("spawn")
+    return _context
+
+def _exchange(conn, upload, max_bytes: int):
+    """Stream the upload to a parser process and wait for its answer (blocking; run in a thread)."""
+    upload.seek(0)
+    sent = 0
+    while True:
+        chunk = upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        sent += len(chunk)
+        if sent > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+        conn.send_bytes(chunk)
+    conn.send_bytes(b"")
+    return conn.recv()
+
+async def _run_parser(kind: str, file: UploadFile) -> Dict[str, Any]:
+    """Parse an upload in a process of its own, killed if it runs over PARSER_TIMEOUT_SECONDS."""
+    parent_conn, child_conn = get_context().Pipe()
+    process = get_context().Process(target=_parser_process, args=(kind, child_conn), daemon=True)
+    exchange = None
+    try:
+        await asyncio.to_thread(process.start)
+        _running.add(process)
+        # Only the process holds the other end now, so its exit ends the exchange
+        child_conn.close()
+        exchange = asyncio.ensure_future(asyncio.to_thread(_exchange, parent_conn, file.file, MAX_UPLOAD_BYTES))
+        try:
+            outcome, value = await asyncio.wait_for(asyncio.shield(exchange), timeout=PARSER_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise ParserTimeoutError(f"Parsing took longer than {PARSER_TIMEOUT_SECONDS:.0f}s")
+        except (EOFError, OSError):
+            raise CVParseError(f"Could not read {kind.upper()} document: the parser exited unexpectedly")
+    finally:
+        if process.pid is not None:
+            # Stops a parse that timed out or was abandoned; the exchange thread then sees the pipe close
+            process.kill()
+            if exchange is not None:
+                await asyncio.gather(exchange, return_exceptions=True)
+            await asyncio.to_thread(process.join)
+            _running.discard(process)
+        parent_conn.close()
+        child_conn.close()
+
+    if outcome != "ok":
+        raise CVParseError(f"Could not read {kind.upper()} document: {value}")
+    return value
+
+def shutdown_parsers() -> None:
+    """Kill any parser processes still running."""
+    for process in list(_running):
+        process.kill()
+    if _running:
+        logger.info(f"Killed {len(_running)} running CV parser processes")
+
+async def parse_upload(file: UploadFile) -> Dict[str, Any]:
+    """
+    Sniff and parse an uploaded CV document.
+
+    Raises:
+        CVParseError: If the upload is rejected or cannot be parsed
+    """
+    global _pending, _slots
+    if _pending is None:
+        _pending = asyncio.Semaphore(PARSER_MAX_PENDING)
+        _slots = asyncio.Semaphore(PARSER_WORKERS)
+
+    # Shed load instead of queueing without bound behind the parsers
+    if _pending.locked():
+        raise ParserBusyError("Too many CV uploads are being processed, please retry shortly")
+
+    async with _pending:
+        kind = SUPPORTED_TYPES[await sniff_upload(file, MAX_UPLOAD_BYTES)]
+        async with _slots:
+            logger.info(f"Parsing {kind} upload '{file.filename}' ({file.size} bytes)")
+            return await _run_parser(kind, file)
@@ -1,11 +1,22 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
 import os
+import time
+import heapq
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Tuple
 import logging
 
+from .db_pool import engine_options
+
+# SQL statement spans (needs backend/ on PYTHONPATH)
+try:
+    from shared.tracing import instrument_engine
+except ImportError:
+    instrument_engine = None
+
 # Configure logging
 logger = logging.getLogger("cv_database")
 
@@ -18,26 +29,142 @@ if not DATABASE_URL:
 # Determine if using SQLite
 is_sqlite = DATABASE_URL.startswith('sqlite:')
 
+# SQLite tuning for single-node deployments
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+SQLITE_STATEMENT_CACHE_SIZE = int(os.getenv("SQLITE_STATEMENT_CACHE_SIZE", "256"))
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tune each new SQLite connection.
+
+    WAL lets readers run alongside the single writer, and with
+    synchronous=NORMAL a commit only waits for the WAL write, not an fsync;
+    a power loss can lose the last commits but never corrupts the database.
+    mmap serves reads straight from the page cache, and foreign keys are
+    enforced so sections are deleted with their CV as on PostgreSQL.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_MB * 1024}")  # Negative means KiB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
 # Configure engine based on database type
 if is_sqlite:
     # SQLite settings
     engine = create_engine(
         DATABASE_URL,
-        connect_args={"check_same_thread": False},  # Needed for SQLite
+        connect_args={
+            "check_same_thread": False,  # Needed for SQLite
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            "cached_statements": SQLITE_STATEMENT_CACHE_SIZE,  # Prepared statements kept per connection
+        },
     )
+    event.listen(engine, "connect", _sqlite_pragmas)
     logger.info(f"Using SQLite database: {DATABASE_URL}")
 else:
     # PostgreSQL settings
     engine = create_engine(
         DATABASE_URL,
-        poolclass=QueuePool,
-        pool_size=10,
-        max_overflow=20,
-        pool_timeout=30,
-        pool_recycle=1800,
+        **engine_options(DATABASE_URL, default_pool_size=10, default_max_overflow=20, default_pool_recycle=1800),
     )
     logger.info(f"Using PostgreSQL database: {DATABASE_URL.split('@')[1] if '@' in DATABASE_URL else DATABASE_URL}")
 
+# --- Query instrumentation ---
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+EXPLAIN_SLOW_QUERIES = os.getenv("DB_EXPLAIN_SLOW_QUERIES", "false").lower() == "true"
+EXPLAIN_THRESHOLD_MS = float(os.getenv("DB_EXPLAIN_THRESHOLD_MS", "1000"))
+QUERY_STATS_TOP_N = int(os.getenv("DB_QUERY_STATS_TOP_N", "3"))
+
+slow_query_logger = logging.getLogger("cv_database.slow_query")
+
+class QueryStats:
+    """Per-request database statistics: query count, total time and the slowest statements."""
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id
+        self.count = 0
+        self.total_ms = 0.0
+        self._slowest: List[Tuple[float, int, str]] = []  # min-heap of (ms, seq, statement)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        item = (elapsed_ms, self.count, statement)
+        if len(self._slowest) < QUERY_STATS_TOP_N:
+            heapq.heappush(self._slowest, item)
+        elif elapsed_ms > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str]]:
+        return [(ms, statement) for ms, _, statement in sorted(self._slowest, reverse=True)]
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header entry."""
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries"'
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def start_query_stats(request_id: Optional[str] = None) -> QueryStats:
+    """Start collecting query statistics for the current request context."""
+    stats = QueryStats(request_id)
+    _query_stats.set(stats)
+    return stats
+
+def current_request_id() -> Optional[str]:
+    stats = _query_stats.get()
+    return stats.request_id if stats else None
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    if conn.info.get("explaining"):
+        return
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        request_id = stats.request_id if stats else None
+        slow_query_logger.warning(
+            f"Slow query ({elapsed_ms:.1f}ms, request {request_id}): {' '.join(statement.split())[:1000]}"
+        )
+        if EXPLAIN_SLOW_QUERIES and elapsed_ms >= EXPLAIN_THRESHOLD_MS and not executemany:
+            _log_query_plan(conn, statement, parameters, request_id)
+
+def _log_query_plan(conn, statement: str, parameters, request_id: Optional[str]) -> None:
+    """Log the plan of a slow SELECT; EXPLAIN ANALYZE re-runs it, so writes are never explained."""
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return
+    prefix = "EXPLAIN QUERY PLAN " if is_sqlite else "EXPLAIN (ANALYZE, BUFFERS) "
+    conn.info["explaining"] = True
+    try:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        plan = "\n".join(" ".join(str(col) for col in row) for row in rows)
+        slow_query_logger.warning(f"Query plan (request {request_id}):\n{plan}")
+    except Exception as e:
+        slow_query_logger.warning(f"Could not explain slow query: {str(e)}")
+    finally:
+        conn.info["explaining"] = False
+
+# One span per statement, under the request's span when tracing is set up
+if instrument_engine is not None:
+    instrument_engine(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
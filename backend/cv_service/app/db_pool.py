@@ -0,0 +1,86 @@
+"""
+Connection pool sizing for the CV database.
+
+Sizing is either explicit (DB_POOL_SIZE / DB_MAX_OVERFLOW) or derived from a
+connection budget shared by all worker processes (DB_MAX_CONNECTIONS divided
+by WEB_CONCURRENCY), so adding uvicorn workers cannot exhaust the server's
+max_connections.
+
+The pool itself, InstrumentedQueuePool with its checkout wait histogram,
+the "pgbouncer" profile and pool_status() come from shared.db_pool.
+Without the shared package the service falls back to a plain QueuePool (or NullPool for PgBouncer) and reports no
+checkout metrics.
+"""
+import logging
+import os
+from typing import Dict, Any
+
+from sqlalchemy.pool import QueuePool, NullPool
+
+# Set up logging
+logger = logging.getLogger("cv_database.pool")
+
+# Environment variables
+POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "default").lower()
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = os.getenv("DB_POOL_RECYCLE")
+
+try:
+    from shared.db_pool import InstrumentedQueuePool, pgbouncer_options, pool_status as shared_pool_status
+except ImportError:
+    logger.warning("shared.db_pool not available - connection pool metrics are disabled")
+    InstrumentedQueuePool = QueuePool
+    pgbouncer_options = None
+    shared_pool_status = None
+
+def worker_count() -> int:
+    """Number of worker processes sharing the connection budget."""
+    for var in ("WEB_CONCURRENCY", "UVICORN_WORKERS"):
+        value = os.getenv(var)
+        if value and value.isdigit() and int(value) > 0:
+            return int(value)
+    return 1
+
+def pool_sizing(default_pool_size: int, default_max_overflow: int) -> Dict[str, int]:
+    """
+    Work out pool_size and max_overflow for this process.
+
+    Explicit DB_POOL_SIZE / DB_MAX_OVERFLOW win. Otherwise, if
+    DB_MAX_CONNECTIONS is set, each worker gets an equal share of it, half
+    kept open and half as overflow. Otherwise the service defaults apply.
+    """
+    pool_size = os.getenv("DB_POOL_SIZE")
+    max_overflow = os.getenv("DB_MAX_OVERFLOW")
+    budget = os.getenv("DB_MAX_CONNECTIONS")
+
+    if pool_size is None and max_overflow is None and budget:
+        per_worker = max(1, int(budget) // worker_count())
+        size = max(1, per_worker // 2)
+        return {"pool_size": size, "max_overflow": per_worker - size}
+
+    return {
+        "pool_size": int(pool_size) if pool_size is not None else default_pool_size,
+        "max_overflow": int(max_overflow) if max_overflow is not None else default_max_overflow,
+    }
+
+def engine_options(database_url: str, default_pool_size: int, default_max_overflow: int, default_pool_recycle: int = 1800) -> Dict[str, Any]:
+    """Build create_engine() keyword arguments for the configured pool profile."""
+    if POOL_PROFILE == "pgbouncer":
+        return pgbouncer_options(database_url) if pgbouncer_options else {"poolclass": NullPool}
+
+    sizing = pool_sizing(default_pool_size, default_max_overflow)
+    logger.info(f"Connection pool: pool_size={sizing['pool_size']} max_overflow={sizing['max_overflow']} "
+                f"timeout={POOL_TIMEOUT}s workers={worker_count()}")
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": int(POOL_RECYCLE) if POOL_RECYCLE else default_pool_recycle,
+        "pool_pre_ping": True,
+        **sizing,
+    }
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Gauges and checkout histogram for an engine's pool."""
+    if shared_pool_status is None:
+        return {"class": type(engine.pool).__name__, "profile": POOL_PROFILE}
+    return shared_pool_status(engine, POOL_PROFILE)
@@ -0,0 +1,107 @@
+"""
+Default-CV switching.
+
+The partial unique index `uq_cvs_user_default` on `cvs (user_id) WHERE
+is_default` lets the database guarantee at most one default CV per user.
+Switching clears the old default in one set-based UPDATE, with no SELECT
+round trip, and then sets the new one, all inside a savepoint.
+
+A concurrent switch that commits first makes our flush violate the index
+instead of silently leaving two defaults. The savepoint is rolled back and
+the switch retried, which then sees and clears the other default.
+
+Every CV whose flag is cleared gets a new version, with its revision and
+change event, like any other write.
+"""
+import logging
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from . import outbox
+from . import revisions
+
+# Set up logging
+logger = logging.getLogger("cv_service.default_cv")
+
+DEFAULT_INDEX_NAME = "uq_cvs_user_default"
+MAX_ATTEMPTS = 3
+
+# The revision patch of a CV whose default flag was cleared
+CLEAR_DEFAULT_PATCH = [{"op": "replace", "path": "/metadata/is_default", "value": False}]
+
+class DefaultCVConflictError(Exception):
+    """The default could not be switched because of repeated concurrent switches."""
+    pass
+
+def ensure_default_cv_index(engine: Engine) -> None:
+    """
+    Create the partial unique index on existing databases.
+
+    Users that already have several defaults keep only their most recently
+    modified one, so the index can be built. The others are cleared as a
+    normal write would clear them, with a revision and a change event each.
+    """
+    cvs = models.CV.__table__
+    ranked = select(
+        cvs.c.id,
+        func.row_number().over(partition_by=cvs.c.user_id, order_by=cvs.c.last_modified.desc()).label("rn")
+    ).where(cvs.c.is_default == True).subquery()
+    with engine.begin() as conn:
+        repaired = conn.execute(
+            update(cvs)
+            .where(cvs.c.is_default == True, cvs.c.id.not_in(select(ranked.c.id).where(ranked.c.rn == 1)))
+            .values(is_default=False, version=cvs.c.version + 1)
+            .returning(cvs.c.id, cvs.c.user_id, cvs.c.version)
+        ).all()
+        if repaired:
+            logger.warning(f"Cleared {len(repaired)} duplicate default CVs before creating {DEFAULT_INDEX_NAME}")
+            # Joins the migration's transaction, so the repair and its history commit together
+            with Session(bind=conn) as db:
+                for cv_id, user_id, version in repaired:
+                    _record_cleared(db, cv_id, user_id, version)
+                db.flush()
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {DEFAULT_INDEX_NAME} ON cvs (user_id) WHERE is_default"))
+
+def _record_cleared(db: Session, cv_id, user_id, version: int) -> None:
+    """Add the revision and change event of a CV whose default flag was cleared"""
+    revisions.record_patch(db, cv_id, user_id, version, CLEAR_DEFAULT_PATCH)
+    outbox.record_change(db, cv_id, user_id, version, outbox.UPDATED, ["metadata"])
+
+def set_default_cv(db: Session, cv) -> None:
+    """
+    Make `cv` its owner's only default CV.
+
+    Other defaults get their version bumped, so version-keyed caches drop
+    them, and a revision and change event each.
+
+    Raises:
+        DefaultCVConflictError: If concurrent switches kept winning the race
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            # begin_nested() flushes pending changes before the savepoint
+            with db.begin_nested():
+                cleared = db.execute(
+                    update(models.CV)
+                    .where(
+                        models.CV.user_id == cv.user_id,
+                        models.CV.is_default == True,
+                        models.CV.id != cv.id
+                    )
+                    .values(is_default=False, version=models.CV.version + 1)
+                    .returning(models.CV.id, models.CV.version)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                for cleared_id, cleared_version in cleared:
+                    _record_cleared(db, cleared_id, cv.user_id, cleared_version)
+                cv.is_default = True
+                db.flush()
+            return
+        except IntegrityError:
+            logger.warning(f"Concurrent default CV switch for user {cv.user_id} (attempt {attempt}/{MAX_ATTEMPTS})")
+
+    raise DefaultCVConflictError("Another request changed the default CV at the same time, please retry")
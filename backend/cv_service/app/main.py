@@ -1,22 +1,56 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Query, Body, Request, File, UploadFile
+from fastapi import FastAPI, HTTPException, Depends, status, Query, Body, Request, File, UploadFile, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, asc
 import os
+import hmac
+import time
 import uuid
 import json
 import jwt
 from datetime import datetime
 from typing import Optional, List, Dict, Any, Union
 from fastapi.security import OAuth2PasswordBearer
+from http.cookies import SimpleCookie
+from starlette.datastructures import MutableHeaders
 import logging
 import sys
 
 # Import database and models
-from .database import get_db_session, is_sqlite, engine, Base
+from .database import get_db_session, is_sqlite, engine, start_query_stats
 from . import models
+from . import cv_parser
+from . import search
+from . import revisions
+from . import default_cv
+from . import outbox
+from .cache import cv_cache, CACHE_ENABLED
+from .db_pool import pool_status
+from .replicas import get_read_db_session, start_routing, router as replica_router, LSN_COOKIE, READ_YOUR_WRITES_SECONDS
+from .readiness import warmup
+
+# Fast JSON encoding shared by the backend services (needs backend/ on PYTHONPATH)
+try:
+    from shared.responses import FastJSONResponse, dumps as encode_json
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+    def encode_json(content) -> bytes:
+        return json.dumps(content).encode("utf-8")
+
+# Prometheus metrics shared by the backend services
+try:
+    from shared.metrics import instrument
+except ImportError:
+    instrument = None
+
+# Distributed tracing shared by the backend services
+try:
+    from shared.tracing import setup_tracing
+except ImportError:
+    setup_tracing = None
 
 # Configure logging
 logging.basicConfig(
@@ -29,13 +63,18 @@ logging.basicConfig(
 logger = logging.getLogger("cv_service")
 
 # Create FastAPI app
-app = FastAPI(title="CandidateV CV Service")
+app = FastAPI(title="CandidateV CV Service", default_response_class=FastJSONResponse)
+if FastJSONResponse is JSONResponse:
+    logger.warning("shared.responses not available - using FastAPI's default JSON encoding")
 
 # Environment variables
 JWT_SECRET = os.getenv("JWT_SECRET", "development_secret_key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost,http://localhost:3000").split(",")
 
+# Refuse oversized uploads before their body is read (inside CORS, so refusals carry its headers)
+app.add_middleware(cv_parser.UploadSizeLimit)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +84,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Query statistics and replica routing middleware
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that collects each request's query statistics and sets up replica routing.
+
+    Adds Server-Timing, X-Request-ID and, after a write, the LSN cookie to
+    the response, and logs the request's database usage once it is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        stats = start_query_stats(request_id)
+        routing = start_routing(request.cookies.get(LSN_COOKIE))
+        start_time = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                process_ms = (time.perf_counter() - start_time) * 1000
+                headers = MutableHeaders(scope=message)
+                headers["Server-Timing"] = f'{stats.server_timing()}, app;dur={process_ms:.1f}'
+                headers["X-Request-ID"] = request_id
+                if routing.write_lsn:
+                    # Read-your-writes: later reads wait for a replica that has replayed this write
+                    cookie = SimpleCookie()
+                    cookie[LSN_COOKIE] = routing.write_lsn
+                    cookie[LSN_COOKIE].update({"max-age": READ_YOUR_WRITES_SECONDS, "path": "/", "httponly": True, "samesite": "lax"})
+                    headers.append("set-cookie", cookie.output(header="").strip())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if stats.count:
+                slowest = ", ".join(f"{ms:.1f}ms: {' '.join(statement.split())[:120]}" for ms, statement in stats.slowest)
+                logger.info(f"DB usage: {scope['method']} {scope['path']} (ID: {request_id}) - "
+                            f"{stats.count} queries, {stats.total_ms:.1f}ms - slowest: {slowest}")
+
+app.add_middleware(QueryStatsMiddleware)
+
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
@@ -120,6 +207,26 @@ async def verify_token(token: Optional[str] = Depends(oauth2_scheme)):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def verify_feed_access(
+    x_service_token: Optional[str] = Header(None),
+    token: Optional[str] = Depends(oauth2_scheme)
+) -> Optional[str]:
+    """
+    Authorize a change feed consumer.
+
+    Returns:
+        None for services presenting CV_FEED_SERVICE_TOKEN (every user's events),
+        or the user ID from a bearer token (that user's events only)
+    """
+    if outbox.FEED_SERVICE_TOKEN and x_service_token and hmac.compare_digest(x_service_token, outbox.FEED_SERVICE_TOKEN):
+        return None
+    auth = await verify_token(token)
+    return auth["user_id"]
+
+def feed_consumer(consumer: str, user_id: Optional[str]) -> str:
+    """Cursor key for a consumer; user consumers are namespaced by user."""
+    return consumer if user_id is None else f"user:{user_id}:{consumer}"
+
 # Helper function to serialize database objects to JSON-compatible dictionaries
 def serialize_cv(cv, include_relationships=True):
     """Convert a CV database object to a dictionary."""
@@ -135,17 +242,17 @@ def serialize_cv(cv, include_relationships=True):
         },
         "content": {
             "template_id": cv.template_id,
-            "style_options": json.loads(cv.style_options) if isinstance(cv.style_options, str) else cv.style_options or {},
-            "personal_info": json.loads(cv.personal_info) if isinstance(cv.personal_info, str) else cv.personal_info or {},
+            "style_options": cv.style_options or {},
+            "personal_info": cv.personal_info or {},
             "summary": cv.summary,
-            "custom_sections": json.loads(cv.custom_sections) if isinstance(cv.custom_sections, str) else cv.custom_sections or {},
+            "custom_sections": cv.custom_sections or {},
         },
         "created_at": cv.created_at.isoformat() if cv.created_at else None,
         "updated_at": cv.updated_at.isoformat() if cv.updated_at else None
     }
     
-    # Add relationships if database supports them and they should be included
-    if include_relationships and not is_sqlite:
+    # Add relationships if they should be included
+    if include_relationships:
         # Experiences
         result["content"]["experiences"] = []
         for exp in getattr(cv, "experiences", []):
@@ -179,6 +286,13 @@ def serialize_cv(cv, include_relationships=True):
     
     return result
 
+def encode_cv(cv) -> bytes:
+    """Serialize a CV to a JSON response body and store it in the CV cache."""
+    body = encode_json(serialize_cv(cv))
+    if CACHE_ENABLED:
+        cv_cache.put(cv.id, cv.version, cv.user_id, body)
+    return body
+
 # Routes
 @app.get("/")
 async def root():
@@ -194,6 +308,9 @@ async def health_check():
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0",
         "database_type": "SQLite" if is_sqlite else "PostgreSQL",
+        "cache": cv_cache.stats(),
+        "database_pool": pool_status(engine),
+        "replicas": replica_router.status(),
         "environment": {
             "python_version": sys.version,
             "platform": platform.platform(),
@@ -201,58 +318,212 @@ async def health_check():
         }
     }
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup warm-up has finished."""
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if warmup is None or warmup.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready", "steps": {}} if warmup is None else warmup.status()
+    )
+
 @app.get("/api/cv")
 async def get_cvs(
     auth: dict = Depends(verify_token), 
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_read_db_session)
 ):
     """Get all CVs for the current user."""
     user_id = auth["user_id"]
     
-    # Query CVs for this user, ordered by last modified
-    cvs = db.query(models.CV).filter(models.CV.user_id == user_id).order_by(
+    # Query CV versions for this user, ordered by last modified
+    rows = db.query(models.CV.id, models.CV.version).filter(models.CV.user_id == user_id).order_by(
         desc(models.CV.is_default),  # Default CV first
         desc(models.CV.last_modified)  # Then by modification date
     ).all()
     
+    # Serve cached CVs and load only the rest
+    bodies = {}
+    missing = []
+    for row in rows:
+        body = cv_cache.get(row.id, row.version, user_id) if CACHE_ENABLED else None
+        if body is not None:
+            bodies[str(row.id)] = body
+        else:
+            missing.append(row.id)
+    
+    if missing:
+        for cv in db.query(models.CV).filter(models.CV.id.in_(missing), models.CV.user_id == user_id).all():
+            bodies[str(cv.id)] = encode_cv(cv)
+    
     # Convert to API response format
-    result = [serialize_cv(cv) for cv in cvs]
+    result = b"[" + b",".join(bodies[str(row.id)] for row in rows if str(row.id) in bodies) + b"]"
     
-    return result
+    return Response(content=result, media_type="application/json")
 
 @app.post("/api/cv", status_code=status.HTTP_201_CREATED)
 async def create_cv(
-    # cv_data: CVCreate, # REMOVE/COMMENT OUT this parameter
-    file: UploadFile = File(...), # ADD this parameter
+    file: UploadFile = File(...),
     auth: dict = Depends(verify_token),
     db: Session = Depends(get_db_session)
 ):
-    """Create a new CV from an uploaded file.""" # Updated docstring
-    # --- Function body will be replaced in Step 3.3 and 3.4 ---
-    # Placeholder until parsing logic is added
+    """Create a new CV from an uploaded PDF or DOCX file."""
+    user_id = auth["user_id"]
     logger.info(f"Received file upload: {file.filename}, content type: {file.content_type}")
-    # We need to return something conforming to the original (or a new) response model
-    # For now, let's raise NotImplementedError until we add the parsing logic.
-    raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="CV parsing logic not yet implemented.")
 
-    # --- Original function body (based on CVCreate) is now obsolete for this endpoint ---
-    # user_id = auth["user_id"]
-    # cv_id = uuid.uuid4() if not is_sqlite else str(uuid.uuid4())
-    # ... (rest of old logic for creating blank/copying CV) ...
+    try:
+        parsed = await cv_parser.parse_upload(file)
+    except cv_parser.UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except cv_parser.UnsupportedDocumentError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    except cv_parser.ParserBusyError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    except cv_parser.ParserTimeoutError as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except cv_parser.CVParseError as e:
+        logger.warning(f"Failed to parse upload {file.filename}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    finally:
+        await file.close()
+
+    name = os.path.splitext(os.path.basename(file.filename or ""))[0] or "Uploaded CV"
+    cv = models.CV(
+        user_id=user_id,
+        name=name[:255],
+        description=f"Imported from {file.filename}" if file.filename else None,
+        is_default=False,
+        version=1,
+        template_id="default",
+        summary=parsed["summary"],
+        style_options={},
+        personal_info=parsed["personal_info"],
+        custom_sections=parsed["sections"],
+    )
+    db.add(cv)
+    db.flush()
+
+    for order, skill_name in enumerate(parsed["skills"]):
+        db.add(models.Skill(cv_id=cv.id, user_id=cv.user_id, name=skill_name[:255], order=order))
+
+    search.index_cv(db, cv.id, cv.user_id)
+    document = revisions.to_document(serialize_cv(cv))
+    revisions.record_revision(db, cv, document)
+    outbox.record_change(db, cv.id, cv.user_id, cv.version, outbox.CREATED, outbox.changed_sections(None, document))
+    db.commit()
+    db.refresh(cv)
+    logger.info(f"Created CV {cv.id} from upload with {len(parsed['skills'])} skills and sections {list(parsed['sections'])}")
+
+    return FastJSONResponse(serialize_cv(cv), status_code=status.HTTP_201_CREATED)
+
+@app.get("/api/cv/search")
+async def search_cvs(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    limit: int = Query(20, ge=1, le=50, description="Maximum number of results"),
+    auth: dict = Depends(verify_token),
+    db: Session = Depends(get_read_db_session)
+):
+    """Full-text search across the current user's CVs, best match first."""
+    user_id = auth["user_id"]
+
+    try:
+        results = search.search_cvs(db, user_id, q, limit)
+    except search.SearchUnavailableError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return {
+        "query": q,
+        "results": results,
+        "count": len(results)
+    }
+
+class FeedAck(BaseModel):
+    consumer: str = Field(..., min_length=1, max_length=100)
+    cursor: int = Field(..., ge=0)
+
+@app.get("/api/cv/changes")
+async def get_cv_changes(
+    consumer: str = Query(..., min_length=1, max_length=100, description="Consumer name, for the stored cursor"),
+    after: Optional[int] = Query(None, ge=0, description="Read after this position instead of the stored cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of events"),
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for events when there are none"),
+    user_id: Optional[str] = Depends(verify_feed_access),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Long-poll the CV change feed.
+    
+    Events after the consumer's acknowledged cursor (or `after`) are returned
+    oldest first. Acknowledge processed events with POST /api/cv/changes/ack;
+    unacknowledged events are delivered again.
+    """
+    position = after if after is not None else outbox.get_cursor(db, feed_consumer(consumer, user_id))
+    deadline = time.monotonic() + wait
+    while True:
+        head = outbox.dispatcher.head
+        events = outbox.read_changes(db, position, limit, user_id)
+        # Release the connection while waiting
+        db.rollback()
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0 or not await outbox.dispatcher.wait_for(head, remaining):
+            break
+    
+    return {
+        "consumer": consumer,
+        "events": events,
+        "cursor": events[-1]["position"] if events else position
+    }
+
+@app.get("/api/cv/changes/stream")
+async def stream_cv_changes(
+    request: Request,
+    consumer: str = Query(..., min_length=1, max_length=100, description="Consumer name, for the stored cursor"),
+    after: Optional[int] = Query(None, ge=0, description="Stream after this position instead of the stored cursor"),
+    user_id: Optional[str] = Depends(verify_feed_access)
+):
+    """
+    Stream the CV change feed as server-sent events.
+    
+    Starts after the Last-Event-ID header, `after`, or the consumer's
+    acknowledged cursor, in that order. Each event's id is its feed position.
+    """
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id and last_event_id.isdigit():
+        position = int(last_event_id)
+    elif after is not None:
+        position = after
+    else:
+        position = outbox.load_cursor(feed_consumer(consumer, user_id))
+    
+    return StreamingResponse(
+        outbox.stream_changes(position, user_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/cv/changes/ack")
+async def ack_cv_changes(
+    ack: FeedAck,
+    user_id: Optional[str] = Depends(verify_feed_access),
+    db: Session = Depends(get_db_session)
+):
+    """Store a consumer's cursor once it has processed all events up to it."""
+    cursor = outbox.acknowledge(db, feed_consumer(ack.consumer, user_id), ack.cursor)
+    db.commit()
+    return {"consumer": ack.consumer, "cursor": cursor}
 
 @app.get("/api/cv/{cv_id}")
 async def get_cv(
     cv_id: str,
     auth: dict = Depends(verify_token),
-    db: Session = Depends(get_db_session)
+    db: Session = Depends(get_read_db_session)
 ):
     """Get a specific CV."""
     user_id = auth["user_id"]
     logger.info(f"Attempting to get CV. ID: '{cv_id}', User ID: '{user_id}'")
-    cv = None
+    check_cv_id(cv_id)
+    current = None
     try:
-        # Query CV
-        cv = db.query(models.CV).filter(
+        # Query the current version only; the owner check always hits the database
+        current = db.query(models.CV.id, models.CV.version).filter(
             models.CV.id == cv_id,
             models.CV.user_id == user_id
         ).first()
@@ -264,18 +535,31 @@ async def get_cv(
             detail="Database error while fetching CV"
         )
 
-    if not cv:
+    if not current:
         logger.warning(f"CV not found or access denied for CV ID: '{cv_id}', User ID: '{user_id}'")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="CV not found"
         )
     
+    if CACHE_ENABLED:
+        body = cv_cache.get(current.id, current.version, user_id)
+        if body is not None:
+            logger.info(f"CV cache hit for ID: '{cv_id}' version {current.version}")
+            return Response(content=body, media_type="application/json")
+    
+    cv = db.query(models.CV).filter(models.CV.id == current.id, models.CV.user_id == user_id).first()
+    if not cv:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CV not found"
+        )
+    
     logger.info(f"CV found for ID: '{cv_id}'. Serializing.")
     try:
-        serialized_cv = serialize_cv(cv)
+        body = encode_cv(cv)
         logger.info(f"Serialization successful for CV ID: '{cv_id}'")
-        return serialized_cv
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         logger.error(f"Serialization failed for CV ID: '{cv_id}'. Error: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -292,6 +576,7 @@ async def update_cv_metadata(
 ):
     """Update CV metadata."""
     user_id = auth["user_id"]
+    check_cv_id(cv_id)
     
     # Query CV
     cv = db.query(models.CV).filter(
@@ -305,6 +590,8 @@ async def update_cv_metadata(
             detail="CV not found"
         )
     
+    previous_document = revisions.to_document(serialize_cv(cv))
+    
     # Update fields if provided
     if metadata.name is not None:
         cv.name = metadata.name
@@ -312,31 +599,31 @@ async def update_cv_metadata(
     if metadata.description is not None:
         cv.description = metadata.description
     
-    if metadata.is_default is not None:
-        # If this is the default CV, update other CVs
-        if metadata.is_default:
-            # Find all default CVs for this user and set them to non-default
-            default_cvs = db.query(models.CV).filter(
-                models.CV.user_id == user_id,
-                models.CV.is_default == True,
-                models.CV.id != cv_id
-            ).all()
-            
-            for other_cv in default_cvs:
-                other_cv.is_default = False
-        
-        cv.is_default = metadata.is_default
+    if metadata.is_default is False:
+        cv.is_default = False
     
     # Update version and timestamps
     cv.version += 1
     cv.last_modified = datetime.utcnow()
     cv.updated_at = datetime.utcnow()
     
+    if metadata.is_default:
+        # Clear the user's other default in one statement, guarded by the partial unique index
+        try:
+            default_cv.set_default_cv(db, cv)
+        except default_cv.DefaultCVConflictError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
     # Save changes
+    search.index_cv(db, cv.id, cv.user_id)
+    document = revisions.to_document(serialize_cv(cv))
+    revisions.record_revision(db, cv, document, previous_document)
+    outbox.record_change(db, cv.id, cv.user_id, cv.version, outbox.UPDATED, outbox.changed_sections(previous_document, document))
     db.commit()
+    cv_cache.invalidate(cv.id, cv.version - 1)
     db.refresh(cv)
     
-    return serialize_cv(cv)
+    return FastJSONResponse(serialize_cv(cv))
 
 @app.put("/api/cv/{cv_id}/content")
 async def update_cv_content(
@@ -347,6 +634,7 @@ async def update_cv_content(
 ):
     """Update CV content."""
     user_id = auth["user_id"]
+    check_cv_id(cv_id)
     
     # Query CV
     cv = db.query(models.CV).filter(
@@ -360,21 +648,23 @@ async def update_cv_content(
             detail="CV not found"
         )
     
+    previous_document = revisions.to_document(serialize_cv(cv))
+    
     # Update fields if provided
     if content.template_id is not None:
         cv.template_id = content.template_id
     
     if content.style_options is not None:
-        cv.style_options = json.dumps(content.style_options) if is_sqlite else content.style_options
+        cv.style_options = content.style_options
     
     if content.personal_info is not None:
-        cv.personal_info = json.dumps(content.personal_info) if is_sqlite else content.personal_info
+        cv.personal_info = content.personal_info
     
     if content.summary is not None:
         cv.summary = content.summary
     
     if content.custom_sections is not None:
-        cv.custom_sections = json.dumps(content.custom_sections) if is_sqlite else content.custom_sections
+        cv.custom_sections = content.custom_sections
     
     # Update version and timestamps
     cv.version += 1
@@ -382,10 +672,15 @@ async def update_cv_content(
     cv.updated_at = datetime.utcnow()
     
     # Save changes
+    search.index_cv(db, cv.id, cv.user_id)
+    document = revisions.to_document(serialize_cv(cv))
+    revisions.record_revision(db, cv, document, previous_document)
+    outbox.record_change(db, cv.id, cv.user_id, cv.version, outbox.UPDATED, outbox.changed_sections(previous_document, document))
     db.commit()
+    cv_cache.invalidate(cv.id, cv.version - 1)
     db.refresh(cv)
     
-    return serialize_cv(cv)
+    return FastJSONResponse(serialize_cv(cv))
 
 @app.delete("/api/cv/{cv_id}")
 async def delete_cv(
@@ -395,6 +690,7 @@ async def delete_cv(
 ):
     """Delete a CV."""
     user_id = auth["user_id"]
+    check_cv_id(cv_id)
     
     # Query CV
     cv = db.query(models.CV).filter(
@@ -409,11 +705,144 @@ async def delete_cv(
         )
     
     # Delete CV
+    deleted_id, deleted_version = cv.id, cv.version
+    search.remove_cv(db, cv.id)
+    outbox.record_change(db, cv.id, cv.user_id, cv.version, outbox.DELETED, [])
     db.delete(cv)
     db.commit()
+    cv_cache.invalidate(deleted_id, deleted_version)
     
     return {"message": "CV deleted successfully"}
 
+def check_cv_id(cv_id: str) -> None:
+    """Raise a 404 for a path id that isn't a UUID, before it reaches a uuid column."""
+    if not models.is_uuid(cv_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CV not found"
+        )
+
+def get_owned_cv(db: Session, cv_id: str, user_id: str):
+    """Get a CV owned by the user or raise a 404."""
+    check_cv_id(cv_id)
+    cv = db.query(models.CV).filter(
+        models.CV.id == cv_id,
+        models.CV.user_id == user_id
+    ).first()
+    
+    if not cv:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CV not found"
+        )
+    return cv
+
+def get_revision_document(db: Session, cv_id, version: int) -> Dict[str, Any]:
+    """Rebuild a stored revision or raise a 404."""
+    try:
+        return revisions.get_document(db, cv_id, version)
+    except revisions.RevisionNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+@app.get("/api/cv/{cv_id}/revisions")
+async def list_cv_revisions(
+    cv_id: str,
+    auth: dict = Depends(verify_token),
+    db: Session = Depends(get_read_db_session)
+):
+    """List the stored revisions of a CV, newest first."""
+    cv = get_owned_cv(db, cv_id, auth["user_id"])
+    
+    return {
+        "cv_id": cv_id,
+        "current_version": cv.version,
+        "revisions": revisions.list_revisions(db, cv.id)
+    }
+
+@app.get("/api/cv/{cv_id}/revisions/{version}")
+async def get_cv_revision(
+    cv_id: str,
+    version: int,
+    auth: dict = Depends(verify_token),
+    db: Session = Depends(get_read_db_session)
+):
+    """Get the metadata and content of a CV as it was at a given version."""
+    cv = get_owned_cv(db, cv_id, auth["user_id"])
+    document = get_revision_document(db, cv.id, version)
+    
+    return FastJSONResponse({
+        "cv_id": cv_id,
+        "version": version,
+        **document
+    })
+
+@app.get("/api/cv/{cv_id}/revisions/{version}/diff")
+async def diff_cv_revision(
+    cv_id: str,
+    version: int,
+    against: Optional[int] = Query(None, description="Version to compare with (defaults to the current version)"),
+    auth: dict = Depends(verify_token),
+    db: Session = Depends(get_read_db_session)
+):
+    """Get a JSON Patch that turns the given version into the `against` version."""
+    cv = get_owned_cv(db, cv_id, auth["user_id"])
+    against = against or cv.version
+    
+    old_document = get_revision_document(db, cv.id, version)
+    new_document = get_revision_document(db, cv.id, against)
+    
+    return FastJSONResponse({
+        "cv_id": cv_id,
+        "from_version": version,
+        "to_version": against,
+        "patch": revisions.diff(old_document, new_document)
+    })
+
+@app.post("/api/cv/{cv_id}/revisions/{version}/restore")
+async def restore_cv_revision(
+    cv_id: str,
+    version: int,
+    auth: dict = Depends(verify_token),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Restore a CV's name, description and content from an earlier version.
+    
+    The restore is saved as a new version, so it can itself be undone.
+    """
+    cv = get_owned_cv(db, cv_id, auth["user_id"])
+    document = get_revision_document(db, cv.id, version)
+    previous_document = revisions.to_document(serialize_cv(cv))
+    
+    metadata = document["metadata"]
+    content = document["content"]
+    cv.name = metadata["name"]
+    cv.description = metadata["description"]
+    cv.template_id = content.get("template_id") or cv.template_id
+    cv.summary = content.get("summary")
+    for field in ("style_options", "personal_info", "custom_sections"):
+        value = content.get(field) or {}
+        setattr(cv, field, value)
+    
+    # Update version and timestamps
+    cv.version += 1
+    cv.last_modified = datetime.utcnow()
+    cv.updated_at = datetime.utcnow()
+    
+    # Save changes
+    search.index_cv(db, cv.id, cv.user_id)
+    document = revisions.to_document(serialize_cv(cv))
+    revisions.record_revision(db, cv, document, previous_document)
+    outbox.record_change(db, cv.id, cv.user_id, cv.version, outbox.RESTORED, outbox.changed_sections(previous_document, document))
+    db.commit()
+    cv_cache.invalidate(cv.id, cv.version - 1)
+    db.refresh(cv)
+    
+    return FastJSONResponse(serialize_cv(cv))
+
 # Exception handler for database errors
 @app.exception_handler(Exception)
 async def database_exception_handler(request: Request, exc: Exception):
@@ -423,16 +852,38 @@ async def database_exception_handler(request: Request, exc: Exception):
         content={"detail": "An internal server error occurred"},
     )
 
-# --- Database Table Creation --- 
-# Ensure tables are created on startup
-# NOTE: In production, using Alembic for migrations is recommended
+# Schema creation and upgrades run in the migration step (python -m app.migrate),
+# so startup only schedules the checks that gate /api/ready
 @app.on_event("startup")
-def startup_event():
-    logger.info("Running startup event: Creating database tables if they don't exist...")
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables checked/created successfully.")
-    except Exception as e:
-        logger.error(f"Error creating database tables: {e}", exc_info=True)
-        # Depending on the error, you might want to prevent startup
-# --- End Database Table Creation --- 
\ No newline at end of file
+async def start_warmup():
+    if warmup is not None:
+        warmup.start()
+
+@app.on_event("shutdown")
+async def stop_warmup():
+    if warmup is not None:
+        await warmup.stop()
+
+@app.on_event("startup")
+async def start_change_dispatcher():
+    outbox.dispatcher.start()
+
+@app.on_event("shutdown")
+async def stop_change_dispatcher():
+    await outbox.dispatcher.stop()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    cv_parser.shutdown_parsers()
+
+# Added after the other middleware so it times them too
+if instrument is not None:
+    instrument(app, "cv_service")
+else:
+    logger.warning("shared.metrics not available - /metrics is disabled")
+
+# Tracing goes outermost, so its span covers the metrics middleware as well
+if setup_tracing is not None:
+    setup_tracing(app, "cv_service")
+else:
+    logger.warning("shared.tracing not available - requests are not traced")
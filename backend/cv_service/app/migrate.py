@@ -0,0 +1,108 @@
+"""
+Schema migration step for the CV service.
+
+The service no longer creates tables when it boots. Run this once per deploy,
+before the new version starts serving:
+
+    cd backend/cv_service
+    DATABASE_URL=... python -m app.migrate
+
+An empty database is created from the models (create_all also creates the
+partitions when CV_PARTITIONS is set) and stamped at the latest Alembic
+revision. An existing database is brought up to date with `alembic upgrade
+head`. In both cases the search index and the default-CV index are then
+created and backfilled.
+
+At startup the service only checks the revision the database is at (see
+schema_status); until it is at or past the code's head the service is not
+ready.
+"""
+import logging
+import os
+import sys
+from typing import Dict, Any, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from .database import Base, engine as default_engine
+from . import models  # noqa: F401 - registers the tables on Base.metadata
+from . import search
+from . import default_cv
+
+# Set up logging
+logger = logging.getLogger("cv_service.migrate")
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+def alembic_config():
+    """Alembic configuration for the service's migrations, independent of the working directory."""
+    # Alembic is imported on use; the service only needs it for the startup schema check
+    from alembic.config import Config
+
+    # No ini file, so running in-process doesn't reconfigure the service's logging
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    return config
+
+def schema_status(engine: Engine = default_engine) -> Dict[str, Any]:
+    """
+    Compare the database's Alembic revision with the latest one in the code.
+
+    Returns:
+        A dict with `current` and `head` revisions and `state`, one of
+        "current", "ahead" (migrated by a newer release), "behind" or
+        "uninitialized"
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(alembic_config())
+    head = script.get_current_head()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    if current is None:
+        state = "uninitialized"
+    elif current == head:
+        state = "current"
+    elif current not in {revision.revision for revision in script.walk_revisions()}:
+        # Expand-only migrations keep older releases working during a rollout
+        state = "ahead"
+    else:
+        state = "behind"
+    return {"current": current, "head": head, "state": state}
+
+def migrate(engine: Engine = default_engine) -> Optional[str]:
+    """
+    Create or upgrade the schema, then build the search and default-CV indexes.
+
+    Returns:
+        The revision the database is at afterwards
+    """
+    from alembic import command
+
+    config = alembic_config()
+    if "cvs" not in inspect(engine).get_table_names():
+        logger.info("Empty database: creating the schema from the models")
+        Base.metadata.create_all(bind=engine)
+        command.stamp(config, "head")
+    else:
+        logger.info("Upgrading the schema to the latest revision")
+        command.upgrade(config, "head")
+    search.ensure_search_index(engine)
+    default_cv.ensure_default_cv_index(engine)
+    status = schema_status(engine)
+    logger.info(f"Schema is at revision {status['current']}")
+    return status["current"]
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    try:
+        migrate()
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}", exc_info=True)
+        sys.exit(1)
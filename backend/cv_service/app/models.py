@@ -1,51 +1,85 @@
-from sqlalchemy import Column, String, Text, Integer, Boolean, ForeignKey, DateTime, Table
-from sqlalchemy.sql import func
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, ForeignKey, ForeignKeyConstraint, DateTime, Table, Index, LargeBinary, UniqueConstraint, JSON, Uuid
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.sql import func, text
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import relationship, deferred
 import uuid
 import os
 from .database import Base
+from .partitioning import is_partitioned, attach_partitions
 
-# Determine if using SQLite - moved before imports
+# Determine if using SQLite (only full-text search differs between the databases)
 is_sqlite = os.getenv("DATABASE_URL", "").startswith('sqlite:')
 
-# Import PostgreSQL types only if needed
-if not is_sqlite:
-    from sqlalchemy.dialects.postgresql import JSONB, UUID
-else:
-    # Define placeholder for Type hints when using SQLite
-    JSONB = None
-    UUID = None
+# Portable column types: native UUID and JSONB on PostgreSQL, CHAR(32) and JSON text on SQLite
+class UUIDType(TypeDecorator):
+    """
+    SQLAlchemy's Uuid type, also accepting UUID strings (ids from paths and tokens) as parameters.
+
+    Values that are not UUIDs, such as the user ids of development tokens on
+    SQLite (migration 0004 leaves them as they are), are passed through
+    unchanged in both directions instead of failing the query.
+    """
+    impl = Uuid
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        process_uuid = self.impl_instance.bind_processor(dialect)
+
+        def process(value):
+            if value is None:
+                return None
+            if not isinstance(value, uuid.UUID):
+                try:
+                    value = uuid.UUID(str(value))
+                except ValueError:
+                    return str(value)
+            return process_uuid(value) if process_uuid else value
+        return process
+
+    def result_processor(self, dialect, coltype):
+        process_uuid = self.impl_instance.result_processor(dialect, coltype)
+        if process_uuid is None:
+            return None
+
+        def process(value):
+            try:
+                return process_uuid(value)
+            except (ValueError, TypeError):
+                return value
+        return process
+
+def is_uuid(value) -> bool:
+    """Whether a path id can name a row; PostgreSQL's uuid columns reject anything else."""
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+JSONType = JSON().with_variant(JSONB(), "postgresql")
 
 # Main CV table
 class CV(Base):
     __tablename__ = "cvs"
 
-    # Use different column types based on database
-    if is_sqlite:
-        # SQLite version (no UUID or JSONB support)
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        user_id = Column(String(36), nullable=False, index=True)
-        # Store JSON as strings in SQLite
-        style_options = Column(String, nullable=True)  
-        personal_info = Column(String, nullable=True)
-        custom_sections = Column(String, nullable=True)
-        # Relationships will be handled differently
-    else:
-        # PostgreSQL version with proper types
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
-        style_options = Column(JSONB, nullable=True)
-        personal_info = Column(JSONB, nullable=True)
-        custom_sections = Column(JSONB, nullable=True)
-        # Define relationships for PostgreSQL
-        experiences = relationship("Experience", back_populates="cv", cascade="all, delete-orphan")
-        education = relationship("Education", back_populates="cv", cascade="all, delete-orphan")
-        skills = relationship("Skill", back_populates="cv", cascade="all, delete-orphan")
-        languages = relationship("Language", back_populates="cv", cascade="all, delete-orphan")
-        projects = relationship("Project", back_populates="cv", cascade="all, delete-orphan")
-        certifications = relationship("Certification", back_populates="cv", cascade="all, delete-orphan")
-        references = relationship("Reference", back_populates="cv", cascade="all, delete-orphan")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    # Partition key when CV_PARTITIONS is set (see app/partitioning.py)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False, index=True)
+    style_options = Column(JSONType, nullable=True)
+    personal_info = Column(JSONType, nullable=True)
+    custom_sections = Column(JSONType, nullable=True)
+    if not is_sqlite:
+        # Full-text search document, maintained by app/search.py (SQLite uses an FTS5 table instead)
+        search_vector = deferred(Column(TSVECTOR, nullable=True))
+
+    experiences = relationship("Experience", back_populates="cv", cascade="all, delete-orphan")
+    education = relationship("Education", back_populates="cv", cascade="all, delete-orphan")
+    skills = relationship("Skill", back_populates="cv", cascade="all, delete-orphan")
+    languages = relationship("Language", back_populates="cv", cascade="all, delete-orphan")
+    projects = relationship("Project", back_populates="cv", cascade="all, delete-orphan")
+    certifications = relationship("Certification", back_populates="cv", cascade="all, delete-orphan")
+    references = relationship("Reference", back_populates="cv", cascade="all, delete-orphan")
         
     # Common columns
     name = Column(String(255), nullable=False)
@@ -58,17 +92,36 @@ class CV(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # At most one default CV per user (see app/default_cv.py)
+        Index("uq_cvs_user_default", "user_id", unique=True, postgresql_where=text("is_default"), sqlite_where=text("is_default")),
+    ) + (() if is_sqlite else (
+        Index("ix_cvs_search_vector", "search_vector", postgresql_using="gin"),
+    )) + (({"postgresql_partition_by": "HASH (user_id)"},) if is_partitioned else ())
+
+def cv_foreign_key():
+    """cv_id's foreign key; partitioned tables use the composite one from section_table_args() instead."""
+    return [] if is_partitioned else [ForeignKey("cvs.id", ondelete="CASCADE")]
+
+def section_table_args(table: str):
+    """Index on (user_id, cv_id), plus the composite foreign key and partitioning when partitioned."""
+    args = (Index(f"ix_{table}_user_id_cv_id", "user_id", "cv_id"),)
+    if is_partitioned:
+        args += (
+            ForeignKeyConstraint(["cv_id", "user_id"], ["cvs.id", "cvs.user_id"], ondelete="CASCADE"),
+            {"postgresql_partition_by": "HASH (user_id)"},
+        )
+    return args
+
 # CV sections as separate tables for normalization and better querying
 class Experience(Base):
     __tablename__ = "experiences"
+    __table_args__ = section_table_args("experiences")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="experiences")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="experiences")
     
     company = Column(String(255), nullable=False)
     position = Column(String(255), nullable=False)
@@ -82,14 +135,12 @@ class Experience(Base):
 
 class Education(Base):
     __tablename__ = "education"
+    __table_args__ = section_table_args("education")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="education")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="education")
     
     institution = Column(String(255), nullable=False)
     degree = Column(String(255), nullable=False)
@@ -104,14 +155,12 @@ class Education(Base):
 
 class Skill(Base):
     __tablename__ = "skills"
+    __table_args__ = section_table_args("skills")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="skills")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="skills")
     
     name = Column(String(255), nullable=False)
     level = Column(Integer, nullable=True)  # 1-5 scale
@@ -124,14 +173,12 @@ class Skill(Base):
 
 class Language(Base):
     __tablename__ = "languages"
+    __table_args__ = section_table_args("languages")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="languages")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="languages")
     
     name = Column(String(255), nullable=False)
     proficiency = Column(String(50), nullable=False)  # Basic, Intermediate, Advanced, Fluent, Native
@@ -142,14 +189,12 @@ class Language(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = section_table_args("projects")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="projects")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="projects")
     
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
@@ -163,14 +208,12 @@ class Project(Base):
 
 class Certification(Base):
     __tablename__ = "certifications"
+    __table_args__ = section_table_args("certifications")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="certifications")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="certifications")
     
     name = Column(String(255), nullable=False)
     issuer = Column(String(255), nullable=False)
@@ -185,14 +228,12 @@ class Certification(Base):
 
 class Reference(Base):
     __tablename__ = "references"
+    __table_args__ = section_table_args("references")
     
-    if is_sqlite:
-        id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-        cv_id = Column(String(36), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-    else:
-        id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-        cv_id = Column(UUID(as_uuid=True), ForeignKey("cvs.id", ondelete="CASCADE"), nullable=False)
-        cv = relationship("CV", back_populates="references")
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, primary_key=is_partitioned, nullable=False)  # Copied from the CV (partition key)
+    cv = relationship("CV", back_populates="references")
     
     name = Column(String(255), nullable=False)
     company = Column(String(255), nullable=True)
@@ -215,10 +256,57 @@ class Template(Base):
     category = Column(String(100), nullable=False)
     is_premium = Column(Boolean, default=False)
     
-    if is_sqlite:
-        style_options = Column(String, nullable=True)  # Store JSON as strings in SQLite
-    else:
-        style_options = Column(JSONB, nullable=True)
+    style_options = Column(JSONType, nullable=True)
     
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()) 
+# CV revision history (see app/revisions.py)
+class CVRevision(Base):
+    __tablename__ = "cv_revisions"
+    __table_args__ = (
+        UniqueConstraint("cv_id", "version", name="uq_cv_revisions_cv_version"),
+    ) + ((ForeignKeyConstraint(["cv_id", "user_id"], ["cvs.id", "cvs.user_id"], ondelete="CASCADE"),) if is_partitioned else ())
+
+    id = Column(UUIDType, primary_key=True, default=uuid.uuid4)
+    cv_id = Column(UUIDType, *cv_foreign_key(), nullable=False)
+    user_id = Column(UUIDType, nullable=False)
+
+    version = Column(Integer, nullable=False)
+    kind = Column(String(10), nullable=False)  # snapshot or delta
+    snapshot_version = Column(Integer, nullable=False)  # Snapshot this revision's delta chain starts from
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON document (snapshot) or JSON Patch (delta)
+    size = Column(Integer, nullable=False)  # Compressed payload size in bytes
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+# Change feed outbox (see app/outbox.py); no foreign key, so events outlive deleted CVs
+class CVChange(Base):
+    __tablename__ = "cv_outbox"
+    __table_args__ = (
+        # The dispatcher's queue of committed but unpublished events
+        Index("ix_cv_outbox_unpublished", "id", postgresql_where=text("position IS NULL"), sqlite_where=text("position IS NULL")),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    position = Column(BigInteger, nullable=True, unique=True)  # Feed position, assigned in commit order when published
+
+    cv_id = Column(UUIDType, nullable=False)
+    user_id = Column(UUIDType, nullable=False, index=True)
+    changed = Column(JSONType, nullable=False)  # Names of the changed sections
+
+    version = Column(Integer, nullable=False)
+    kind = Column(String(10), nullable=False)  # created, updated, restored or deleted
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+# Per-consumer change feed cursors
+class ChangeFeedCursor(Base):
+    __tablename__ = "cv_feed_cursors"
+
+    consumer = Column(String(200), primary_key=True)
+    position = Column(BigInteger, nullable=False, default=0)  # Last acknowledged feed position
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+# Create hash partitions along with the partitioned tables
+if is_partitioned:
+    for model in (CV, Experience, Education, Skill, Language, Project, Certification, Reference):
+        attach_partitions(model.__table__)
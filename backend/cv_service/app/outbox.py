@@ -0,0 +1,251 @@
+"""
+Transactional outbox and change feed for CV mutations.
+
+Every write endpoint adds a `cv_outbox` row in the same transaction as the
+change itself, via record_change(). So an event exists if and only if the
+change committed. Events are compact: cv_id, user_id, version, kind and the
+names of the changed sections. Consumers fetch the CV itself if they need it.
+
+The dispatcher publishes committed events by giving them a feed `position`.
+Only one dispatcher assigns positions at a time (a PostgreSQL advisory
+lock), and it can only see committed rows. So positions follow commit order,
+and a consumer that has read up to position N will never later find an
+unread event at or below N. Id order alone does not give that guarantee,
+because a transaction that took a lower id can commit after one with a
+higher id.
+
+Consumers read events after a cursor over long-poll or SSE and acknowledge
+what they have processed. The acknowledged cursor is stored per consumer, and
+reading resumes from it. Delivery is therefore at-least-once: anything not
+acknowledged is delivered again. Published events are kept for
+CV_OUTBOX_RETENTION_HOURS.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional
+
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, is_sqlite
+from . import models
+from .revisions import diff
+
+# Set up logging
+logger = logging.getLogger("cv_service.outbox")
+
+# Environment variables
+FEED_POLL_SECONDS = float(os.getenv("CV_FEED_POLL_SECONDS", "0.5"))
+FEED_BATCH_SIZE = int(os.getenv("CV_FEED_BATCH_SIZE", "500"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("CV_OUTBOX_RETENTION_HOURS", "168"))
+FEED_SERVICE_TOKEN = os.getenv("CV_FEED_SERVICE_TOKEN")
+
+PRUNE_INTERVAL_SECONDS = 600
+SSE_HEARTBEAT_SECONDS = 15
+DISPATCHER_LOCK_KEY = 0x63765F66656564  # Advisory lock key ("cv_feed")
+
+CREATED = "created"
+UPDATED = "updated"
+RESTORED = "restored"
+DELETED = "deleted"
+
+# --- Writing events ---
+
+def changed_sections(previous_document: Optional[Dict[str, Any]], document: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Names of the sections that differ between two revision documents.
+
+    Content fields are reported by name (e.g. "summary", "personal_info"),
+    and any change to name, description or is_default as "metadata".
+    """
+    if previous_document is None:
+        return sorted((document or {}).get("content", {}).keys()) + ["metadata"]
+    sections = set()
+    for op in diff(previous_document, document or {}):
+        tokens = op["path"].split("/")
+        if len(tokens) > 2 and tokens[1] == "content":
+            sections.add(tokens[2])
+        elif len(tokens) > 1:
+            sections.add(tokens[1])
+    return sorted(sections)
+
+def record_change(db: Session, cv_id, user_id, version: int, kind: str, sections: List[str]) -> None:
+    """Add a change event to the caller's transaction."""
+    db.add(models.CVChange(
+        cv_id=cv_id,
+        user_id=user_id,
+        version=version,
+        kind=kind,
+        changed=sections,
+    ))
+
+# --- Reading the feed ---
+
+def serialize_change(change: models.CVChange) -> Dict[str, Any]:
+    return {
+        "position": change.position,
+        "cv_id": str(change.cv_id),
+        "user_id": str(change.user_id),
+        "version": change.version,
+        "kind": change.kind,
+        "changed": change.changed,
+        "created_at": change.created_at.isoformat() if change.created_at else None,
+    }
+
+def read_changes(db: Session, after: int, limit: int, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Published events after a feed position, oldest first, optionally for one user."""
+    query = db.query(models.CVChange).filter(models.CVChange.position > after)
+    if user_id is not None:
+        query = query.filter(models.CVChange.user_id == user_id)
+    return [serialize_change(change) for change in query.order_by(models.CVChange.position).limit(limit).all()]
+
+def get_cursor(db: Session, consumer: str) -> int:
+    """A consumer's last acknowledged position (0 for a new consumer)."""
+    position = db.query(models.ChangeFeedCursor.position).filter(models.ChangeFeedCursor.consumer == consumer).scalar()
+    return position or 0
+
+def acknowledge(db: Session, consumer: str, position: int) -> int:
+    """
+    Move a consumer's cursor forward to `position`.
+
+    Cursors never move backwards, so a late or repeated acknowledgement is
+    harmless, and never past the feed head, so no future event is skipped.
+
+    Returns:
+        The consumer's cursor after the update
+    """
+    head = db.query(func.coalesce(func.max(models.CVChange.position), 0)).scalar()
+    position = min(position, head)
+    cursor = db.query(models.ChangeFeedCursor).filter(models.ChangeFeedCursor.consumer == consumer).with_for_update().first()
+    if cursor is None:
+        cursor = models.ChangeFeedCursor(consumer=consumer, position=position)
+        db.add(cursor)
+    elif position > cursor.position:
+        cursor.position = position
+    db.flush()
+    return cursor.position
+
+def load_cursor(consumer: str) -> int:
+    with SessionLocal() as db:
+        return get_cursor(db, consumer)
+
+def _read_changes_session(after: int, limit: int, user_id: Optional[str]) -> List[Dict[str, Any]]:
+    with SessionLocal() as db:
+        return read_changes(db, after, limit, user_id)
+
+async def stream_changes(after: int, user_id: Optional[str], is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+    """
+    Server-sent events for the feed after a position, until the client disconnects.
+
+    Each event's SSE id is its feed position, so a reconnecting EventSource
+    resumes from Last-Event-ID. A comment line is sent as a heartbeat when the
+    feed is idle, so proxies keep the connection open.
+    """
+    loop = asyncio.get_running_loop()
+    position = after
+    yield "retry: 3000\n\n"
+    while not await is_disconnected():
+        head = dispatcher.head
+        events = await loop.run_in_executor(None, _read_changes_session, position, FEED_BATCH_SIZE, user_id)
+        for event in events:
+            yield f"id: {event['position']}\nevent: cv.change\ndata: {json.dumps(event)}\n\n"
+            position = event["position"]
+        if not events and not await dispatcher.wait_for(head, SSE_HEARTBEAT_SECONDS):
+            yield ": heartbeat\n\n"
+
+# --- Dispatcher ---
+
+def publish_pending() -> int:
+    """
+    Assign feed positions to committed, unpublished events.
+
+    Returns:
+        The current head position of the feed
+    """
+    with SessionLocal() as db:
+        if not is_sqlite and not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": DISPATCHER_LOCK_KEY}).scalar():
+            # Another worker is publishing; just report the head
+            return db.query(func.coalesce(func.max(models.CVChange.position), 0)).scalar()
+
+        head = db.query(func.coalesce(func.max(models.CVChange.position), 0)).scalar()
+        pending = db.query(models.CVChange.id).filter(models.CVChange.position.is_(None)).order_by(
+            models.CVChange.id
+        ).limit(FEED_BATCH_SIZE).all()
+        if pending:
+            now = datetime.utcnow()
+            db.execute(
+                update(models.CVChange),
+                [{"id": row.id, "position": head + offset, "published_at": now} for offset, row in enumerate(pending, 1)]
+            )
+            head += len(pending)
+        db.commit()
+        return head
+
+def prune_published(retention_hours: int = OUTBOX_RETENTION_HOURS) -> int:
+    """Delete published events older than the retention period."""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    with SessionLocal() as db:
+        deleted = db.query(models.CVChange).filter(
+            models.CVChange.position.isnot(None),
+            models.CVChange.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+    if deleted:
+        logger.info(f"Pruned {deleted} change events older than {retention_hours}h")
+    return deleted
+
+class ChangeDispatcher:
+    """Background task that publishes outbox events and wakes waiting feed readers."""
+
+    def __init__(self):
+        self.head = 0
+        self._published = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_prune = loop.time()
+        while True:
+            try:
+                head = await loop.run_in_executor(None, publish_pending)
+                if head > self.head:
+                    self.head = head
+                    # Wake everyone waiting on the old event, then start a new one
+                    self._published.set()
+                    self._published = asyncio.Event()
+                if loop.time() - last_prune > PRUNE_INTERVAL_SECONDS:
+                    last_prune = loop.time()
+                    await loop.run_in_executor(None, prune_published)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change dispatcher error: {str(e)}")
+            await asyncio.sleep(FEED_POLL_SECONDS)
+
+    async def wait_for(self, after: int, timeout: float) -> bool:
+        """Wait until the feed head passes `after`; returns False on timeout."""
+        if self.head > after:
+            return True
+        try:
+            await asyncio.wait_for(self._published.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.head > after
+
+dispatcher = ChangeDispatcher()
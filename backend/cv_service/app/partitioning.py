@@ -0,0 +1,75 @@
+"""
+Hash partitioning of CV storage by user.
+
+With CV_PARTITIONS set to N > 0 on PostgreSQL, `cvs` and its section tables
+are declared `PARTITION BY HASH (user_id)` and split into N partitions
+named `<table>_p<i>`. Every section row carries its CV's `user_id`, so a
+CV and all its sections live in partitions with the same remainder, and a
+query that includes `user_id` touches one partition per table.
+
+Partitioned primary keys must contain the partition key. So `cvs` is keyed
+on (id, user_id), and sections reference it through the composite foreign
+key (cv_id, user_id). Queries must therefore filter on user_id as well as
+id. A lookup by id alone scans every partition.
+
+New databases get their partitions from create_all() (see attach_partitions).
+Existing databases are converted by the Alembic migration
+`0002_hash_partition_cvs`, which uses rebuild_table() below.
+"""
+import logging
+import os
+from typing import List
+
+from sqlalchemy import DDL, Table, event, text
+
+# Set up logging
+logger = logging.getLogger("cv_service.partitioning")
+
+# Environment variables
+CV_PARTITIONS = int(os.getenv("CV_PARTITIONS", "0"))
+
+is_partitioned = CV_PARTITIONS > 0 and not os.getenv("DATABASE_URL", "").startswith("sqlite:")
+
+# Section tables, partitioned alongside `cvs` (cv_revisions only references cvs)
+SECTION_TABLES = ["experiences", "education", "skills", "languages", "projects", "certifications", "references"]
+
+def partition_name(table: str, remainder: int) -> str:
+    return f"{table}_p{remainder}"
+
+def partition_ddl(table: str, partitions: int) -> List[str]:
+    """CREATE TABLE statements for the hash partitions of a partitioned table."""
+    return [
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, i)}" PARTITION OF "{table}" '
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+        for i in range(partitions)
+    ]
+
+def attach_partitions(table: Table) -> None:
+    """Create the table's partitions right after create_all() creates the table itself."""
+    for statement in partition_ddl(table.name, CV_PARTITIONS):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+def is_table_partitioned(conn, table: str) -> bool:
+    return conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+             "WHERE c.relname = :table AND c.relnamespace = current_schema()::regnamespace)"),
+        {"table": table}
+    ).scalar()
+
+def rebuild_table(conn, table: str, partitions: int) -> None:
+    """
+    Copy a table into a new table with the same columns, either hash
+    partitioned by user_id (partitions > 0) or plain (partitions == 0).
+
+    The old table is renamed to `<table>_old` and left for the caller to drop,
+    so that constraints and indexes can be recreated under their usual names
+    once every table has been rebuilt.
+    """
+    old = f"{table}_old"
+    conn.execute(text(f'ALTER TABLE "{table}" RENAME TO "{old}"'))
+    partition_clause = " PARTITION BY HASH (user_id)" if partitions else ""
+    conn.execute(text(f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS){partition_clause}'))
+    for statement in partition_ddl(table, partitions):
+        conn.execute(text(statement))
+    copied = conn.execute(text(f'INSERT INTO "{table}" SELECT * FROM "{old}"'))
+    logger.info(f"Copied {copied.rowcount} rows into {'partitioned' if partitions else 'unpartitioned'} table {table}")
@@ -0,0 +1,58 @@
+"""
+Startup warm-up and readiness for the CV service.
+
+The service starts serving as soon as it is imported; nothing slow runs
+before uvicorn binds the port. The warm-up steps then run in the background
+and `/api/ready` returns 503 until all of them have succeeded, while
+`/api/health` stays a plain liveness check. A failed step is retried every
+WARMUP_RETRY_SECONDS, so a replica that boots before its database is
+reachable, or before the migration step has finished, becomes ready by
+itself once it is. The steps are run by shared.readiness.WarmUp; without
+it, `warmup` is None and the service is ready at once.
+"""
+import logging
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+from .database import engine
+from . import migrate
+from . import search
+
+# Warm-up runner shared by the backend services
+try:
+    from shared.readiness import WarmUp
+except ImportError:
+    WarmUp = None
+
+# Set up logging
+logger = logging.getLogger("cv_service.readiness")
+
+# Environment variables
+MIGRATE_ON_STARTUP = os.getenv("CV_MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+def check_schema() -> Dict[str, Any]:
+    """Fail unless the database has been migrated to this release's schema."""
+    status = migrate.schema_status(engine)
+    if status["state"] in ("uninitialized", "behind"):
+        raise RuntimeError(
+            f"database is at revision {status['current']}, this release needs {status['head']}; "
+            f"run the migration step (python -m app.migrate)"
+        )
+    if status["state"] == "ahead":
+        logger.warning(f"Database is at revision {status['current']}, newer than this release ({status['head']})")
+    return status
+
+def _steps() -> List[Tuple[str, Callable[[], Any]]]:
+    steps = []
+    if MIGRATE_ON_STARTUP:
+        # Development convenience; deployments run the migration step before starting
+        steps.append(("migrate", lambda: migrate.migrate(engine)))
+    steps.append(("schema", check_schema))
+    steps.append(("search_index", lambda: {"available": search.check_search_index(engine)}))
+    return steps
+
+if WarmUp is not None:
+    warmup = WarmUp(_steps())
+else:
+    warmup = None
+    logger.warning("shared.readiness not available - the service is ready without a warm-up")
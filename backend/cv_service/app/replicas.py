@@ -0,0 +1,215 @@
+"""
+Read-replica routing.
+
+Read-only endpoints take their session from get_read_db_session(), which
+binds SessionLocal to a healthy PostgreSQL streaming replica. Everything
+else still uses get_db_session() on the primary.
+
+Read-your-writes: after a session commits writes, the primary's current WAL
+position (LSN) is handed back to the client in the `cv_read_lsn` cookie. A
+read carrying that cookie only uses a replica that has replayed at least
+that LSN, and otherwise goes to the primary. The cookie expires after
+DB_READ_YOUR_WRITES_SECONDS.
+
+Replica health (reachability, replay LSN and lag) is checked at most once
+every DB_REPLICA_HEALTH_INTERVAL_SECONDS per process. A replica that fails a
+check, errors during a request, or lags more than DB_REPLICA_MAX_LAG_SECONDS
+is skipped until it recovers. When no replica is usable, reads fall back to
+the primary.
+"""
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, engine, instrument_engine, is_sqlite
+from .db_pool import engine_options
+
+# Set up logging
+logger = logging.getLogger("cv_database.replicas")
+
+# Environment variables
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL_SECONDS", "1"))
+REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "15"))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "60"))
+
+LSN_COOKIE = "cv_read_lsn"
+LSN_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+REPLICA_STATUS_QUERY = """
+    SELECT pg_last_wal_replay_lsn()::text AS replay_lsn,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END AS lag_seconds
+"""
+
+def parse_lsn(lsn: Optional[str]) -> Optional[int]:
+    """Convert a PostgreSQL LSN ("16/B374D848") to an integer, or None if malformed."""
+    if not lsn or not LSN_PATTERN.match(lsn):
+        return None
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+class Replica:
+    """One replica engine and its last known health."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, **engine_options(url, default_pool_size=10, default_max_overflow=20))
+        self.name = self.engine.url.render_as_string(hide_password=True).split("@")[-1]
+        if instrument_engine is not None:
+            instrument_engine(self.engine)
+        self.healthy = False
+        self.replay_lsn: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self.failed_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-check health if the last check is stale (or always, with force)."""
+        now = time.monotonic()
+        if self.failed_at and now - self.failed_at < REPLICA_RETRY_SECONDS:
+            return
+        if not force and now - self.checked_at < REPLICA_HEALTH_INTERVAL_SECONDS:
+            return
+        if not self._lock.acquire(blocking=False):
+            # Another thread is checking; use the current state
+            return
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text(REPLICA_STATUS_QUERY)).mappings().first()
+            self.replay_lsn = parse_lsn(row["replay_lsn"])
+            self.lag_seconds = float(row["lag_seconds"])
+            healthy = self.replay_lsn is not None and self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+            if healthy != self.healthy:
+                log = logger.info if healthy else logger.warning
+                log(f"Replica {self.name} is {'healthy' if healthy else 'unhealthy'} "
+                    f"(lag {self.lag_seconds:.1f}s, in recovery: {self.replay_lsn is not None})")
+            self.healthy = healthy
+            self.failed_at = 0.0
+        except Exception as e:
+            self.mark_failed(e)
+        finally:
+            self.checked_at = time.monotonic()
+            self._lock.release()
+
+    def mark_failed(self, error: Exception) -> None:
+        if self.healthy or not self.failed_at:
+            logger.warning(f"Replica {self.name} failed, routing reads elsewhere for {REPLICA_RETRY_SECONDS}s: {str(error)}")
+        self.healthy = False
+        self.failed_at = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+        }
+
+class ReplicaRouter:
+    """Picks a replica for each read, in round-robin order."""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._rotation = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._rotation_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, min_lsn: Optional[int] = None) -> Optional[Replica]:
+        """
+        Return a healthy replica that has replayed `min_lsn`, or None for the primary.
+        """
+        if not self.replicas:
+            return None
+        with self._rotation_lock:
+            start = next(self._rotation)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            replica.refresh()
+            if not replica.healthy:
+                continue
+            if min_lsn is not None and (replica.replay_lsn or 0) < min_lsn:
+                # It may have caught up since the last check
+                replica.refresh(force=True)
+                if not replica.healthy or (replica.replay_lsn or 0) < min_lsn:
+                    continue
+            return replica
+        return None
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [replica.status() for replica in self.replicas]
+
+router = ReplicaRouter([] if is_sqlite else REPLICA_URLS)
+if is_sqlite and REPLICA_URLS:
+    logger.warning("DATABASE_REPLICA_URLS is ignored with SQLite")
+
+# --- Read-your-writes state ---
+
+class RoutingState:
+    """Per-request routing state shared between the middleware and the sessions."""
+
+    def __init__(self, read_after_lsn: Optional[str] = None):
+        self.read_after_lsn = parse_lsn(read_after_lsn)
+        self.write_lsn: Optional[str] = None
+
+_routing_state: ContextVar[Optional[RoutingState]] = ContextVar("routing_state", default=None)
+
+def start_routing(read_after_lsn: Optional[str] = None) -> RoutingState:
+    """Start routing for the current request, given the client's LSN cookie."""
+    state = RoutingState(read_after_lsn)
+    _routing_state.set(state)
+    return state
+
+@event.listens_for(SessionLocal, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    if not session.info.pop("wrote", False) or not router.enabled:
+        return
+    state = _routing_state.get()
+    if state is None:
+        return
+    try:
+        with engine.connect() as conn:
+            state.write_lsn = conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+    except Exception as e:
+        logger.warning(f"Could not read primary WAL position, read-your-writes may route to the primary: {str(e)}")
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("wrote", None)
+
+def get_read_db_session():
+    """
+    Get a read-only database session for dependency injection in FastAPI.
+
+    The session is bound to a replica when one is healthy and has caught up
+    with the client's last write, and to the primary otherwise.
+    """
+    state = _routing_state.get()
+    replica = router.choose(state.read_after_lsn if state else None)
+    db: Session = SessionLocal(bind=replica.engine) if replica else SessionLocal()
+    try:
+        yield db
+    except OperationalError as e:
+        if replica is not None:
+            replica.mark_failed(e)
+        raise
+    finally:
+        db.rollback()
+        db.close()
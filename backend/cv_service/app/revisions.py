@@ -0,0 +1,267 @@
+"""
+CV revision history.
+
+Every write stores a revision row for the new CV version. Most revisions are
+zlib-compressed JSON Patch deltas against the previous version, so storage
+grows with the size of each edit rather than the size of the document. Every
+CV_REVISION_SNAPSHOT_INTERVAL versions a full compressed snapshot is stored
+instead. Rebuilding any version therefore reads one snapshot and applies at
+most CV_REVISION_SNAPSHOT_INTERVAL - 1 deltas.
+
+Deltas are pruned per delta chain. A chain is removed once a newer snapshot,
+itself older than CV_REVISION_RETENTION_DAYS, supersedes it. Snapshots are
+kept as sparse restore points.
+"""
+import copy
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Set up logging
+logger = logging.getLogger("cv_service.revisions")
+
+# Environment variables
+SNAPSHOT_INTERVAL = int(os.getenv("CV_REVISION_SNAPSHOT_INTERVAL", "10"))
+RETENTION_DAYS = int(os.getenv("CV_REVISION_RETENTION_DAYS", "90"))
+COMPRESSION_LEVEL = 6
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+class RevisionNotFoundError(Exception):
+    """The requested version was never stored or has been pruned."""
+    pass
+
+# --- Documents ---
+
+def to_document(serialized_cv: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a serialized CV to the fields tracked by revision history.
+
+    Timestamps and the version number are left out, since they change on
+    every write and would add noise to each delta.
+    """
+    metadata = serialized_cv.get("metadata", {})
+    return {
+        "metadata": {
+            "name": metadata.get("name"),
+            "description": metadata.get("description"),
+            "is_default": metadata.get("is_default"),
+        },
+        "content": copy.deepcopy(serialized_cv.get("content", {})),
+    }
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), sort_keys=True).encode("utf-8"), COMPRESSION_LEVEL)
+
+def _unpack(payload: bytes) -> Any:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+# --- JSON Patch (RFC 6902 subset: add, remove, replace) ---
+
+def _escape(key: str) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Compute a JSON Patch that turns `old` into `new`.
+
+    Objects are diffed key by key. Lists and scalars are replaced as a whole,
+    because CV lists are short and positional list diffs produce larger and
+    harder-to-read patches.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff(old[key], value, child))
+        return ops
+    if old == new:
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+def apply_patch(document: Any, patch: List[Dict[str, Any]]) -> Any:
+    """Apply a patch produced by diff() and return the new document."""
+    for op in patch:
+        tokens = [_unescape(token) for token in op["path"].split("/")[1:]]
+        if not tokens:
+            # Whole-document replace
+            document = copy.deepcopy(op["value"])
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[token]
+        if op["op"] == "remove":
+            del parent[tokens[-1]]
+        else:
+            parent[tokens[-1]] = copy.deepcopy(op["value"])
+    return document
+
+# --- Store ---
+
+def record_revision(db: Session, cv, document: Dict[str, Any], previous_document: Optional[Dict[str, Any]] = None) -> models.CVRevision:
+    """
+    Store the revision for the CV's current version.
+
+    Args:
+        db: Database session (the revision joins the caller's transaction)
+        cv: The CV, already carrying its new version number
+        document: to_document() of the CV after the write
+        previous_document: to_document() of the CV before the write, if any
+
+    Returns:
+        The revision row that was added
+    """
+    latest = _latest_revision(db, cv.id)
+
+    # A delta needs an unbroken chain ending at the previous version
+    use_delta = (
+        previous_document is not None
+        and latest is not None
+        and latest.version == cv.version - 1
+        and cv.version - latest.snapshot_version < SNAPSHOT_INTERVAL
+    )
+
+    if use_delta:
+        revision = _revision(cv.id, cv.user_id, cv.version, DELTA, latest.snapshot_version, diff(previous_document, document))
+    else:
+        revision = _revision(cv.id, cv.user_id, cv.version, SNAPSHOT, cv.version, document)
+    return _add(db, revision, latest)
+
+def record_patch(db: Session, cv_id, user_id, version: int, patch: List[Dict[str, Any]]) -> Optional[models.CVRevision]:
+    """
+    Store the revision for a version that differs from the previous one by a known patch.
+
+    For writes that don't load the CV, such as the set-based UPDATE that
+    clears other CVs' default flag. The previous version's revision must be
+    the latest stored; a CV without one (written before revision history) has
+    no chain to extend and gets no revision.
+
+    Returns:
+        The revision row that was added, or None
+    """
+    latest = _latest_revision(db, cv_id)
+    if latest is None or latest.version != version - 1:
+        logger.info(f"No revision of CV {cv_id} before version {version} to extend")
+        return None
+
+    if version - latest.snapshot_version < SNAPSHOT_INTERVAL:
+        revision = _revision(cv_id, user_id, version, DELTA, latest.snapshot_version, patch)
+    else:
+        document = apply_patch(get_document(db, cv_id, latest.version), patch)
+        revision = _revision(cv_id, user_id, version, SNAPSHOT, version, document)
+    return _add(db, revision, latest)
+
+def _latest_revision(db: Session, cv_id):
+    return db.query(models.CVRevision.version, models.CVRevision.snapshot_version).filter(
+        models.CVRevision.cv_id == cv_id
+    ).order_by(desc(models.CVRevision.version)).first()
+
+def _revision(cv_id, user_id, version: int, kind: str, snapshot_version: int, value: Any) -> models.CVRevision:
+    payload = _pack(value)
+    return models.CVRevision(
+        cv_id=cv_id,
+        user_id=user_id,
+        version=version,
+        kind=kind,
+        snapshot_version=snapshot_version,
+        payload=payload,
+        size=len(payload),
+    )
+
+def _add(db: Session, revision: models.CVRevision, latest) -> models.CVRevision:
+    db.add(revision)
+    if revision.kind == SNAPSHOT and latest is not None:
+        # A new chain has started, so older chains may now be prunable
+        db.flush()
+        prune_revisions(db, revision.cv_id)
+    return revision
+
+def get_document(db: Session, cv_id, version: int) -> Dict[str, Any]:
+    """
+    Rebuild the document for one version from its snapshot and deltas.
+
+    Raises:
+        RevisionNotFoundError: If the version is not stored or its chain was pruned
+    """
+    target = db.query(models.CVRevision.snapshot_version).filter(
+        models.CVRevision.cv_id == cv_id,
+        models.CVRevision.version == version
+    ).first()
+    if target is None:
+        raise RevisionNotFoundError(f"Version {version} is not available")
+
+    chain = db.query(models.CVRevision).filter(
+        models.CVRevision.cv_id == cv_id,
+        models.CVRevision.version >= target.snapshot_version,
+        models.CVRevision.version <= version
+    ).order_by(models.CVRevision.version).all()
+
+    if not chain or chain[0].kind != SNAPSHOT or len(chain) != version - target.snapshot_version + 1:
+        raise RevisionNotFoundError(f"Version {version} has been pruned")
+
+    document = _unpack(chain[0].payload)
+    for revision in chain[1:]:
+        document = apply_patch(document, _unpack(revision.payload))
+    return document
+
+def list_revisions(db: Session, cv_id) -> List[Dict[str, Any]]:
+    """List the stored revisions of a CV, newest first, without payloads."""
+    rows = db.query(
+        models.CVRevision.version,
+        models.CVRevision.kind,
+        models.CVRevision.size,
+        models.CVRevision.created_at
+    ).filter(models.CVRevision.cv_id == cv_id).order_by(desc(models.CVRevision.version)).all()
+
+    return [
+        {
+            "version": row.version,
+            "kind": row.kind,
+            "size": row.size,
+            "created_at": row.created_at.isoformat() if row.created_at else None
+        }
+        for row in rows
+    ]
+
+def prune_revisions(db: Session, cv_id, retention_days: int = RETENTION_DAYS) -> int:
+    """
+    Delete delta chains that have been superseded for longer than the retention period.
+
+    Returns:
+        The number of deleted revisions
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    boundary = db.query(models.CVRevision.version).filter(
+        models.CVRevision.cv_id == cv_id,
+        models.CVRevision.kind == SNAPSHOT,
+        models.CVRevision.created_at < cutoff
+    ).order_by(desc(models.CVRevision.version)).first()
+    if boundary is None:
+        return 0
+
+    deleted = db.query(models.CVRevision).filter(
+        models.CVRevision.cv_id == cv_id,
+        models.CVRevision.kind == DELTA,
+        models.CVRevision.version < boundary.version
+    ).delete(synchronize_session=False)
+    if deleted:
+        logger.info(f"Pruned {deleted} revisions of CV {cv_id} older than version {boundary.version}")
+    return deleted
@@ -0,0 +1,236 @@
+"""
+Full-text search over a user's CVs.
+
+PostgreSQL keeps a weighted `tsvector` column on `cvs` (GIN indexed) that is
+recomputed in a single set-based UPDATE whenever a CV is written. SQLite
+keeps an FTS5 virtual table with one row per CV instead. Both are refreshed
+inside the writing transaction, so the index never lags behind the data.
+"""
+import html
+import logging
+import re
+import uuid
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .database import is_sqlite
+from . import models
+
+# Set up logging
+logger = logging.getLogger("cv_service.search")
+
+# The database marks matches with private-use characters, which can't be
+# mistaken for markup; the snippet is HTML-escaped before they become <mark> tags
+SNIPPET_START = "\ue000"
+SNIPPET_END = "\ue001"
+
+# --- PostgreSQL ---
+
+# Text of each indexed section, correlated on the outer `cvs` row aliased `c`
+# (user_id is the partition key, so it keeps the lookups to one partition)
+PG_EXPERIENCE_TEXT = "(SELECT string_agg(concat_ws(' ', e.position, e.company, e.description), ' ') FROM experiences e WHERE e.cv_id = c.id AND e.user_id = c.user_id)"
+PG_PROJECT_TEXT = "(SELECT string_agg(concat_ws(' ', p.name, p.description), ' ') FROM projects p WHERE p.cv_id = c.id AND p.user_id = c.user_id)"
+PG_SKILL_TEXT = "(SELECT string_agg(s.name, ', ') FROM skills s WHERE s.cv_id = c.id AND s.user_id = c.user_id)"
+PG_CUSTOM_TEXT = "(SELECT string_agg(value, ' ') FROM jsonb_each_text(CASE WHEN jsonb_typeof(c.custom_sections) = 'object' THEN c.custom_sections ELSE '{}'::jsonb END))"
+
+PG_SEARCH_VECTOR = f"""
+    setweight(to_tsvector('english', coalesce(c.name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(c.summary, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({PG_SKILL_TEXT}, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({PG_EXPERIENCE_TEXT}, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce({PG_PROJECT_TEXT}, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce({PG_CUSTOM_TEXT}, '')), 'D')
+"""
+
+PG_DOCUMENT = f"concat_ws(' ... ', c.name, c.summary, {PG_SKILL_TEXT}, {PG_EXPERIENCE_TEXT}, {PG_PROJECT_TEXT}, {PG_CUSTOM_TEXT})"
+
+PG_SEARCH_QUERY = f"""
+    WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query),
+    ranked AS (
+        SELECT c.id, c.user_id, ts_rank_cd(c.search_vector, q.query) AS rank
+        FROM cvs c, q
+        WHERE c.user_id = CAST(:user_id AS uuid) AND c.search_vector @@ q.query
+        ORDER BY rank DESC
+        LIMIT :limit
+    )
+    SELECT c.id, c.name, r.rank,
+           ts_headline('english', {PG_DOCUMENT}, q.query,
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxFragments=2, MinWords=5, MaxWords=20') AS snippet
+    FROM ranked r JOIN cvs c ON c.id = r.id AND c.user_id = r.user_id, q
+    ORDER BY r.rank DESC
+"""
+
+# --- SQLite ---
+
+FTS_TABLE = "cv_search"
+FTS_COLUMNS = ["name", "summary", "skills", "experience", "projects", "other"]
+# bm25 column weights, in FTS_COLUMNS order (the UNINDEXED columns come first)
+FTS_WEIGHTS = "0, 0, 10.0, 5.0, 5.0, 2.0, 2.0, 1.0"
+
+_fts_available = True
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the search index structures and backfill CVs missing from them."""
+    global _fts_available
+    with engine.begin() as conn:
+        if is_sqlite:
+            try:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    f"cv_id UNINDEXED, user_id UNINDEXED, {', '.join(FTS_COLUMNS)}, "
+                    f"tokenize='porter unicode61')"
+                ))
+            except Exception as e:
+                _fts_available = False
+                logger.warning(f"FTS5 is not available in this SQLite build, search is disabled: {str(e)}")
+                return
+            # The index holds ids as text, so compare them in their canonical form
+            indexed = set(conn.execute(text(f"SELECT cv_id FROM {FTS_TABLE}")).scalars())
+            missing = [cv_id for cv_id in conn.execute(select(models.CV.id)).scalars() if str(cv_id) not in indexed]
+            if missing:
+                with Session(bind=conn) as db:
+                    for cv_id in missing:
+                        _index_sqlite(db, cv_id)
+                    db.flush()
+                logger.info(f"Backfilled search index for {len(missing)} CVs")
+        else:
+            conn.execute(text("ALTER TABLE cvs ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cvs_search_vector ON cvs USING GIN (search_vector)"))
+            result = conn.execute(text(f"UPDATE cvs c SET search_vector = {PG_SEARCH_VECTOR} WHERE c.search_vector IS NULL"))
+            if result.rowcount:
+                logger.info(f"Backfilled search index for {result.rowcount} CVs")
+
+def check_search_index(engine: Engine) -> bool:
+    """Check at startup that the migration step created the index; search is disabled without it."""
+    global _fts_available
+    with engine.connect() as conn:
+        if is_sqlite:
+            _fts_available = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            ).first() is not None
+            available = _fts_available
+        else:
+            available = conn.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_cvs_search_vector'")
+            ).first() is not None
+    if not available:
+        logger.warning("Search index not found, run the migration step (python -m app.migrate)")
+    return available
+
+def index_cv(db: Session, cv_id, user_id) -> None:
+    """
+    Refresh the search index entry for one CV.
+
+    Call this after modifying the CV or its sections and before committing,
+    so the index update is part of the same transaction.
+    """
+    db.flush()
+    if is_sqlite:
+        if _fts_available:
+            _index_sqlite(db, cv_id)
+    else:
+        db.execute(
+            text(f"UPDATE cvs c SET search_vector = {PG_SEARCH_VECTOR} WHERE c.id = :cv_id AND c.user_id = :user_id"),
+            {"cv_id": cv_id, "user_id": user_id}
+        )
+
+def remove_cv(db: Session, cv_id) -> None:
+    """Remove a deleted CV from the index (the tsvector goes with the row on PostgreSQL)."""
+    if is_sqlite and _fts_available:
+        db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE cv_id = :cv_id"), {"cv_id": _id_text(cv_id)})
+
+def _id_text(value) -> str:
+    """An id as stored in the FTS table: hyphenated for UUIDs, as it is otherwise (development user ids)"""
+    return str(uuid.UUID(str(value))) if models.is_uuid(value) else str(value)
+
+def _join(values: List[Optional[str]], sep: str = " ") -> str:
+    return sep.join(value for value in values if value)
+
+def _index_sqlite(db: Session, cv_id) -> None:
+    cv_id = _id_text(cv_id)
+    cv = db.query(models.CV.user_id, models.CV.name, models.CV.summary, models.CV.custom_sections).filter(models.CV.id == cv_id).first()
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE cv_id = :cv_id"), {"cv_id": cv_id})
+    if cv is None:
+        return
+
+    experiences = db.query(models.Experience.position, models.Experience.company, models.Experience.description).filter(models.Experience.cv_id == cv_id).all()
+    projects = db.query(models.Project.name, models.Project.description).filter(models.Project.cv_id == cv_id).all()
+    skills = db.query(models.Skill.name).filter(models.Skill.cv_id == cv_id).all()
+
+    custom_sections = cv.custom_sections if isinstance(cv.custom_sections, dict) else {}
+    other = _join([value for value in custom_sections.values() if isinstance(value, str)])
+
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE} (cv_id, user_id, {', '.join(FTS_COLUMNS)}) "
+             f"VALUES (:cv_id, :user_id, :name, :summary, :skills, :experience, :projects, :other)"),
+        {
+            "cv_id": cv_id,
+            "user_id": str(cv.user_id),
+            "name": cv.name,
+            "summary": cv.summary or "",
+            "skills": _join([row.name for row in skills], ", "),
+            "experience": _join([_join(list(row)) for row in experiences]),
+            "projects": _join([_join(list(row)) for row in projects]),
+            "other": other,
+        }
+    )
+
+def _fts_match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query of quoted prefix terms (implicit AND)."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _highlight(snippet: Optional[str]) -> str:
+    """Escape a snippet of CV text for HTML and wrap its matches in <mark> tags."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+
+class SearchUnavailableError(Exception):
+    """The database has no full-text search support."""
+    pass
+
+def search_cvs(db: Session, user_id: str, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Search one user's CVs, best match first.
+
+    Returns:
+        A list of {"id", "name", "rank", "snippet"} dicts, where higher rank is
+        better and the snippet is HTML-escaped text with the matched terms
+        wrapped in <mark> tags
+    """
+    if is_sqlite:
+        if not _fts_available:
+            raise SearchUnavailableError("Full-text search is not available on this database")
+        match = _fts_match_expression(query)
+        if match is None:
+            return []
+        rows = db.execute(
+            text(f"SELECT cv_id AS id, name, -bm25({FTS_TABLE}, {FTS_WEIGHTS}) AS rank, "
+                 f"snippet({FTS_TABLE}, -1, '{SNIPPET_START}', '{SNIPPET_END}', ' ... ', 16) AS snippet "
+                 f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND user_id = :user_id "
+                 f"ORDER BY rank DESC LIMIT :limit"),
+            {"match": match, "user_id": _id_text(user_id), "limit": limit}
+        ).mappings().all()
+    elif not models.is_uuid(user_id):
+        # cvs.user_id is a uuid column, so no CV can belong to this user; the CAST would fail
+        return []
+    else:
+        rows = db.execute(
+            text(PG_SEARCH_QUERY),
+            {"query": query, "user_id": _id_text(user_id), "limit": limit}
+        ).mappings().all()
+
+    return [
+        {
+            "id": str(row["id"]),
+            "name": row["name"],
+            "rank": float(row["rank"]),
+            "snippet": _highlight(row["snippet"]),
+        }
+        for row in rows
+    ]
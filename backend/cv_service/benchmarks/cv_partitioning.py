@@ -0,0 +1,161 @@
+"""
+List/get latency benchmark for CV storage at scale, with or without hash partitioning.
+
+Generates CVs (with a few skill rows each) directly in PostgreSQL using
+generate_series, then times the service's list and get queries for random
+users and CVs. Run it twice against separate, empty databases to compare:
+
+    cd backend/cv_service
+    DATABASE_URL=postgresql://.../cv_bench_plain CV_PARTITIONS=0 python -m benchmarks.cv_partitioning
+    DATABASE_URL=postgresql://.../cv_bench_hash16 CV_PARTITIONS=16 python -m benchmarks.cv_partitioning
+
+Loading 10M CVs takes a long time and a lot of disk; use --cvs
+for a smaller run and --skip-load to re-measure an existing data set.
+"""
+import argparse
+import hashlib
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from sqlalchemy import desc, text
+from sqlalchemy.orm import selectinload
+
+from app.database import Base, SessionLocal, engine, is_sqlite
+from app import models
+from app.partitioning import CV_PARTITIONS, is_partitioned
+
+LOAD_SQL = """
+    WITH new_cvs AS (
+        INSERT INTO cvs (id, user_id, name, description, is_default, version, template_id, summary,
+                         last_modified, created_at, updated_at)
+        SELECT gen_random_uuid(),
+               md5((g % :users)::text)::uuid,
+               'CV ' || g,
+               'Generated by the partitioning benchmark',
+               g < :users,
+               1 + (g % 7),
+               'default',
+               'Engineer with ' || (g % 20) || ' years of experience in distributed systems',
+               now() - (g % 1000) * interval '1 hour',
+               now() - (g % 1000) * interval '1 hour',
+               now()
+        FROM generate_series(:start, :stop - 1) AS g
+        RETURNING id, user_id
+    )
+    INSERT INTO skills (id, cv_id, user_id, name, level, included, "order", created_at, updated_at)
+    SELECT gen_random_uuid(), c.id, c.user_id, 'Skill ' || s, 1 + s % 5, true, s, now(), now()
+    FROM new_cvs c CROSS JOIN generate_series(1, :skills_per_cv) AS s
+"""
+
+def user_uuid(n: int) -> uuid.UUID:
+    """The user id generated for user number n (matches md5(n::text)::uuid)."""
+    return uuid.UUID(hashlib.md5(str(n).encode()).hexdigest())
+
+def load(cvs: int, users: int, skills_per_cv: int, batch: int) -> None:
+    start_time = time.perf_counter()
+    for start in range(0, cvs, batch):
+        stop = min(cvs, start + batch)
+        with engine.begin() as conn:
+            conn.execute(text(LOAD_SQL), {"start": start, "stop": stop, "users": users, "skills_per_cv": skills_per_cv})
+        rate = stop / (time.perf_counter() - start_time)
+        print(f"  loaded {stop:,}/{cvs:,} CVs ({rate:,.0f}/s)", flush=True)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ("cvs", "skills"):
+            conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+def list_cvs(db, user_id: uuid.UUID) -> None:
+    # Same queries as GET /api/cv on a cold cache
+    rows = db.query(models.CV.id, models.CV.version).filter(models.CV.user_id == user_id).order_by(
+        desc(models.CV.is_default), desc(models.CV.last_modified)
+    ).all()
+    if rows:
+        db.query(models.CV).filter(models.CV.id.in_([row.id for row in rows]), models.CV.user_id == user_id).all()
+    db.expunge_all()
+
+def get_cv(db, cv_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    # Same queries as GET /api/cv/{id} on a cold cache, with sections loaded
+    db.query(models.CV.id, models.CV.version).filter(models.CV.id == cv_id, models.CV.user_id == user_id).first()
+    db.query(models.CV).options(selectinload(models.CV.skills)).filter(
+        models.CV.id == cv_id, models.CV.user_id == user_id
+    ).first()
+    db.expunge_all()
+
+def measure(name: str, samples: int, fn: Callable[[], None]) -> Dict[str, float]:
+    timings: List[float] = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    result = {
+        "mean": statistics.fmean(timings),
+        "p50": timings[len(timings) // 2],
+        "p95": timings[int(len(timings) * 0.95)],
+        "p99": timings[int(len(timings) * 0.99)],
+    }
+    print(f"  {name:<6} mean {result['mean']:7.2f}ms  p50 {result['p50']:7.2f}ms  "
+          f"p95 {result['p95']:7.2f}ms  p99 {result['p99']:7.2f}ms")
+    return result
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cvs", type=int, default=10_000_000, help="Number of CVs to generate")
+    parser.add_argument("--users", type=int, default=2_000_000, help="Number of distinct users")
+    parser.add_argument("--skills-per-cv", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=250_000, help="CVs inserted per transaction")
+    parser.add_argument("--samples", type=int, default=2000, help="Timed requests per query type")
+    parser.add_argument("--skip-load", action="store_true", help="Measure the data already in the database")
+    args = parser.parse_args()
+
+    if is_sqlite:
+        print("This benchmark needs PostgreSQL (set DATABASE_URL)", file=sys.stderr)
+        return 1
+
+    print(f"Schema: {'hash partitioned, ' + str(CV_PARTITIONS) + ' partitions' if is_partitioned else 'unpartitioned'}")
+    Base.metadata.create_all(bind=engine)
+
+    if not args.skip_load:
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT EXISTS (SELECT 1 FROM cvs)")).scalar():
+                print("cvs is not empty; use an empty database or --skip-load", file=sys.stderr)
+                return 1
+        print(f"Loading {args.cvs:,} CVs for {args.users:,} users...")
+        load(args.cvs, args.users, args.skills_per_cv, args.batch)
+
+    with engine.connect() as conn:
+        total = conn.execute(text(
+            "SELECT sum(reltuples)::bigint FROM pg_class "
+            "WHERE relkind = 'r' AND (relname = 'cvs' OR relname LIKE 'cvs\\_p%')"
+        )).scalar()
+        size = conn.execute(text(
+            "SELECT pg_size_pretty(sum(pg_total_relation_size(c.oid))) FROM pg_class c "
+            "WHERE c.relkind IN ('r', 'p') AND (c.relname = 'cvs' OR c.relname LIKE 'cvs\\_p%')"
+        )).scalar()
+        sample_cvs = conn.execute(text(
+            "SELECT id, user_id FROM cvs TABLESAMPLE SYSTEM (1) LIMIT :n"
+        ), {"n": args.samples}).all()
+    print(f"cvs: ~{total:,} rows, {size}")
+
+    random.seed(42)
+    with SessionLocal() as db:
+        plan = db.execute(text(
+            "EXPLAIN SELECT id, version FROM cvs WHERE user_id = :user_id ORDER BY is_default DESC, last_modified DESC"
+        ), {"user_id": user_uuid(1)}).scalars().all()
+        print("List query plan:\n    " + "\n    ".join(plan))
+
+        # Warm up connections and the catalog cache
+        for n in range(20):
+            list_cvs(db, user_uuid(n))
+
+        print(f"Latency over {args.samples} requests:")
+        measure("list", args.samples, lambda: list_cvs(db, user_uuid(random.randrange(args.users))))
+        picks = iter(random.choices(sample_cvs, k=args.samples))
+        measure("get", args.samples, lambda: get_cv(db, *next(picks)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
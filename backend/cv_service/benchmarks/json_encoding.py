@@ -0,0 +1,135 @@
+"""
+JSON response encoding benchmark on representative CV payloads.
+
+Compares FastAPI's default path (jsonable_encoder, then JSONResponse with
+stdlib json) with the shared FastJSONResponse encoder (orjson when
+installed), for a single large CV as returned by GET /api/cv/{id}, a
+20-CV list as returned by GET /api/cv, and a CV built from Pydantic
+models with datetime and UUID fields:
+
+    cd backend/cv_service
+    python -m benchmarks.json_encoding
+"""
+import argparse
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# backend/ holds the shared package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from shared.responses import FastJSONResponse, orjson
+
+START = datetime(2015, 3, 1, 9, 30)
+
+class Experience(BaseModel):
+    id: uuid.UUID
+    company: str
+    position: str
+    start_date: datetime
+    end_date: Optional[datetime]
+    description: str
+    included: bool
+    order: int
+
+class CVModel(BaseModel):
+    id: uuid.UUID
+    user_id: uuid.UUID
+    name: str
+    summary: str
+    experiences: List[Experience]
+    skills: List[str]
+    last_modified: datetime
+
+def experience(n: int) -> Dict[str, Any]:
+    return {
+        "id": uuid.UUID(int=n),
+        "company": f"Company {n} Ltd",
+        "position": "Senior Software Engineer",
+        "start_date": START + timedelta(days=400 * n),
+        "end_date": START + timedelta(days=400 * n + 380),
+        "description": "Led the migration of a monolith to event-driven services. " * 6,
+        "included": True,
+        "order": n,
+    }
+
+def cv_document(n: int, sections: int) -> Dict[str, Any]:
+    """A CV as serialize_cv() returns it: ids and dates already strings."""
+    return {
+        "id": str(uuid.UUID(int=n)),
+        "user_id": str(uuid.UUID(int=1)),
+        "metadata": {
+            "name": f"CV {n}",
+            "description": "Tailored for platform engineering roles",
+            "is_default": n == 0,
+            "version": 12,
+            "last_modified": START.isoformat(),
+        },
+        "content": {
+            "template_id": "modern",
+            "style_options": {"font": "Inter", "accent": "#1f6feb", "columns": 2},
+            "personal_info": {"name": "Jane Smith", "email": "jane@example.com", "phone": "+44 20 7946 0000",
+                              "links": ["https://github.com/jane", "https://jane.dev"]},
+            "summary": "Engineer with ten years of experience in distributed systems. " * 4,
+            "custom_sections": {f"section_{i}": ["Open source maintainer", "Conference speaker"] for i in range(3)},
+            "experiences": [
+                {**exp, "id": str(exp["id"]), "start_date": exp["start_date"].isoformat(), "end_date": exp["end_date"].isoformat()}
+                for exp in (experience(i) for i in range(sections))
+            ],
+            "skills": [{"name": f"Skill {i}", "level": i % 5, "included": True, "order": i} for i in range(sections * 3)],
+        },
+        "created_at": START.isoformat(),
+        "updated_at": START.isoformat(),
+    }
+
+def cv_model(sections: int) -> CVModel:
+    return CVModel(
+        id=uuid.UUID(int=7),
+        user_id=uuid.UUID(int=1),
+        name="CV 7",
+        summary="Engineer with ten years of experience in distributed systems. " * 4,
+        experiences=[Experience(**experience(i)) for i in range(sections)],
+        skills=[f"Skill {i}" for i in range(sections * 3)],
+        last_modified=START,
+    )
+
+def default_encoding(payload: Any) -> bytes:
+    # What FastAPI does for a route without a response_model
+    return JSONResponse(jsonable_encoder(payload)).body
+
+def fast_encoding(payload: Any) -> bytes:
+    # What a hot route that returns a FastJSONResponse itself sends
+    return FastJSONResponse(payload).body
+
+def measure(fn: Callable[[], bytes], number: int) -> float:
+    """Best per-call time in microseconds over five runs."""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sections", type=int, default=15, help="Experiences per CV (skills are 3x this)")
+    parser.add_argument("--number", type=int, default=200, help="Encodings per timing run")
+    args = parser.parse_args()
+
+    payloads = {
+        "single CV": cv_document(0, args.sections),
+        "CV list (20)": [cv_document(n, args.sections) for n in range(20)],
+        "Pydantic CV": cv_model(args.sections),
+    }
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'payload':<14} {'size':>9} {'default':>11} {'fast':>11} {'speedup':>8}")
+    for name, payload in payloads.items():
+        size = len(fast_encoding(payload))
+        default = measure(lambda: default_encoding(payload), args.number)
+        fast = measure(lambda: fast_encoding(payload), args.number)
+        print(f"{name:<14} {size / 1024:7.1f}KB {default:9.1f}us {fast:9.1f}us {default / fast:7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Single-node read/write throughput of the CV schema on SQLite or PostgreSQL.
+
+Runs the service's CV write and read paths through the ORM from several
+threads: writes create a CV with its sections in one transaction, reads
+load a CV with every section. Run it once per database, each against an
+empty database:
+
+    cd backend/cv_service
+    DATABASE_URL=sqlite:////tmp/cv_bench.db python -m benchmarks.single_node
+    DATABASE_URL=postgresql://.../cv_bench python -m benchmarks.single_node
+"""
+import argparse
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import selectinload
+
+from app.database import Base, SessionLocal, engine, is_sqlite
+from app import models
+
+SECTION_LOADS = [selectinload(getattr(models.CV, name)) for name in (
+    "experiences", "education", "skills", "languages", "projects", "certifications", "references"
+)]
+
+def create_cv(user_id: uuid.UUID, n: int) -> uuid.UUID:
+    with SessionLocal() as db:
+        cv = models.CV(
+            user_id=user_id,
+            name=f"CV {n}",
+            template_id="default",
+            summary="Engineer with ten years of experience in distributed systems.",
+            style_options={"font": "Inter"},
+            personal_info={"name": "Jane Smith", "email": "jane@example.com"},
+            custom_sections={},
+        )
+        for i in range(5):
+            cv.experiences.append(models.Experience(
+                user_id=user_id, company=f"Company {i}", position="Engineer", start_date="2018-01",
+                end_date="2020-01", description="Built and ran production services. " * 5, order=i
+            ))
+        for i in range(2):
+            cv.education.append(models.Education(
+                user_id=user_id, institution=f"University {i}", degree="BSc", field_of_study="Computer Science",
+                start_date="2010-09", end_date="2013-06", order=i
+            ))
+        for i in range(10):
+            cv.skills.append(models.Skill(user_id=user_id, name=f"Skill {i}", level=1 + i % 5, order=i))
+        db.add(cv)
+        db.commit()
+        return cv.id
+
+def read_cv(cv_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    with SessionLocal() as db:
+        cv = db.query(models.CV).options(*SECTION_LOADS).filter(
+            models.CV.id == cv_id, models.CV.user_id == user_id
+        ).one()
+        # Touch what serialize_cv() reads
+        [(e.company, e.description) for e in cv.experiences]
+        [(e.institution, e.degree) for e in cv.education]
+        [s.name for s in cv.skills]
+
+def run(name: str, threads: int, seconds: float, op: Callable[[random.Random], None]) -> Dict[str, float]:
+    """Run `op` from `threads` threads for `seconds` and report throughput and latency."""
+    timings: List[List[float]] = [[] for _ in range(threads)]
+    errors = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index: int) -> None:
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                op(rng)
+            except Exception:
+                errors[index] += 1
+                continue
+            timings[index].append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = sorted(ms for per_thread in timings for ms in per_thread)
+    result = {
+        "ops_per_second": len(samples) / elapsed,
+        "p50": samples[len(samples) // 2] if samples else 0.0,
+        "p99": samples[int(len(samples) * 0.99)] if samples else 0.0,
+        "mean": statistics.fmean(samples) if samples else 0.0,
+        "errors": sum(errors),
+    }
+    print(f"  {name:<12} {result['ops_per_second']:8.0f} ops/s  mean {result['mean']:6.2f}ms  "
+          f"p50 {result['p50']:6.2f}ms  p99 {result['p99']:6.2f}ms  errors {result['errors']}")
+    return result
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent workers")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each phase")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed-cvs", type=int, default=5000, help="CVs created before the read phase")
+    args = parser.parse_args()
+    # Writers queueing for SQLite's write lock would flood the slow query log
+    logging.getLogger("cv_database.slow_query").setLevel(logging.ERROR)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT COUNT(*) FROM cvs")).scalar():
+            print("cvs is not empty; use an empty database", file=sys.stderr)
+            return 1
+        if is_sqlite:
+            settings = {p: conn.execute(text(f"PRAGMA {p}")).scalar() for p in ("journal_mode", "synchronous", "mmap_size", "busy_timeout")}
+            print(f"Database: SQLite {conn.execute(text('SELECT sqlite_version()')).scalar()} {settings}")
+        else:
+            print(f"Database: {conn.execute(text('SELECT version()')).scalar().split(',')[0]}")
+
+    users = [uuid.uuid4() for _ in range(args.users)]
+    print(f"Seeding {args.seed_cvs:,} CVs...")
+    cvs = [(create_cv(users[n % len(users)], n), users[n % len(users)]) for n in range(args.seed_cvs)]
+
+    counter = iter(range(args.seed_cvs, 10**9))
+    lock = threading.Lock()
+
+    def write(rng: random.Random) -> None:
+        with lock:
+            n = next(counter)
+        create_cv(users[rng.randrange(len(users))], n)
+
+    def read(rng: random.Random) -> None:
+        read_cv(*cvs[rng.randrange(len(cvs))])
+
+    def mixed(rng: random.Random) -> None:
+        (write if rng.random() < 0.2 else read)(rng)
+
+    print(f"{args.threads} threads, {args.seconds:.0f}s per phase:")
+    run("write", args.threads, args.seconds, write)
+    run("read", args.threads, args.seconds, read)
+    run("80/20 mixed", args.threads, args.seconds, mixed)
+    with SessionLocal() as db:
+        print(f"CVs at end: {db.query(func.count(models.CV.id)).scalar():,}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,13 @@
 Development starter script for CV Management Service
 This script:
 1. Sets up environment variables
-2. Creates the SQLite database if it doesn't exist
+2. Creates the SQLite database if it doesn't exist and migrates it otherwise
 3. Runs the CV Management Service
 """
 import os
 import sys
 import logging
 import sqlite3
-import json
 import uvicorn
 from datetime import datetime
 
@@ -20,10 +19,12 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from backend.cv_service.app.models import Base, Template, CV
     from backend.cv_service.app.database import engine
+    from backend.cv_service.app.migrate import migrate
 except ImportError:
     try:
         from app.models import Base, Template, CV
         from app.database import engine
+        from app.migrate import migrate
     except ImportError:
         print("Could not import database models. Make sure you're in the correct directory.")
         sys.exit(1)
@@ -60,15 +61,16 @@ def set_environment_variables():
     os.environ["LOCAL_STORAGE_PATH"] = "./uploads"
 
 def setup_database():
-    """Create the SQLite database if it doesn't exist."""
+    """Create the SQLite database if it doesn't exist, and migrate it if it does."""
     if os.path.exists(DB_FILE):
         logger.info(f"Database file already exists: {DB_FILE}")
+        migrate(engine)
         return
     
     logger.info(f"Creating new database: {DB_FILE}")
     
-    # Create tables
-    Base.metadata.create_all(engine)
+    # Create tables (the service itself no longer does this at startup)
+    migrate(engine)
     logger.info("Database tables created")
     
     # Seed some data
@@ -102,11 +104,11 @@ def seed_database():
                 "description": "A clean and professional CV template.",
                 "category": "Professional",
                 "is_premium": False,
-                "style_options": json.dumps({
+                "style_options": {
                     "color_scheme": "blue",
                     "font_family": "Roboto",
                     "layout": "standard"
-                })
+                }
             },
             {
                 "id": "modern",
@@ -115,11 +117,11 @@ def seed_database():
                 "description": "A modern and creative CV template.",
                 "category": "Creative",
                 "is_premium": False,
-                "style_options": json.dumps({
+                "style_options": {
                     "color_scheme": "teal",
                     "font_family": "Montserrat",
                     "layout": "sidebar"
-                })
+                }
             },
             {
                 "id": "minimalist",
@@ -128,11 +130,11 @@ def seed_database():
                 "description": "A simple and minimalist CV template.",
                 "category": "Simple",
                 "is_premium": False,
-                "style_options": json.dumps({
+                "style_options": {
                     "color_scheme": "grayscale",
                     "font_family": "Open Sans",
                     "layout": "compact"
-                })
+                }
             }
         ]
         
@@ -0,0 +1,52 @@
+"""Copy the owning user_id onto CV section and revision rows
+
+Revision ID: 0001_section_user_id
+Revises:
+Create Date: 2026-10-19
+
+The user_id is the partition key used by 0002_hash_partition_cvs. Having it on
+section rows also lets section lookups filter by user without joining cvs.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitioning import SECTION_TABLES
+
+revision = "0001_section_user_id"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = SECTION_TABLES + ["cv_revisions"]
+
+
+def _user_id_type(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import UUID
+        return UUID(as_uuid=True)
+    return sa.String(36)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in TABLES:
+        if table not in existing_tables or "user_id" in {c["name"] for c in inspector.get_columns(table)}:
+            # Created by create_all() with the column already in place
+            continue
+        op.add_column(table, sa.Column("user_id", _user_id_type(bind.dialect.name), nullable=True))
+        op.execute(f'UPDATE "{table}" SET user_id = (SELECT cvs.user_id FROM cvs WHERE cvs.id = "{table}".cv_id)')
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("user_id", existing_type=_user_id_type(bind.dialect.name), nullable=False)
+        if table != "cv_revisions":
+            op.create_index(f"ix_{table}_user_id_cv_id", table, ["user_id", "cv_id"])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        if table != "cv_revisions":
+            op.drop_index(f"ix_{table}_user_id_cv_id", table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("user_id")
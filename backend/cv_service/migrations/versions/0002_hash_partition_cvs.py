@@ -0,0 +1,90 @@
+"""Hash-partition cvs and its section tables by user_id
+
+Revision ID: 0002_hash_partition_cvs
+Revises: 0001_section_user_id
+Create Date: 2026-10-19
+
+PostgreSQL only. It runs when CV_PARTITIONS is set to the number of
+partitions, and it must use the same value the service runs with. Each table
+is copied into a new partitioned table under an exclusive lock, so run it in
+a maintenance window. Large tables take a while. With CV_PARTITIONS unset
+or 0, the migration changes nothing. To partition later, run
+`alembic downgrade 0001_section_user_id` and then upgrade again with
+CV_PARTITIONS set. On an unpartitioned database the downgrade is also a
+no-op.
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from app.partitioning import CV_PARTITIONS, SECTION_TABLES, is_table_partitioned, rebuild_table
+
+revision = "0002_hash_partition_cvs"
+down_revision = "0001_section_user_id"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+PARTITIONED_TABLES = ["cvs"] + SECTION_TABLES
+
+
+def _rebuild_all(partitions: int) -> None:
+    """Rebuild cvs and its sections (partitioned or plain) and restore keys, indexes and foreign keys."""
+    bind = op.get_bind()
+    has_search_vector = bind.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = 'cvs' AND column_name = 'search_vector')"
+    )).scalar()
+    # Databases from before revision history get the table, keyed to match, in 0005_cv_revisions
+    has_revisions = "cv_revisions" in sa.inspect(bind).get_table_names()
+
+    # Revisions reference cvs but are not partitioned; drop the FK while cvs is swapped
+    if has_revisions:
+        op.execute('ALTER TABLE cv_revisions DROP CONSTRAINT IF EXISTS cv_revisions_cv_id_fkey')
+        op.execute('ALTER TABLE cv_revisions DROP CONSTRAINT IF EXISTS cv_revisions_cv_id_user_id_fkey')
+
+    for table in PARTITIONED_TABLES:
+        rebuild_table(bind, table, partitions)
+    for table in reversed(PARTITIONED_TABLES):
+        op.execute(f'DROP TABLE "{table}_old" CASCADE')
+
+    primary_key = "(id, user_id)" if partitions else "(id)"
+    op.execute(f"ALTER TABLE cvs ADD CONSTRAINT cvs_pkey PRIMARY KEY {primary_key}")
+    op.execute("CREATE INDEX ix_cvs_user_id ON cvs (user_id)")
+    op.execute("CREATE UNIQUE INDEX uq_cvs_user_default ON cvs (user_id) WHERE is_default")
+    if has_search_vector:
+        op.execute("CREATE INDEX ix_cvs_search_vector ON cvs USING GIN (search_vector)")
+
+    if partitions:
+        foreign_key = "FOREIGN KEY (cv_id, user_id) REFERENCES cvs (id, user_id) ON DELETE CASCADE"
+    else:
+        foreign_key = "FOREIGN KEY (cv_id) REFERENCES cvs (id) ON DELETE CASCADE"
+    for table in SECTION_TABLES:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY {primary_key}')
+        op.execute(f'CREATE INDEX "ix_{table}_user_id_cv_id" ON "{table}" (user_id, cv_id)')
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_cv_id_fkey" {foreign_key}')
+    if has_revisions:
+        op.execute(f"ALTER TABLE cv_revisions ADD CONSTRAINT cv_revisions_cv_id_fkey {foreign_key}")
+
+    op.execute("ANALYZE cvs")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or CV_PARTITIONS <= 0:
+        logger.info("CV_PARTITIONS is not set (or not PostgreSQL); leaving CV tables unpartitioned")
+        return
+    if is_table_partitioned(bind, "cvs"):
+        logger.info("cvs is already partitioned")
+        return
+    _rebuild_all(CV_PARTITIONS)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_table_partitioned(bind, "cvs"):
+        return
+    _rebuild_all(0)
@@ -0,0 +1,32 @@
+"""Add the CV change outbox and feed cursor tables
+
+Revision ID: 0003_cv_outbox
+Revises: 0002_hash_partition_cvs
+Create Date: 2026-10-19
+
+Neither table references cvs, so they are created unpartitioned whatever
+CV_PARTITIONS is set to.
+"""
+from alembic import op
+
+from app import models
+
+revision = "0003_cv_outbox"
+down_revision = "0002_hash_partition_cvs"
+branch_labels = None
+depends_on = None
+
+TABLES = [models.CVChange.__table__, models.ChangeFeedCursor.__table__]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table in TABLES:
+        # Skipped when create_all() has already made the table
+        table.create(bind, checkfirst=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in reversed(TABLES):
+        table.drop(bind, checkfirst=True)
@@ -0,0 +1,51 @@
+"""Store SQLite ids in the portable Uuid format
+
+Revision ID: 0004_portable_uuid_ids
+Revises: 0003_cv_outbox
+Create Date: 2026-10-19
+
+SQLite databases used to keep ids as dashed 36-character strings. The
+portable Uuid type stores them as 32 lowercase hex digits, so existing ids are
+rewritten in place. JSON columns already hold JSON text and are left as they
+are. Values that are not UUIDs (such as user ids from development tokens)
+are not changed. PostgreSQL already uses native UUID and JSONB columns, so
+there the migration does nothing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitioning import SECTION_TABLES
+
+revision = "0004_portable_uuid_ids"
+down_revision = "0003_cv_outbox"
+branch_labels = None
+depends_on = None
+
+ID_COLUMNS = {
+    "cvs": ["id", "user_id"],
+    **{table: ["id", "cv_id", "user_id"] for table in SECTION_TABLES},
+    "cv_revisions": ["id", "cv_id", "user_id"],
+    "cv_outbox": ["cv_id", "user_id"],
+}
+
+
+def _rewrite(expression) -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    existing_tables = set(sa.inspect(bind).get_table_names())
+    # Foreign keys are not enforced on the migration connection, so referenced ids can change in any order
+    for table, columns in ID_COLUMNS.items():
+        if table in existing_tables:
+            op.execute(f'UPDATE "{table}" SET {", ".join(f"{column} = {expression(column)}" for column in columns)}')
+
+
+def upgrade() -> None:
+    _rewrite(lambda column: f"CASE WHEN length({column}) = 36 THEN lower(replace({column}, '-', '')) ELSE {column} END")
+
+
+def downgrade() -> None:
+    _rewrite(lambda column: (
+        f"CASE WHEN length({column}) = 32 THEN substr({column}, 1, 8) || '-' || substr({column}, 9, 4) || '-' || "
+        f"substr({column}, 13, 4) || '-' || substr({column}, 17, 4) || '-' || substr({column}, 21) ELSE {column} END"
+    ))
@@ -0,0 +1,32 @@
+"""Add the CV revision history table
+
+Revision ID: 0005_cv_revisions
+Revises: 0004_portable_uuid_ids
+Create Date: 2026-10-19
+
+Databases created before revision history existed have no cv_revisions
+table, and 0001_section_user_id only adds user_id to it where it already
+exists. The table is created from the model, with its unique (cv_id,
+version) index and its foreign key to cvs (the composite one when
+CV_PARTITIONS is set), after 0004 so it starts out with portable ids.
+Databases that already have the table are left as they are.
+"""
+from alembic import op
+
+from app import models
+
+revision = "0005_cv_revisions"
+down_revision = "0004_portable_uuid_ids"
+branch_labels = None
+depends_on = None
+
+TABLE = models.CVRevision.__table__
+
+
+def upgrade() -> None:
+    # Skipped when create_all() has already made the table
+    TABLE.create(op.get_bind(), checkfirst=True)
+
+
+def downgrade() -> None:
+    TABLE.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,145 @@
+-- SQLite schema of a CV service database from before the Alembic migrations,
+-- as create_all() made it. tests/test_migrations.py upgrades it.
+
+CREATE TABLE cvs (
+	id VARCHAR(36) NOT NULL,
+	user_id VARCHAR(36) NOT NULL,
+	style_options VARCHAR,
+	personal_info VARCHAR,
+	custom_sections VARCHAR,
+	name VARCHAR(255) NOT NULL,
+	description TEXT,
+	is_default BOOLEAN,
+	version INTEGER,
+	template_id VARCHAR(50) NOT NULL,
+	summary TEXT,
+	last_modified DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE INDEX ix_cvs_user_id ON cvs (user_id);
+
+CREATE TABLE templates (
+	id VARCHAR(50) NOT NULL,
+	name VARCHAR(255) NOT NULL,
+	preview_image_url VARCHAR(255),
+	description TEXT,
+	category VARCHAR(100) NOT NULL,
+	is_premium BOOLEAN,
+	style_options VARCHAR,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE experiences (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	company VARCHAR(255) NOT NULL,
+	position VARCHAR(255) NOT NULL,
+	start_date VARCHAR(7) NOT NULL,
+	end_date VARCHAR(7),
+	description TEXT,
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE education (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	institution VARCHAR(255) NOT NULL,
+	degree VARCHAR(255) NOT NULL,
+	field_of_study VARCHAR(255) NOT NULL,
+	start_date VARCHAR(7) NOT NULL,
+	end_date VARCHAR(7),
+	description TEXT,
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE skills (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	name VARCHAR(255) NOT NULL,
+	level INTEGER,
+	category VARCHAR(100),
+	years_of_experience INTEGER,
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE languages (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	name VARCHAR(255) NOT NULL,
+	proficiency VARCHAR(50) NOT NULL,
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE projects (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	name VARCHAR(255) NOT NULL,
+	description TEXT,
+	url VARCHAR(255),
+	start_date VARCHAR(7),
+	end_date VARCHAR(7),
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE certifications (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	name VARCHAR(255) NOT NULL,
+	issuer VARCHAR(255) NOT NULL,
+	date_issued VARCHAR(7) NOT NULL,
+	date_expires VARCHAR(7),
+	credential_id VARCHAR(255),
+	url VARCHAR(255),
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
+
+CREATE TABLE "references" (
+	id VARCHAR(36) NOT NULL,
+	cv_id VARCHAR(36) NOT NULL,
+	name VARCHAR(255) NOT NULL,
+	company VARCHAR(255),
+	position VARCHAR(255),
+	email VARCHAR(255),
+	phone VARCHAR(50),
+	included BOOLEAN,
+	"order" INTEGER,
+	created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(cv_id) REFERENCES cvs (id) ON DELETE CASCADE
+);
@@ -0,0 +1,59 @@
+"""
+Test setup for the CV service.
+
+The service reads its configuration from the environment when it is
+imported, so the database is pointed at a temporary SQLite file before
+`app` is imported, and the schema is created the way a deploy creates it
+(app.migrate). Run from backend/cv_service:
+
+    python -m pytest
+"""
+import io
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The service's `app` package, and `shared` from backend/
+sys.path[:0] = [SERVICE_DIR, os.path.dirname(SERVICE_DIR)]
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cv_service_test.db')}")
+
+import docx
+import jwt
+from fastapi.testclient import TestClient
+
+from app.main import JWT_ALGORITHM, JWT_SECRET, app
+from app.migrate import migrate
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+@pytest.fixture(scope="session")
+def client():
+    migrate()
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def user_headers():
+    """Authorization headers for a user of its own, so tests don't see each other's CVs"""
+    token = jwt.encode({"user_id": f"test-user-{uuid.uuid4().hex[:8]}"}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def upload_cv(client, user_headers):
+    """Create a CV from a small DOCX upload and return it as the API serializes it"""
+    def upload(name: str = "cv", text: str = "Jane Smith\nSkills\nPython, SQL") -> dict:
+        document = docx.Document()
+        for line in text.splitlines():
+            document.add_paragraph(line)
+        buffer = io.BytesIO()
+        document.save(buffer)
+        response = client.post(
+            "/api/cv", headers=user_headers, files={"file": (f"{name}.docx", buffer.getvalue(), DOCX_TYPE)}
+        )
+        assert response.status_code == 201, response.text
+        return response.json()
+    return upload
@@ -0,0 +1,95 @@
+"""CV cache: owner checks and invalidation by version."""
+import uuid
+
+import jwt
+
+from app.cache import ENTRY_OVERHEAD_BYTES, CVCache, cv_cache
+from app.main import JWT_ALGORITHM, JWT_SECRET
+
+class FakeRedis:
+    """The part of the redis client the shared tier uses, over a dict"""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+def test_entry_is_only_served_for_its_version_and_owner():
+    cache = CVCache(redis_url=None)
+    cache.put("cv-1", 2, "alice", b"v2")
+
+    assert cache.get("cv-1", 2, "alice") == b"v2"
+    assert cache.get("cv-1", 2, "mallory") is None
+    assert cache.get("cv-1", 1, "alice") is None
+    assert cache.get("cv-1", 3, "alice") is None
+
+def test_older_version_does_not_replace_a_newer_one():
+    cache = CVCache(redis_url=None)
+    cache.put("cv-1", 3, "alice", b"v3")
+    cache.put("cv-1", 2, "alice", b"v2")
+
+    assert cache.get("cv-1", 3, "alice") == b"v3"
+    assert cache.stats()["entries"] == 1
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = CVCache(max_entries=10, max_bytes=2 * (ENTRY_OVERHEAD_BYTES + 100), redis_url=None)
+    cache.put("a", 1, "alice", b"x" * 100)
+    cache.put("b", 1, "alice", b"x" * 100)
+    cache.get("a", 1, "alice")
+    cache.put("c", 1, "alice", b"x" * 100)
+
+    assert cache.get("b", 1, "alice") is None
+    assert cache.get("a", 1, "alice") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidation_drops_the_previous_version_from_both_tiers():
+    shared = FakeRedis()
+    cache = CVCache(redis_url=None)
+    cache._shared = shared
+    cache.put("cv-1", 1, "alice", b"v1")
+    assert "cv:cv-1:1" in shared.values
+
+    cache.invalidate("cv-1", 1)
+
+    assert cache.get("cv-1", 1, "alice") is None
+    assert shared.values == {}
+
+def test_shared_tier_warms_a_cold_worker():
+    shared = FakeRedis()
+    writer, reader = CVCache(redis_url=None), CVCache(redis_url=None)
+    writer._shared = reader._shared = shared
+    writer.put("cv-1", 1, "alice", b"v1")
+
+    assert reader.get("cv-1", 1, "alice") == b"v1"
+    assert reader.stats()["shared_hits"] == 1
+    assert reader.get("cv-1", 1, "alice") == b"v1"
+    assert reader.stats()["hits"] == 1
+
+def test_cached_cv_is_not_served_to_another_user(client, user_headers, upload_cv):
+    cv = upload_cv("private")
+    assert client.get(f"/api/cv/{cv['id']}", headers=user_headers).status_code == 200
+    assert cv_cache.get(cv["id"], 1, cv["user_id"]) is not None
+    other_headers = {"Authorization": "Bearer " + jwt.encode(
+        {"user_id": f"test-user-{uuid.uuid4().hex[:8]}"}, JWT_SECRET, algorithm=JWT_ALGORITHM
+    )}
+
+    assert client.get(f"/api/cv/{cv['id']}", headers=other_headers).status_code == 404
+
+def test_write_makes_reads_return_the_new_version(client, user_headers, upload_cv):
+    cv = upload_cv("edited")
+    assert client.get(f"/api/cv/{cv['id']}", headers=user_headers).json()["metadata"]["version"] == 1
+
+    client.put(f"/api/cv/{cv['id']}/content", headers=user_headers, json={"summary": "Rewritten"})
+    current = client.get(f"/api/cv/{cv['id']}", headers=user_headers).json()
+
+    assert current["metadata"]["version"] == 2
+    assert current["content"]["summary"] == "Rewritten"
+    assert cv_cache.get(cv["id"], 1, cv["user_id"]) is None
@@ -0,0 +1,119 @@
+"""Upload parsing: content sniffing, the upload cap, and parser processes."""
+import asyncio
+import io
+import multiprocessing
+import time
+
+import docx
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app import cv_parser
+
+def docx_bytes(text: str = "Jane Smith\nSkills\nPython, SQL") -> bytes:
+    document = docx.Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+def upload(content: bytes, filename: str = "cv.docx") -> UploadFile:
+    return UploadFile(io.BytesIO(content), size=len(content), filename=filename)
+
+def _slow_pdf_parser(kind: str, conn) -> None:
+    """Parser process entry point that never finishes a PDF"""
+    if kind == "pdf":
+        time.sleep(60)
+    cv_parser._parser_process(kind, conn)
+
+def test_type_is_sniffed_from_the_content():
+    assert cv_parser.sniff_document_type(b"%PDF-1.7\n...") == cv_parser.PDF_MIME
+    assert cv_parser.sniff_document_type(docx_bytes()[:cv_parser.SNIFF_BYTES]) == cv_parser.DOCX_MIME
+    assert cv_parser.sniff_document_type(b"PK\x03\x04 an ordinary zip") is None
+    assert cv_parser.sniff_document_type(b"Jane Smith, Python, SQL") is None
+
+def test_upload_named_as_a_document_is_refused_by_its_content(client, user_headers):
+    response = client.post(
+        "/api/cv", headers=user_headers, files={"file": ("cv.docx", b"Jane Smith\nSkills\nPython", cv_parser.DOCX_MIME)}
+    )
+
+    assert response.status_code == 415
+
+def test_oversized_body_is_refused_before_it_is_read():
+    called = []
+
+    async def app(scope, receive, send):
+        called.append(scope)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        raise AssertionError("the body was read")
+
+    limit = cv_parser.UploadSizeLimit(app, max_bytes=100)
+    scope = {
+        "type": "http", "path": "/api/cv",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=x"), (b"content-length", b"101")],
+    }
+    asyncio.run(limit(scope, receive, send))
+
+    assert called == []
+    assert sent[0]["status"] == 413
+
+def test_body_without_length_is_cut_off_at_the_cap():
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+
+    chunks = iter([b"x" * 60, b"x" * 60, b"x" * 60])
+
+    async def receive():
+        return {"type": "http.request", "body": next(chunks), "more_body": True}
+
+    limit = cv_parser.UploadSizeLimit(app, max_bytes=100)
+    scope = {"type": "http", "path": "/api/cv", "headers": [(b"content-type", b"multipart/form-data; boundary=x")]}
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(limit(scope, receive, lambda message: None))
+
+    assert refused.value.status_code == 413
+    # The third chunk was never received
+    assert next(chunks) == b"x" * 60
+
+def test_upload_over_the_cap_is_refused_without_parsing(monkeypatch):
+    monkeypatch.setattr(cv_parser, "MAX_UPLOAD_BYTES", 1000)
+    content = docx_bytes()
+    assert len(content) > 1000
+
+    with pytest.raises(cv_parser.UploadTooLargeError):
+        asyncio.run(cv_parser.parse_upload(upload(content)))
+    assert multiprocessing.active_children() == []
+
+def test_upload_is_parsed_in_a_process_that_exits():
+    parsed = asyncio.run(cv_parser.parse_upload(upload(docx_bytes("Jane Smith\njane@example.com\nSkills\nPython, SQL"))))
+
+    assert parsed["personal_info"] == {"full_name": "Jane Smith", "email": "jane@example.com"}
+    assert parsed["skills"] == ["Python", "SQL"]
+    assert multiprocessing.active_children() == []
+
+def test_timed_out_parse_is_killed_without_failing_other_parses(monkeypatch):
+    monkeypatch.setattr(cv_parser, "PARSER_TIMEOUT_SECONDS", 2)
+    monkeypatch.setattr(cv_parser, "_parser_process", _slow_pdf_parser)
+
+    async def parse_both():
+        return await asyncio.gather(
+            cv_parser.parse_upload(upload(b"%PDF-1.7\n" + b"0" * 100_000, "slow.pdf")),
+            cv_parser.parse_upload(upload(docx_bytes())),
+            return_exceptions=True,
+        )
+
+    started = time.monotonic()
+    slow, fast = asyncio.run(parse_both())
+
+    assert isinstance(slow, cv_parser.ParserTimeoutError)
+    assert fast["skills"] == ["Python", "SQL"]
+    assert time.monotonic() - started < 10
+    assert multiprocessing.active_children() == []
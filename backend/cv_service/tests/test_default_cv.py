@@ -0,0 +1,71 @@
+"""Default-CV switching: one default per user, even under concurrent switches."""
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+def make_default(client, headers, cv_id):
+    return client.put(f"/api/cv/{cv_id}/metadata", headers=headers, json={"is_default": True})
+
+def current(client, headers, cv_id) -> dict:
+    return client.get(f"/api/cv/{cv_id}", headers=headers).json()["metadata"]
+
+def assert_history_complete(client, headers, cv_id):
+    """Every version of the CV has a revision, and the latest matches the CV"""
+    metadata = current(client, headers, cv_id)
+    listed = client.get(f"/api/cv/{cv_id}/revisions", headers=headers).json()["revisions"]
+    assert [revision["version"] for revision in listed] == list(range(metadata["version"], 0, -1))
+    latest = client.get(f"/api/cv/{cv_id}/revisions/{metadata['version']}", headers=headers).json()
+    assert latest["metadata"]["is_default"] == metadata["is_default"]
+
+def test_switching_clears_the_previous_default(client, user_headers, upload_cv):
+    first, second = upload_cv("first"), upload_cv("second")
+
+    assert make_default(client, user_headers, first["id"]).status_code == 200
+    assert make_default(client, user_headers, second["id"]).status_code == 200
+
+    cleared = current(client, user_headers, first["id"])
+    assert cleared["is_default"] is False
+    # Cleared with a version bump of its own
+    assert cleared["version"] == 3
+    assert current(client, user_headers, second["id"])["is_default"] is True
+    assert_history_complete(client, user_headers, first["id"])
+    assert_history_complete(client, user_headers, second["id"])
+
+def test_making_the_default_default_again_changes_nothing_else(client, user_headers, upload_cv):
+    only = upload_cv("only")
+
+    make_default(client, user_headers, only["id"])
+    response = make_default(client, user_headers, only["id"])
+
+    assert response.status_code == 200
+    assert response.json()["metadata"]["is_default"] is True
+    assert_history_complete(client, user_headers, only["id"])
+
+def test_concurrent_switches_leave_one_default(client, user_headers, upload_cv):
+    cv_ids = [upload_cv(f"concurrent-{i}")["id"] for i in range(6)]
+    make_default(client, user_headers, cv_ids[0])
+    start = threading.Barrier(len(cv_ids))
+    statuses = {}
+
+    def switch(cv_id):
+        # A client per thread, so the requests really overlap
+        with TestClient(app) as own_client:
+            start.wait()
+            statuses[cv_id] = make_default(own_client, user_headers, cv_id).status_code
+
+    threads = [threading.Thread(target=switch, args=(cv_id,)) for cv_id in cv_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # A switch that keeps losing the race is refused, never half applied
+    assert set(statuses.values()) <= {200, 409}
+    assert 200 in statuses.values()
+    defaults = [cv_id for cv_id in cv_ids if current(client, user_headers, cv_id)["is_default"]]
+    assert len(defaults) == 1
+    assert statuses[defaults[0]] == 200
+    for cv_id in cv_ids:
+        assert_history_complete(client, user_headers, cv_id)
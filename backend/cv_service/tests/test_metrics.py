@@ -0,0 +1,47 @@
+"""Prometheus metrics: requests are labelled by route template, and /metrics is served."""
+from prometheus_client import REGISTRY
+
+from shared import metrics
+
+def requests_total(method: str, route: str, status: str) -> float:
+    labels = {"service": "cv_service", "method": method, "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+
+def test_requests_are_counted_by_route_template(client, user_headers, upload_cv):
+    cv = upload_cv("metrics")
+    before = requests_total("GET", "/api/cv/{cv_id}", "200")
+    missing = requests_total("GET", "/api/cv/{cv_id}", "404")
+
+    client.get(f"/api/cv/{cv['id']}", headers=user_headers)
+    client.get("/api/cv/00000000-0000-0000-0000-000000000000", headers=user_headers)
+
+    assert requests_total("GET", "/api/cv/{cv_id}", "200") == before + 1
+    assert requests_total("GET", "/api/cv/{cv_id}", "404") == missing + 1
+
+def test_unmatched_paths_share_one_series(client):
+    before = requests_total("GET", metrics.UNMATCHED, "404")
+
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+
+    assert requests_total("GET", metrics.UNMATCHED, "404") == before + 2
+
+def test_body_sizes_and_latency_are_observed(client, user_headers):
+    labels = {"service": "cv_service", "method": "GET", "route": "/api/cv"}
+    count = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0.0
+    sent = REGISTRY.get_sample_value("http_response_size_bytes_sum", labels) or 0.0
+
+    response = client.get("/api/cv", headers=user_headers)
+
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) == count + 1
+    assert REGISTRY.get_sample_value("http_response_size_bytes_sum", labels) == sent + len(response.content)
+    assert REGISTRY.get_sample_value("http_requests_in_progress", {"service": "cv_service", "method": "GET"}) == 0
+
+def test_metrics_endpoint_requires_the_token_when_one_is_set(client, monkeypatch):
+    assert "http_requests_total" in client.get("/metrics").text
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
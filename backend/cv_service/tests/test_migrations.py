@@ -0,0 +1,76 @@
+"""Upgrading a database created before the Alembic migrations."""
+import os
+import uuid
+
+import jwt
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import get_db_session
+from app.main import JWT_ALGORITHM, JWT_SECRET, app
+from app.migrate import migrate, schema_status
+from app.replicas import get_read_db_session
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_schema.sql")
+
+@pytest.fixture
+def baseline_engine(tmp_path, monkeypatch):
+    """An engine on a database with the pre-migration schema, which Alembic runs against"""
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    with open(BASELINE_SCHEMA) as f:
+        engine.raw_connection().executescript(f.read())
+    monkeypatch.setattr(database, "DATABASE_URL", url)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def serve_from(client):
+    """Point the API's sessions at another database for the rest of the test"""
+    def serve(engine):
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def session():
+            db = Session()
+            try:
+                yield db
+                db.commit()
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db_session] = session
+        app.dependency_overrides[get_read_db_session] = session
+    yield serve
+    app.dependency_overrides.clear()
+
+def test_baseline_database_is_upgraded_and_accepts_writes(baseline_engine, serve_from, client, user_headers, upload_cv):
+    token = user_headers["Authorization"].split()[1]
+    user_id = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])["user_id"]
+    existing_id = str(uuid.uuid4())
+    with baseline_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO cvs (id, user_id, name, is_default, version, template_id) VALUES (?, ?, 'Old CV', 0, 1, 'default')",
+            (existing_id, user_id),
+        )
+
+    migrate(baseline_engine)
+
+    assert schema_status(baseline_engine)["state"] == "current"
+    inspector = inspect(baseline_engine)
+    assert "cv_revisions" in inspector.get_table_names()
+    assert {tuple(c["column_names"]) for c in inspector.get_unique_constraints("cv_revisions")} == {("cv_id", "version")}
+    assert [(fk["referred_table"], fk["constrained_columns"]) for fk in inspector.get_foreign_keys("cv_revisions")] == [
+        ("cvs", ["cv_id"])
+    ]
+
+    serve_from(baseline_engine)
+    created = upload_cv("after upgrade")
+    updated = client.put(f"/api/cv/{existing_id}/content", headers=user_headers, json={"summary": "Rewritten"})
+
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["metadata"]["version"] == 2
+    for cv_id, version in ((created["id"], 1), (existing_id, 2)):
+        listed = client.get(f"/api/cv/{cv_id}/revisions", headers=user_headers).json()
+        assert [revision["version"] for revision in listed["revisions"]] == [version]
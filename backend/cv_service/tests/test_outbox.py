@@ -0,0 +1,86 @@
+"""Change feed: at-least-once delivery and resuming from a cursor."""
+import asyncio
+import json
+
+import jwt
+
+from app import outbox
+from app.main import JWT_ALGORITHM, JWT_SECRET
+
+def user_of(headers) -> str:
+    return jwt.decode(headers["Authorization"].split()[1], JWT_SECRET, algorithms=[JWT_ALGORITHM])["user_id"]
+
+def poll(client, headers, **params) -> dict:
+    outbox.publish_pending()
+    response = client.get("/api/cv/changes", headers=headers, params={"consumer": "indexer", **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_writes_are_published_in_commit_order(client, user_headers, upload_cv):
+    cv = upload_cv("feed")
+    client.put(f"/api/cv/{cv['id']}/content", headers=user_headers, json={"summary": "Rewritten"})
+
+    events = poll(client, user_headers)["events"]
+
+    assert [(event["cv_id"], event["kind"], event["version"]) for event in events] == [
+        (cv["id"], outbox.CREATED, 1), (cv["id"], outbox.UPDATED, 2)
+    ]
+    assert events[1]["changed"] == ["summary"]
+    assert events[0]["position"] < events[1]["position"]
+
+def test_unacknowledged_events_are_delivered_again(client, user_headers, upload_cv):
+    upload_cv("first")
+    first = poll(client, user_headers)
+    again = poll(client, user_headers)
+
+    assert again["events"] == first["events"]
+
+    client.post("/api/cv/changes/ack", headers=user_headers, json={"consumer": "indexer", "cursor": first["cursor"]})
+    second = upload_cv("second")
+    resumed = poll(client, user_headers)
+
+    assert [event["cv_id"] for event in resumed["events"]] == [second["id"]]
+    assert resumed["events"][0]["position"] > first["cursor"]
+
+def test_cursor_only_moves_forward_and_not_past_the_head(client, user_headers, upload_cv):
+    upload_cv("one")
+    upload_cv("two")
+    events = poll(client, user_headers)["events"]
+
+    def ack(cursor):
+        return client.post(
+            "/api/cv/changes/ack", headers=user_headers, json={"consumer": "indexer", "cursor": cursor}
+        ).json()["cursor"]
+
+    assert ack(events[1]["position"]) == events[1]["position"]
+    assert ack(events[0]["position"]) == events[1]["position"]
+    assert ack(10 ** 9) == outbox.publish_pending()
+
+def test_cursors_are_kept_per_consumer(client, user_headers, upload_cv):
+    upload_cv("shared")
+    cursor = poll(client, user_headers)["cursor"]
+    client.post("/api/cv/changes/ack", headers=user_headers, json={"consumer": "indexer", "cursor": cursor})
+
+    assert poll(client, user_headers)["events"] == []
+    assert len(poll(client, user_headers, consumer="mailer")["events"]) == 1
+
+def test_stream_resumes_after_the_last_event_id(client, user_headers, upload_cv):
+    upload_cv("one")
+    second = upload_cv("two")
+    user_id = user_of(user_headers)
+    first_position, second_position = (event["position"] for event in poll(client, user_headers)["events"])
+    checks = iter([False, True])
+
+    async def is_disconnected():
+        return next(checks)
+
+    async def read_stream():
+        return [message async for message in outbox.stream_changes(first_position, user_id, is_disconnected)]
+
+    messages = asyncio.run(read_stream())
+
+    assert messages[0] == "retry: 3000\n\n"
+    assert len(messages) == 2
+    lines = messages[1].splitlines()
+    assert lines[:2] == [f"id: {second_position}", "event: cv.change"]
+    assert json.loads(lines[2][len("data: "):])["cv_id"] == second["id"]
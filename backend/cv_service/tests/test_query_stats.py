@@ -0,0 +1,52 @@
+"""Query instrumentation: per-request statistics, Server-Timing and the slow-query log."""
+import logging
+
+from sqlalchemy import text
+
+from app import database
+from app.database import QueryStats, SessionLocal, current_request_id, start_query_stats
+
+def test_stats_keep_the_slowest_statements(monkeypatch):
+    monkeypatch.setattr(database, "QUERY_STATS_TOP_N", 2)
+    stats = QueryStats("req-1")
+    for statement, ms in (("a", 5.0), ("b", 50.0), ("c", 1.0), ("d", 20.0)):
+        stats.record(statement, ms)
+
+    assert stats.count == 4
+    assert stats.total_ms == 76.0
+    assert stats.slowest == [(50.0, "b"), (20.0, "d")]
+    assert stats.server_timing() == 'db;dur=76.0;desc="4 queries"'
+
+def test_statements_are_recorded_against_the_current_request():
+    stats = start_query_stats("req-2")
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+    finally:
+        db.close()
+
+    assert current_request_id() == "req-2"
+    assert stats.count == 2
+    assert sorted(statement for _, statement in stats.slowest) == ["SELECT 1", "SELECT 2"]
+
+def test_slow_queries_are_logged_with_the_request_id(monkeypatch, caplog):
+    monkeypatch.setattr(database, "SLOW_QUERY_MS", 0)
+    start_query_stats("req-3")
+    db = SessionLocal()
+    try:
+        with caplog.at_level(logging.WARNING, logger="cv_database.slow_query"):
+            db.execute(text("SELECT   42"))
+    finally:
+        db.close()
+
+    assert any("request req-3" in r.message and "SELECT 42" in r.message for r in caplog.records)
+
+def test_response_reports_database_time_and_request_id(client, user_headers):
+    response = client.get("/api/cv", headers={**user_headers, "X-Request-ID": "req-4"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-4"
+    db_timing = response.headers["Server-Timing"].split(", ")[0]
+    assert db_timing.startswith("db;dur=") and db_timing.endswith('queries"')
+    assert "app;dur=" in response.headers["Server-Timing"]
@@ -0,0 +1,45 @@
+"""Startup warm-up: steps run in order, and a failed step is retried with the ones after it."""
+import asyncio
+import time
+
+from shared import readiness
+from shared.readiness import WarmUp
+
+def test_failed_step_is_retried_until_the_service_is_ready(monkeypatch):
+    monkeypatch.setattr(readiness, "WARMUP_RETRY_SECONDS", 0.01)
+    calls = []
+    attempts = iter([RuntimeError("database is not reachable"), None])
+
+    def connect():
+        calls.append("connect")
+        error = next(attempts)
+        if error:
+            raise error
+        return {"attempt": len(calls)}
+
+    warmup = WarmUp([("load", lambda: calls.append("load")), ("connect", connect), ("check", lambda: calls.append("check"))])
+
+    async def run():
+        warmup.start()
+        await asyncio.sleep(0)
+        while not warmup.ready:
+            await asyncio.sleep(0.01)
+        await warmup.stop()
+
+    asyncio.run(run())
+
+    assert calls == ["load", "connect", "connect", "check"]
+    status = warmup.status()
+    assert status["status"] == "ready"
+    assert status["steps"]["connect"]["detail"] == {"attempt": 3}
+    assert status["steps"]["check"]["status"] == "ok"
+
+def test_ready_endpoint_reports_the_warm_up(client):
+    deadline = time.monotonic() + 10
+    response = client.get("/api/ready")
+    while response.status_code == 503 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = client.get("/api/ready")
+
+    assert response.status_code == 200, response.text
+    assert set(response.json()["steps"]) == {"schema", "search_index"}
@@ -0,0 +1,84 @@
+"""Revision history: patches, rebuilding old versions, diffs and restores."""
+import copy
+
+from app import revisions
+
+def document_of(cv: dict) -> dict:
+    return revisions.to_document(cv)
+
+def test_diff_and_apply_patch_round_trip():
+    old = {
+        "metadata": {"name": "CV", "description": None, "is_default": False},
+        "content": {"summary": "Old", "a/b": {"x~y": 1, "gone": True}, "skills": ["Python", "SQL"]},
+    }
+    new = {
+        "metadata": {"name": "CV", "description": "Now described", "is_default": True},
+        "content": {"summary": "New", "a/b": {"x~y": 2}, "skills": ["Python"], "added": {"k": [1, 2]}},
+    }
+
+    patch = revisions.diff(old, new)
+
+    assert revisions.apply_patch(copy.deepcopy(old), patch) == new
+    assert revisions.diff(new, new) == []
+    # Lists are replaced whole, keys with "/" and "~" are escaped
+    assert {"op": "replace", "path": "/content/skills", "value": ["Python"]} in patch
+    assert {"op": "replace", "path": "/content/a~1b/x~0y", "value": 2} in patch
+    assert {"op": "remove", "path": "/content/a~1b/gone"} in patch
+
+def test_every_version_can_be_rebuilt(client, user_headers, upload_cv):
+    cv = upload_cv("history")
+    documents = {1: document_of(cv)}
+    # Enough writes to start a new snapshot chain
+    for version in range(2, revisions.SNAPSHOT_INTERVAL + 4):
+        if version % 3:
+            body = {"summary": f"Summary {version}", "personal_info": {"name": "Jane", "revision": version}}
+            response = client.put(f"/api/cv/{cv['id']}/content", headers=user_headers, json=body)
+        else:
+            response = client.put(f"/api/cv/{cv['id']}/metadata", headers=user_headers, json={"name": f"CV {version}"})
+        assert response.status_code == 200, response.text
+        assert response.json()["metadata"]["version"] == version
+        documents[version] = document_of(response.json())
+
+    listed = client.get(f"/api/cv/{cv['id']}/revisions", headers=user_headers).json()
+    assert [revision["version"] for revision in listed["revisions"]] == sorted(documents, reverse=True)
+    assert [revision["kind"] for revision in listed["revisions"]].count(revisions.SNAPSHOT) == 2
+
+    for version, document in documents.items():
+        stored = client.get(f"/api/cv/{cv['id']}/revisions/{version}", headers=user_headers).json()
+        assert {"metadata": stored["metadata"], "content": stored["content"]} == document
+
+def test_diff_turns_one_version_into_another(client, user_headers, upload_cv):
+    cv = upload_cv("diffed")
+    client.put(f"/api/cv/{cv['id']}/content", headers=user_headers, json={"summary": "Second"})
+    current = client.put(f"/api/cv/{cv['id']}/metadata", headers=user_headers, json={"description": "Third"}).json()
+
+    response = client.get(f"/api/cv/{cv['id']}/revisions/1/diff", headers=user_headers)
+
+    assert response.status_code == 200
+    assert response.json()["to_version"] == 3
+    assert revisions.apply_patch(document_of(cv), response.json()["patch"]) == document_of(current)
+
+    back = client.get(f"/api/cv/{cv['id']}/revisions/3/diff", headers=user_headers, params={"against": 1}).json()
+    assert revisions.apply_patch(document_of(current), back["patch"]) == document_of(cv)
+
+def test_restore_is_a_new_version_that_can_be_undone(client, user_headers, upload_cv):
+    cv = upload_cv("restored")
+    edited = client.put(
+        f"/api/cv/{cv['id']}/content", headers=user_headers, json={"summary": "Rewritten", "personal_info": {}}
+    ).json()
+
+    restored = client.post(f"/api/cv/{cv['id']}/revisions/1/restore", headers=user_headers)
+
+    assert restored.status_code == 200
+    assert restored.json()["metadata"]["version"] == 3
+    assert document_of(restored.json()) == document_of(cv)
+
+    undone = client.post(f"/api/cv/{cv['id']}/revisions/2/restore", headers=user_headers).json()
+    assert undone["metadata"]["version"] == 4
+    assert document_of(undone) == document_of(edited)
+
+def test_unknown_version_is_not_found(client, user_headers, upload_cv):
+    cv = upload_cv("short")
+
+    assert client.get(f"/api/cv/{cv['id']}/revisions/7", headers=user_headers).status_code == 404
+    assert client.post(f"/api/cv/{cv['id']}/revisions/7/restore", headers=user_headers).status_code == 404
@@ -0,0 +1,61 @@
+"""Full-text search: ranking, scoping to the user, and snippet highlighting."""
+import uuid
+
+import jwt
+
+from app import search
+from app.main import JWT_ALGORITHM, JWT_SECRET
+
+def search_for(client, headers, q: str) -> list:
+    response = client.get("/api/cv/search", headers=headers, params={"q": q})
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+def test_name_and_summary_matches_outrank_other_sections(client, user_headers, upload_cv):
+    passing = upload_cv("notes", "Jane Smith\nExperience\nOnce deployed a Kubernetes cluster")
+    central = upload_cv("Kubernetes engineer", "Jane Smith\nSummary\nRuns Kubernetes clusters in production")
+    upload_cv("unrelated", "Jane Smith\nSkills\nPython, SQL")
+
+    results = search_for(client, user_headers, "kubernetes")
+
+    assert [result["id"] for result in results] == [central["id"], passing["id"]]
+    assert results[0]["rank"] > results[1]["rank"]
+
+def test_terms_match_as_prefixes_and_must_all_match(client, user_headers, upload_cv):
+    cv = upload_cv("cv", "Jane Smith\nSummary\nPostgreSQL performance tuning")
+
+    assert [result["id"] for result in search_for(client, user_headers, "postg tun")] == [cv["id"]]
+    assert search_for(client, user_headers, "postgres kubernetes") == []
+
+def test_search_only_sees_the_users_own_cvs(client, user_headers, upload_cv):
+    own = upload_cv("mine", "Jane Smith\nSummary\nHaskell compilers")
+    other_headers = {"Authorization": "Bearer " + jwt.encode(
+        {"user_id": f"test-user-{uuid.uuid4().hex[:8]}"}, JWT_SECRET, algorithm=JWT_ALGORITHM
+    )}
+
+    assert [result["id"] for result in search_for(client, user_headers, "haskell")] == [own["id"]]
+    assert search_for(client, other_headers, "haskell") == []
+
+def test_snippet_is_escaped_before_matches_are_marked(client, user_headers, upload_cv):
+    upload_cv("markup", "Jane Smith\nSummary\nWrote <script>alert('erlang')</script> & more Erlang")
+
+    snippet = search_for(client, user_headers, "erlang")[0]["snippet"]
+
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet
+    assert "&amp; more <mark>Erlang</mark>" in snippet
+
+def test_highlight_only_turns_the_match_markers_into_tags():
+    marked = f"{search.SNIPPET_START}a<b>{search.SNIPPET_END} \"<mark>\""
+
+    assert search._highlight(marked) == "<mark>a&lt;b&gt;</mark> &quot;&lt;mark&gt;&quot;"
+    assert search._highlight(None) == ""
+
+def test_postgres_search_for_a_non_uuid_user_finds_nothing(monkeypatch):
+    class NoQueries:
+        def execute(self, *args, **kwargs):
+            raise AssertionError("cvs.user_id is a uuid column; the query would fail")
+
+    monkeypatch.setattr(search, "is_sqlite", False)
+
+    assert search.search_cvs(NoQueries(), "dev-user", "python") == []
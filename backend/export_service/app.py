@@ -1,17 +1,31 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import logging
 
 # Import routers and modules
 from app.health import router as health_router
 from app.routes import router as export_router
-from app.export_manager import ExportManager
+from app.cv_service_client import check_jwt_secret
+from app.export_manager import job_poller
+from app.janitor import janitor
+from app.readiness import warmup
+from app.render_pool import render_pool
+
+logger = logging.getLogger("export_service")
 
 # Environment variables
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost,http://localhost:3000,https://candidatev.vercel.app").split(",")
 
+# Fast JSON encoding shared by the backend services (needs backend/ on PYTHONPATH)
+try:
+    from shared.responses import FastJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+    logger.warning("shared.responses not available - using FastAPI's default JSON encoding")
+
 # Create FastAPI app
-app = FastAPI(title="CandidateV Export Service")
+app = FastAPI(title="CandidateV Export Service", default_response_class=FastJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -31,14 +45,54 @@ app.include_router(export_router)
 async def root():
     return {"message": "CandidateV Export Service"}
 
-# Schedule cleanup of old exports at startup
+# Fail fast rather than sign service tokens with the development secret
+@app.on_event("startup")
+async def check_configuration():
+    check_jwt_secret()
+
+# Start the render workers in the background (gates /api/ready)
 @app.on_event("startup")
-async def startup_event(background_tasks: BackgroundTasks):
-    # Schedule periodic cleanup
-    await ExportManager.schedule_cleanup(background_tasks)
-    
-    # Run initial cleanup
-    await ExportManager.cleanup_old_exports()
+async def start_warmup():
+    if warmup is not None:
+        warmup.start()
+
+# Pick up export jobs that were left pending or abandoned by another worker
+@app.on_event("startup")
+async def start_job_poller():
+    job_poller.start()
+
+@app.on_event("shutdown")
+async def stop_job_poller():
+    await job_poller.stop()
+
+@app.on_event("shutdown")
+async def stop_warmup():
+    if warmup is not None:
+        await warmup.stop()
+    render_pool.shutdown()
+
+# Delete expired exports and keep the export directory within its quota
+@app.on_event("startup")
+async def start_janitor():
+    janitor.start()
+
+@app.on_event("shutdown")
+async def stop_janitor():
+    await janitor.stop()
+
+# Prometheus metrics at /metrics, outside the other middleware
+try:
+    from shared.metrics import instrument
+    instrument(app, "export_service")
+except ImportError:
+    logger.warning("shared.metrics not available - /metrics is disabled")
+
+# Tracing goes outermost, so its span covers the metrics middleware as well
+try:
+    from shared.tracing import setup_tracing
+    setup_tracing(app, "export_service")
+except ImportError:
+    logger.warning("shared.tracing not available - requests are not traced")
 
 # For testing and development
 if __name__ == "__main__":
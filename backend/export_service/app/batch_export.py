@@ -0,0 +1,141 @@
+"""
+Batch exports streamed as a ZIP archive.
+
+A batch exports several CVs, each in one or more formats, in a single
+request. The response is a ZIP archive that is written while it is
+streamed:
+
+- CVs are fetched from the CV service in parallel, at most
+  EXPORT_BATCH_FETCH_CONCURRENCY at a time. Each CV is fetched once,
+  however many formats it is exported in.
+- Documents are rendered in memory on the render pool. Each document is
+  admitted by the export scheduler and waits for its turn like a single
+  export, so a batch counts as one export per document against the user's
+  allowance and is interleaved fairly with other users' exports. Each
+  document goes into the archive as soon as it is ready, in completion
+  order.
+- At most EXPORT_BATCH_RENDER_AHEAD documents are rendered but not yet sent,
+  so a slow client holds back rendering instead of filling memory. The
+  archive is never held in memory as a whole.
+- Documents are stored, not deflated: PDFs and DOCX files are compressed
+  already.
+
+A CV that can't be fetched or rendered doesn't fail the batch. Its failures
+are listed in an `errors.json` entry at the end of the archive.
+"""
+import asyncio
+import json
+import logging
+import os
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.cv_service_client import fetch_cv_data
+from app.document_generator import DocumentGenerator
+from app.scheduler import Ticket
+
+# Set up logging
+logger = logging.getLogger("export_service.batch_export")
+
+# Environment variables
+EXPORT_BATCH_MAX_DOCUMENTS = int(os.getenv("EXPORT_BATCH_MAX_DOCUMENTS", "100"))
+EXPORT_BATCH_FETCH_CONCURRENCY = int(os.getenv("EXPORT_BATCH_FETCH_CONCURRENCY", "8"))
+EXPORT_BATCH_RENDER_AHEAD = int(os.getenv("EXPORT_BATCH_RENDER_AHEAD", "4"))
+
+class _ZipSink:
+    """Write-only stream for ZipFile that buffers the bytes written since the last drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _error_message(error: Exception) -> str:
+    return getattr(error, "detail", None) or str(error) or type(error).__name__
+
+async def stream_batch_zip(
+    cv_ids: List[str],
+    formats: List[str],
+    template_options: Optional[Dict[str, Any]],
+    token: str,
+    tickets: List[Ticket]
+) -> AsyncIterator[bytes]:
+    """
+    Export every CV in every format, yielding a ZIP archive of the documents piece by piece.
+
+    Args:
+        cv_ids: The IDs of the CVs to export
+        formats: The formats to export each CV to (pdf, docx)
+        template_options: Template options applied to every document
+        token: The requester's JWT, used to fetch the CVs
+        tickets: One admitted scheduler ticket per document, CV by CV and
+            format by format; those still unused when the stream ends are cancelled
+    """
+    sink = _ZipSink()
+    # The sink can't seek, so ZipFile writes sizes after each entry's data
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    fetch_slots = asyncio.Semaphore(max(EXPORT_BATCH_FETCH_CONCURRENCY, 1))
+    ahead = asyncio.Semaphore(max(EXPORT_BATCH_RENDER_AHEAD, 1))
+    failures: List[Dict[str, str]] = []
+
+    async def fetch(cv_id: str) -> Dict[str, Any]:
+        async with fetch_slots:
+            return await fetch_cv_data(cv_id, token)
+
+    fetches = {cv_id: asyncio.create_task(fetch(cv_id)) for cv_id in cv_ids}
+
+    async def export(cv_id: str, format: str, ticket: Ticket) -> Tuple[str, str, Optional[bytes], Optional[str]]:
+        try:
+            cv_data = await fetches[cv_id]
+        except Exception as e:
+            ticket.cancel()
+            return cv_id, format, None, f"Failed to fetch CV: {_error_message(e)}"
+        # Released once the document has been written to the archive
+        await ahead.acquire()
+        try:
+            async with ticket:
+                content = await DocumentGenerator.generate_document_bytes(cv_data, format, template_options)
+            return cv_id, format, content, None
+        except Exception as e:
+            ahead.release()
+            return cv_id, format, None, f"Failed to render: {_error_message(e)}"
+
+    documents = [(cv_id, format) for cv_id in cv_ids for format in formats]
+    exports = [
+        asyncio.create_task(export(cv_id, format, ticket)) for (cv_id, format), ticket in zip(documents, tickets)
+    ]
+    try:
+        for next_done in asyncio.as_completed(exports):
+            cv_id, format, content, error = await next_done
+            if content is None:
+                logger.warning(f"Batch export of CV {cv_id} as {format} failed: {error}")
+                failures.append({"cv_id": cv_id, "format": format, "error": error})
+                continue
+            entry = zipfile.ZipInfo(f"cv_{cv_id}.{format}", datetime.utcnow().timetuple()[:6])
+            archive.writestr(entry, content)
+            del content
+            ahead.release()
+            yield sink.drain()
+
+        if failures:
+            archive.writestr("errors.json", json.dumps(failures, indent=2))
+        archive.close()
+        yield sink.drain()
+        logger.info(f"Streamed batch export of {len(exports) - len(failures)} documents, {len(failures)} failed")
+    finally:
+        # The client went away, or the archive is done: stop whatever is still running
+        for task in [*exports, *fetches.values()]:
+            task.cancel()
+        for ticket in tickets:
+            ticket.cancel()
@@ -1,15 +1,69 @@
 import os
 import logging
 import httpx
+import jwt
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from fastapi import HTTPException, status
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+# Outgoing calls join the request's trace (needs backend/ on PYTHONPATH)
+try:
+    from shared.tracing import traced_transport
+except ImportError:
+    traced_transport = None
+
 # Set up logging
 logger = logging.getLogger("export_service.cv_service_client")
 
 # CV Service URL
 CV_SERVICE_URL = os.getenv("CV_SERVICE_URL", "http://localhost:8002")
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+JWT_SECRET = os.getenv("JWT_SECRET", "development_secret_key")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+SERVICE_TOKEN_SECONDS = int(os.getenv("EXPORT_SERVICE_TOKEN_SECONDS", "60"))
+
+# Environments where the well-known development secret is acceptable
+DEVELOPMENT_ENVIRONMENTS = ("development", "test")
+
+def check_jwt_secret() -> None:
+    """
+    Refuse to start outside development while JWT_SECRET is unset.
+    
+    service_token() signs tokens that the CV service accepts as the user, so
+    with the default secret anyone could mint them.
+    
+    Raises:
+        RuntimeError: JWT_SECRET is unset and ENVIRONMENT isn't development or test
+    """
+    if os.getenv("JWT_SECRET"):
+        return
+    if ENVIRONMENT not in DEVELOPMENT_ENVIRONMENTS:
+        raise RuntimeError(f"JWT_SECRET must be set when ENVIRONMENT is {ENVIRONMENT}")
+    logger.warning("JWT_SECRET is not set - using the development secret")
+
+def service_token(user_id: str) -> str:
+    """
+    Mint a short-lived token to fetch a user's CV on their behalf.
+    
+    Used for export jobs a worker picks up after the request that created
+    them is gone, so requesters' tokens never have to be stored.
+    
+    Args:
+        user_id: The ID of the user who requested the export
+        
+    Returns:
+        A JWT for the user, valid for EXPORT_SERVICE_TOKEN_SECONDS
+    """
+    now = datetime.utcnow()
+    payload = {
+        "sub": user_id,
+        "user_id": user_id,
+        "iat": now,
+        "exp": now + timedelta(seconds=SERVICE_TOKEN_SECONDS),
+        "iss": "export_service",
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=0.5, max=10))
 async def fetch_cv_data(cv_id: str, token: str) -> Dict[str, Any]:
@@ -86,7 +140,7 @@ async def fetch_cv_data(cv_id: str, token: str) -> Dict[str, Any]:
     
     # Normal flow for non-test CV IDs
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=10.0, transport=traced_transport() if traced_transport else None) as client:
             headers = {"Authorization": f"Bearer {token}"}
             response = await client.get(f"{CV_SERVICE_URL}/api/cv/{cv_id}", headers=headers)
             
@@ -1,21 +1,27 @@
 import os
 import asyncio
 import logging
+import io
 import jinja2
-import tempfile
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Union, BinaryIO
 
-# Import PDF and DOCX generation libraries
-from weasyprint import HTML, CSS
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from app.render_context import render_context
+from app.render_pool import render_pool
+
+# Render spans (needs backend/ on PYTHONPATH)
+try:
+    from shared.tracing import span
+except ImportError:
+    span = None
+
+# The PDF and DOCX libraries (WeasyPrint, ReportLab, python-docx) are imported
+# by the generator that uses them rather than here. WeasyPrint alone takes
+# most of the service's import time, so importing them here would delay the
+# port binding on every cold start. The render workers (app/render_pool.py)
+# load them, along with the templates and fonts, when they start.
 
 # Set up logging
 logger = logging.getLogger("export_service.document_generator")
@@ -185,9 +191,34 @@ if not os.path.exists(DEFAULT_TEMPLATE_PATH):
 </html>
 """)
 
-# Initialize Jinja2 environment
+# Initialize Jinja2 environment. Compiled templates stay cached; auto_reload
+# recompiles a template when its file changes.
 template_loader = jinja2.FileSystemLoader(searchpath=TEMPLATES_DIR)
-template_env = jinja2.Environment(loader=template_loader)
+template_env = jinja2.Environment(loader=template_loader, auto_reload=True, cache_size=400)
+
+# --- Warm-up ---
+
+def load_libraries() -> None:
+    """Import the rendering libraries so the first export doesn't pay for it."""
+    import weasyprint  # noqa: F401
+    import reportlab.platypus  # noqa: F401
+    import docx  # noqa: F401
+
+def compile_templates() -> Dict[str, Any]:
+    """Compile every HTML template into the Jinja2 environment's cache."""
+    templates = template_env.list_templates(extensions=["html"])
+    for name in templates:
+        template_env.get_template(name)
+    return {"templates": len(templates)}
+
+def load_fonts() -> None:
+    """Render a one-line document so fontconfig and Pango load their font caches."""
+    from weasyprint import HTML
+
+    HTML(string="<p style='font-family: Arial, sans-serif'>CandidateV</p>").render(font_config=render_context.font_config())
+
+def _describe(output: Union[str, BinaryIO]) -> str:
+    return output if isinstance(output, str) else "an in-memory buffer"
 
 class DocumentGenerator:
     """
@@ -195,36 +226,28 @@ class DocumentGenerator:
     """
     
     @staticmethod
-    async def generate_pdf_weasyprint(cv_data: Dict[str, Any], output_path: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+    def render_pdf_weasyprint(cv_data: Dict[str, Any], output_path: Union[str, BinaryIO], template_options: Optional[Dict[str, Any]] = None) -> str:
         """Generate a PDF using WeasyPrint and HTML/CSS templates"""
+        from weasyprint import HTML
+
         try:
             # Get template
             template_name = template_options.get("template_name", "default.html") if template_options else "default.html"
             template = template_env.get_template(template_name)
             
-            # Render HTML
+            # Render HTML; relative URLs (images, stylesheets) resolve against the templates directory
             html_content = template.render(cv=cv_data, options=template_options)
+            html = HTML(string=html_content, base_url=TEMPLATES_DIR)
             
-            # Create a temporary file for the HTML
-            with tempfile.NamedTemporaryFile(suffix='.html', delete=False) as tmp_html:
-                tmp_html.write(html_content.encode('utf-8'))
-                tmp_html_path = tmp_html.name
-            
-            # Use WeasyPrint to convert HTML to PDF
-            html = HTML(filename=tmp_html_path)
-            
-            # Add any custom styles from template options
+            # Add any custom styles from template options, parsed once per distinct stylesheet
             css_styles = []
             if template_options and "custom_css" in template_options:
-                css_styles.append(CSS(string=template_options["custom_css"]))
-            
-            # Generate PDF
-            html.write_pdf(output_path, stylesheets=css_styles)
+                css_styles.append(render_context.stylesheet(template_options["custom_css"]))
             
-            # Clean up temporary file
-            os.unlink(tmp_html_path)
+            # Generate PDF, with the fonts this process has already loaded
+            html.write_pdf(output_path, stylesheets=css_styles, font_config=render_context.font_config())
             
-            logger.info(f"PDF generated at {output_path} using WeasyPrint")
+            logger.info(f"PDF generated at {_describe(output_path)} using WeasyPrint")
             return output_path
             
         except Exception as e:
@@ -232,8 +255,13 @@ class DocumentGenerator:
             raise
     
     @staticmethod
-    async def generate_pdf_reportlab(cv_data: Dict[str, Any], output_path: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+    def render_pdf_reportlab(cv_data: Dict[str, Any], output_path: Union[str, BinaryIO], template_options: Optional[Dict[str, Any]] = None) -> str:
         """Generate a PDF using ReportLab (programmatic approach)"""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib import colors
+
         try:
             # Create PDF document
             doc = SimpleDocTemplate(
@@ -351,7 +379,7 @@ class DocumentGenerator:
             # Build the PDF
             doc.build(elements)
             
-            logger.info(f"PDF generated at {output_path} using ReportLab")
+            logger.info(f"PDF generated at {_describe(output_path)} using ReportLab")
             return output_path
             
         except Exception as e:
@@ -359,8 +387,11 @@ class DocumentGenerator:
             raise
     
     @staticmethod
-    async def generate_docx(cv_data: Dict[str, Any], output_path: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+    def render_docx(cv_data: Dict[str, Any], output_path: Union[str, BinaryIO], template_options: Optional[Dict[str, Any]] = None) -> str:
         """Generate a DOCX document using python-docx"""
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
         try:
             # Create a new document
             doc = Document()
@@ -480,29 +511,65 @@ class DocumentGenerator:
             # Save the document
             doc.save(output_path)
             
-            logger.info(f"DOCX document generated at {output_path}")
+            logger.info(f"DOCX document generated at {_describe(output_path)}")
             return output_path
             
         except Exception as e:
             logger.error(f"Error generating DOCX document: {str(e)}")
             raise
     
-    @classmethod
-    async def generate_document(cls, cv_data: Dict[str, Any], output_path: str, format: str, template_options: Optional[Dict[str, Any]] = None) -> str:
-        """Generate a document in the specified format"""
+    # The render_* methods are synchronous and CPU-bound. The generate_* coroutines
+    # run them in the render worker pool, so the event loop keeps serving requests.
+
+    @staticmethod
+    async def generate_pdf_weasyprint(cv_data: Dict[str, Any], output_path: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a PDF using WeasyPrint, in a render worker"""
+        return await render_pool.run("render_pdf_weasyprint", cv_data, output_path, template_options)
+
+    @staticmethod
+    async def generate_pdf_reportlab(cv_data: Dict[str, Any], output_path: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a PDF using ReportLab, in a render worker"""
+        return await render_pool.run("render_pdf_reportlab", cv_data, output_path, template_options)
+
+    @staticmethod
+    async def generate_docx(cv_data: Dict[str, Any], output_path: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a DOCX document, in a render worker"""
+        return await render_pool.run("render_docx", cv_data, output_path, template_options)
+
+    @staticmethod
+    def render_method(format: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+        """Name of the render_* method for a format and template options"""
         format = format.lower()
-        
         if format == "pdf":
             # Determine which PDF generator to use
             pdf_generator = template_options.get("pdf_generator", "weasyprint") if template_options else "weasyprint"
-            
-            if pdf_generator == "reportlab":
-                return await cls.generate_pdf_reportlab(cv_data, output_path, template_options)
-            else:
-                return await cls.generate_pdf_weasyprint(cv_data, output_path, template_options)
-                
+            return "render_pdf_reportlab" if pdf_generator == "reportlab" else "render_pdf_weasyprint"
         elif format == "docx":
-            return await cls.generate_docx(cv_data, output_path, template_options)
-            
+            return "render_docx"
         else:
-            raise ValueError(f"Unsupported format: {format}") 
\ No newline at end of file
+            raise ValueError(f"Unsupported format: {format}")
+
+    @classmethod
+    def render_bytes(cls, cv_data: Dict[str, Any], format: str, template_options: Optional[Dict[str, Any]] = None) -> bytes:
+        """Render a document into memory and return its bytes"""
+        buffer = io.BytesIO()
+        getattr(cls, cls.render_method(format, template_options))(cv_data, buffer, template_options)
+        return buffer.getvalue()
+
+    @classmethod
+    async def generate_document(cls, cv_data: Dict[str, Any], output_path: str, format: str, template_options: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a document in the specified format, inside a `render.<format>` span"""
+        format = format.lower()
+        template = template_options.get("template_name", "default.html") if template_options else "default.html"
+
+        with span(f"render.{format}", {"export.format": format, "export.template": template}) if span else nullcontext():
+            return await render_pool.run(cls.render_method(format, template_options), cv_data, output_path, template_options)
+
+    @classmethod
+    async def generate_document_bytes(cls, cv_data: Dict[str, Any], format: str, template_options: Optional[Dict[str, Any]] = None) -> bytes:
+        """Generate a document in memory, without touching the disk, and return its bytes"""
+        format = format.lower()
+        template = template_options.get("template_name", "default.html") if template_options else "default.html"
+
+        with span(f"render.{format}", {"export.format": format, "export.template": template, "export.in_memory": True}) if span else nullcontext():
+            return await render_pool.run("render_bytes", cv_data, format, template_options)
@@ -0,0 +1,119 @@
+"""
+Responses that deliver exported documents.
+
+- document_response() sends a document rendered in memory, for exports
+  rendered while the client waits; nothing is written to disk.
+- ArtifactResponse serves a stored export file. It answers single `Range`
+  requests with 206 (resumed or partial downloads), honours `If-Range`, and
+  hands the file to the server for zero-copy sending when the server offers
+  the ASGI `http.response.zerocopysend` extension (sendfile) or
+  `http.response.pathsend`. Otherwise it streams the file in large chunks.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+def export_filename(job: Dict[str, Any]) -> str:
+    """Download filename of an export"""
+    return f"cv_{job['cv_id']}_{datetime.utcnow().strftime('%Y%m%d')}.{job['format']}"
+
+def document_response(content: bytes, format: str, filename: str) -> Response:
+    """Send a document rendered in memory as an attachment"""
+    return Response(
+        content=content,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "private, no-store"},
+    )
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range` header.
+
+    Returns:
+        The inclusive (start, end) byte range, or None to send the whole file
+        (no header, or several ranges)
+
+    Raises:
+        ValueError: The range can't be satisfied for a file of this size
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            return (max(size - length, 0), size - 1) if length > 0 else None
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None  # Malformed ranges are ignored
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+class ArtifactResponse(FileResponse):
+    """FileResponse with byte ranges and zero-copy sending"""
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, range_header: Optional[str] = None, if_range: Optional[str] = None, **kwargs):
+        super().__init__(path, stat_result=os.stat(path), **kwargs)
+        self.headers["accept-ranges"] = "bytes"
+        size = self.stat_result.st_size
+        self.range: Optional[Tuple[int, int]] = None
+        # A stale If-Range validator means the client's partial copy is outdated: send it all
+        if if_range is None or if_range == self.headers["etag"]:
+            try:
+                self.range = parse_range(range_header, size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                return
+        if self.range is not None:
+            start, end = self.range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        extensions = scope.get("extensions") or {}
+        if scope["method"].upper() == "HEAD" or self.status_code == 416:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in extensions:
+            start, end = self.range or (0, self.stat_result.st_size - 1)
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": start,
+                    "count": end - start + 1,
+                    "more_body": False,
+                })
+        elif self.range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        else:
+            start, end = self.range or (0, self.stat_result.st_size - 1)
+            remaining = end - start + 1
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                while True:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    more_body = remaining > 0 and len(chunk) > 0
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                    if not more_body:
+                        break
+        if self.background is not None:
+            await self.background()
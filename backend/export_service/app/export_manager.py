@@ -3,13 +3,17 @@ import asyncio
 import logging
 import json
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from contextlib import asynccontextmanager, nullcontext
 from uuid import uuid4
 import aiofiles
-from fastapi import BackgroundTasks
 
 from app.document_generator import DocumentGenerator
-from app.cv_service_client import fetch_cv_data
+from app.cv_service_client import fetch_cv_data, service_token
+from app.job_store import JOB_LEASE_SECONDS, job_store
+from app.progress import progress_hub
+from app.render_cache import render_cache
+from app.scheduler import QueueFull, Ticket, export_scheduler
 
 # Set up logging
 logger = logging.getLogger("export_service.export_manager")
@@ -17,10 +21,44 @@ logger = logging.getLogger("export_service.export_manager")
 # Environment variables
 EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
 EXPORT_RETENTION_DAYS = int(os.getenv("EXPORT_RETENTION_DAYS", "7"))
+EXPORT_WORKER_POLL_SECONDS = float(os.getenv("EXPORT_WORKER_POLL_SECONDS", "5"))
 os.makedirs(EXPORT_DIR, exist_ok=True)
 
-# In-memory store of export jobs
-EXPORT_JOBS = {}
+# Scheduled export jobs, and renders that finish after their client stopped waiting
+_background_tasks = set()
+
+async def _record(user_id: str, change, *args, **kwargs) -> Any:
+    """Apply a job store change in a thread and wake the user's progress streams"""
+    result = await asyncio.to_thread(change, *args, **kwargs)
+    progress_hub.publish(user_id)
+    return result
+
+@asynccontextmanager
+async def _holding_lease(job: Dict[str, Any]):
+    """Renew a claimed job's lease until the block exits, so no other worker takes the job over"""
+    async def renew() -> None:
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                renewed = await asyncio.to_thread(job_store.renew, job["id"], job["claimed_by"])
+            except Exception as e:
+                logger.error(f"Error renewing the lease of export job {job['id']}: {str(e)}")
+                continue
+            if not renewed:
+                logger.warning(f"Export job {job['id']} was taken over by another worker")
+                return
+    
+    renewer = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        renewer.cancel()
+
+def _remove_file(path: str) -> int:
+    """Delete a file; returns the bytes freed, which is none while another hard link (a cache entry) remains"""
+    stat = os.stat(path)
+    os.remove(path)
+    return stat.st_size if stat.st_nlink == 1 else 0
 
 class ExportManager:
     """
@@ -60,73 +98,241 @@ class ExportManager:
             "completed_at": None,
             "download_url": None,
             "filepath": None,
-            "error": None
+            "error": None,
+            "expires_at": now + timedelta(days=EXPORT_RETENTION_DAYS)
         }
         
         # Store job
-        EXPORT_JOBS[export_id] = job
+        await _record(user_id, job_store.create, job)
         
         logger.info(f"Created export job {export_id} for CV {cv_id} in {format} format")
         
         return job
     
     @staticmethod
-    async def process_export_job(export_id: str, token: str) -> None:
+    async def process_export_job(export_id: str, token: Optional[str] = None, ticket: Optional[Ticket] = None) -> None:
         """
-        Process an export job
+        Claim and process an export job
         
         Args:
             export_id: The ID of the export job
-            token: JWT authentication token
+            token: JWT authentication token (defaults to a service token for the job's user)
+            ticket: The job's scheduler ticket; the job waits for its turn before it is claimed
+        """
+        async with ticket or nullcontext():
+            job = await asyncio.to_thread(job_store.claim, export_id)
+            if job is None:
+                logger.info(f"Export job {export_id} is gone or claimed by another worker")
+                return
+            progress_hub.publish(job["user_id"])
+            async with _holding_lease(job):
+                await ExportManager._run_job(job, token)
+    
+    @staticmethod
+    def start_export_job(export_id: str, token: Optional[str], ticket: Ticket) -> None:
         """
-        if export_id not in EXPORT_JOBS:
-            logger.error(f"Export job {export_id} not found")
-            return
+        Run an admitted export job in the background, once the scheduler gives it a slot
         
-        job = EXPORT_JOBS[export_id]
+        Args:
+            export_id: The ID of the export job
+            token: JWT authentication token
+            ticket: The job's scheduler ticket
+        """
+        task = asyncio.create_task(ExportManager.process_export_job(export_id, token, ticket))
+        # The loop only keeps weak references to tasks
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+    
+    @staticmethod
+    async def _run_job(job: Dict[str, Any], token: Optional[str]) -> None:
+        """Run a claimed job to completion or failure"""
+        export_id = job["id"]
+        claimed_by = job["claimed_by"]
         
         try:
-            # Update job status
-            job["status"] = "processing"
-            job["updated_at"] = datetime.utcnow()
-            
             # Fetch CV data
             logger.info(f"Fetching CV data for job {export_id}")
-            cv_data = await fetch_cv_data(job["cv_id"], token)
+            cv_data = await fetch_cv_data(job["cv_id"], token or service_token(job["user_id"]))
             
             # Update progress
-            job["progress"] = 30
-            job["updated_at"] = datetime.utcnow()
+            await _record(job["user_id"], job_store.update, export_id, claimed_by, progress=30)
             
             # Create output file path
             format = job["format"].lower()
             filename = f"{export_id}.{format}"
             filepath = os.path.join(EXPORT_DIR, filename)
             
-            # Generate document
-            logger.info(f"Generating {format} document for job {export_id}")
-            await DocumentGenerator.generate_document(
-                cv_data=cv_data,
-                output_path=filepath,
-                format=format,
-                template_options=job["template_options"]
-            )
+            # Reuse an identical earlier render, or generate the document and cache it
+            cache_key = render_cache.key(job["cv_id"], cv_data, format, job["template_options"])
+            async with render_cache.rendering(cache_key):
+                if await asyncio.to_thread(render_cache.fetch, cache_key, filepath):
+                    logger.info(f"Reused cached {format} render for job {export_id}")
+                else:
+                    logger.info(f"Generating {format} document for job {export_id}")
+                    await DocumentGenerator.generate_document(
+                        cv_data=cv_data,
+                        output_path=filepath,
+                        format=format,
+                        template_options=job["template_options"]
+                    )
+                    await asyncio.to_thread(render_cache.store, cache_key, filepath)
+            
+            # Update job status, unless another worker took the job over
+            if await _record(
+                job["user_id"], job_store.finish, export_id, "completed", claimed_by,
+                progress=100, filepath=filepath, download_url=f"/api/export/download/{export_id}"
+            ):
+                logger.info(f"Completed export job {export_id}")
+            else:
+                logger.warning(f"Export job {export_id} was taken over by another worker, discarding this result")
+            
+        except Exception as e:
+            logger.error(f"Error processing export job {export_id}: {str(e)}")
+            await _record(job["user_id"], job_store.finish, export_id, "failed", claimed_by, error=str(e))
+    
+    @staticmethod
+    async def export_inline(export_id: str, token: str, budget: float, ticket: Optional[Ticket] = None) -> Optional[Dict[str, Any]]:
+        """
+        Claim and run an export while the client waits, for up to `budget` seconds
+        
+        The document is rendered in memory so it can be sent straight back;
+        persist_render() stores it afterwards. If the budget runs out, the
+        render carries on in the background and stores the result itself.
+        
+        Args:
+            export_id: The ID of the export job
+            token: JWT authentication token
+            budget: Seconds the client is willing to wait, including the wait for a scheduler slot
+            ticket: The job's scheduler ticket
+            
+        Returns:
+            A dict with the claimed job and either the rendered `content` or,
+            for a cached render, the `filepath` of the completed export; None
+            if the budget ran out or another worker holds the job
             
-            # Update job status
-            job["progress"] = 100
-            job["status"] = "completed"
-            job["filepath"] = filepath
-            job["download_url"] = f"/api/export/download/{export_id}"
-            job["completed_at"] = datetime.utcnow()
-            job["updated_at"] = job["completed_at"]
+        Raises:
+            Exception: The export failed within the budget (the job is marked failed)
+        """
+        async def claim_and_render() -> Optional[Dict[str, Any]]:
+            async with ticket or nullcontext():
+                job = await asyncio.to_thread(job_store.claim, export_id)
+                if job is None:
+                    return None
+                progress_hub.publish(job["user_id"])
+                async with _holding_lease(job):
+                    return await ExportManager._render_inline(job, token)
+        
+        # Shielded, so a timeout leaves the render running
+        task = asyncio.create_task(claim_and_render())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), budget)
+        except asyncio.TimeoutError:
+            logger.info(f"Export job {export_id} did not finish within {budget:g}s, continuing in the background")
+            # The loop only keeps weak references to tasks
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+            task.add_done_callback(ExportManager._persist_when_done)
+            return None
+    
+    @staticmethod
+    async def _render_inline(job: Dict[str, Any], token: Optional[str]) -> Dict[str, Any]:
+        """Fetch and render a claimed job in memory, or complete it from the render cache"""
+        export_id = job["id"]
+        format = job["format"].lower()
+        filepath = os.path.join(EXPORT_DIR, f"{export_id}.{format}")
+        
+        try:
+            cv_data = await fetch_cv_data(job["cv_id"], token or service_token(job["user_id"]))
+            cache_key = render_cache.key(job["cv_id"], cv_data, format, job["template_options"])
+            
+            if await asyncio.to_thread(render_cache.fetch, cache_key, filepath):
+                logger.info(f"Reused cached {format} render for job {export_id}")
+                await _record(
+                    job["user_id"], job_store.finish, export_id, "completed", job["claimed_by"],
+                    progress=100, filepath=filepath, download_url=f"/api/export/download/{export_id}"
+                )
+                return {"job": job, "filepath": filepath}
             
-            logger.info(f"Completed export job {export_id}")
+            logger.info(f"Generating {format} document in memory for job {export_id}")
+            content = await DocumentGenerator.generate_document_bytes(cv_data, format, job["template_options"])
+            return {"job": job, "content": content, "cache_key": cache_key, "filepath": filepath}
             
         except Exception as e:
             logger.error(f"Error processing export job {export_id}: {str(e)}")
-            job["status"] = "failed"
-            job["error"] = str(e)
-            job["updated_at"] = datetime.utcnow()
+            await _record(job["user_id"], job_store.finish, export_id, "failed", job["claimed_by"], error=str(e))
+            raise
+    
+    @staticmethod
+    async def persist_render(result: Dict[str, Any]) -> None:
+        """
+        Store an in-memory render as the job's export file and in the render cache, then complete the job
+        
+        Args:
+            result: A result of export_inline() that carries `content`
+        """
+        job = result["job"]
+        export_id = job["id"]
+        filepath = result["filepath"]
+        
+        def write() -> None:
+            with open(filepath, "wb") as f:
+                f.write(result["content"])
+        
+        try:
+            await asyncio.to_thread(write)
+            await asyncio.to_thread(render_cache.store, result["cache_key"], filepath)
+            if await _record(
+                job["user_id"], job_store.finish, export_id, "completed", job["claimed_by"],
+                progress=100, filepath=filepath, download_url=f"/api/export/download/{export_id}"
+            ):
+                logger.info(f"Completed export job {export_id}")
+            else:
+                logger.warning(f"Export job {export_id} was taken over by another worker, discarding this result")
+        except Exception as e:
+            logger.error(f"Error storing export job {export_id}: {str(e)}")
+            await _record(job["user_id"], job_store.finish, export_id, "failed", job["claimed_by"], error=str(e))
+    
+    @staticmethod
+    def _persist_when_done(task: "asyncio.Task") -> None:
+        """Done callback of an inline render the client stopped waiting for"""
+        if task.cancelled() or task.exception() is not None:
+            return  # _render_inline already marked the job failed
+        result = task.result()
+        if result is not None and "content" in result:
+            persist = asyncio.create_task(ExportManager.persist_render(result))
+            # The loop only keeps weak references to tasks
+            _background_tasks.add(persist)
+            persist.add_done_callback(_background_tasks.discard)
+    
+    @staticmethod
+    async def process_pending_jobs() -> int:
+        """
+        Claim and run jobs that no worker is processing, oldest first
+        
+        Picks up jobs left behind by a restart or a crashed worker.
+        
+        Returns:
+            The number of jobs processed
+        """
+        processed = 0
+        # Leave the slots to admitted exports; they are started as soon as they are accepted
+        while export_scheduler.idle():
+            job = await asyncio.to_thread(job_store.claim_next)
+            if job is None:
+                return processed
+            # Runs under a ticket like any export, counted against the user's allowance
+            try:
+                ticket = export_scheduler.admit(job["user_id"])
+            except QueueFull:
+                await asyncio.to_thread(job_store.release, job["id"], job["claimed_by"])
+                logger.info(f"Export job {job['id']} left for later, its user has too many exports in flight")
+                return processed
+            progress_hub.publish(job["user_id"])
+            logger.info(f"Picked up export job {job['id']} (attempt {job['attempts']})")
+            async with _holding_lease(job), ticket:
+                await ExportManager._run_job(job, None)
+            processed += 1
+        return processed
     
     @staticmethod
     async def get_export_job(export_id: str, user_id: str) -> Optional[Dict[str, Any]]:
@@ -140,11 +346,10 @@ class ExportManager:
         Returns:
             The export job data, or None if not found or not owned by the user
         """
-        if export_id not in EXPORT_JOBS:
+        job = await asyncio.to_thread(job_store.get, export_id)
+        if job is None:
             return None
         
-        job = EXPORT_JOBS[export_id]
-        
         # Check ownership
         if job["user_id"] != user_id:
             logger.warning(f"User {user_id} attempted to access export job {export_id} owned by {job['user_id']}")
@@ -153,17 +358,24 @@ class ExportManager:
         return job
     
     @staticmethod
-    async def get_user_export_jobs(user_id: str) -> List[Dict[str, Any]]:
+    async def get_user_export_jobs(
+        user_id: str, status: Optional[str] = None, format: Optional[str] = None,
+        limit: Optional[int] = None, offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
         """
-        Get all export jobs for a user
+        Get export jobs for a user, newest first
         
         Args:
             user_id: The ID of the user
+            status: Only jobs with this status
+            format: Only jobs in this format
+            limit: Maximum number of jobs to return
+            offset: Skip the first N jobs
             
         Returns:
-            A list of export jobs owned by the user
+            A page of the user's export jobs, and the total number matching the filters
         """
-        return [job for job in EXPORT_JOBS.values() if job["user_id"] == user_id]
+        return await asyncio.to_thread(job_store.list_for_user, user_id, status, format, limit, offset)
     
     @staticmethod
     async def delete_export_job(export_id: str, user_id: str) -> bool:
@@ -177,66 +389,105 @@ class ExportManager:
         Returns:
             True if deleted successfully, False otherwise
         """
-        if export_id not in EXPORT_JOBS:
+        job = await asyncio.to_thread(job_store.get, export_id)
+        if job is None:
             return False
         
-        job = EXPORT_JOBS[export_id]
-        
         # Check ownership
         if job["user_id"] != user_id:
             logger.warning(f"User {user_id} attempted to delete export job {export_id} owned by {job['user_id']}")
             return False
         
+        await ExportManager.remove_export(job)
+        
+        return True
+    
+    @staticmethod
+    async def remove_export(job: Dict[str, Any]) -> int:
+        """
+        Delete an export job and its file
+        
+        Args:
+            job: The export job
+            
+        Returns:
+            The number of bytes freed on disk
+        """
+        export_id = job["id"]
+        freed = 0
+        
         # Delete file if it exists
-        if job.get("filepath") and os.path.exists(job["filepath"]):
+        if job.get("filepath"):
             try:
-                os.remove(job["filepath"])
+                freed = await asyncio.to_thread(_remove_file, job["filepath"])
                 logger.info(f"Deleted export file for job {export_id}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.error(f"Error deleting export file for job {export_id}: {str(e)}")
         
         # Delete job from store
-        del EXPORT_JOBS[export_id]
+        await _record(job["user_id"], job_store.delete, export_id)
         logger.info(f"Deleted export job {export_id}")
         
-        return True
+        return freed
     
     @staticmethod
-    async def cleanup_old_exports() -> None:
-        """Cleanup export jobs and files older than retention period"""
-        logger.info("Starting cleanup of old export jobs")
+    async def cleanup_old_exports() -> Dict[str, int]:
+        """
+        Delete the export jobs and files past their expiry time
         
-        retention_date = datetime.utcnow() - timedelta(days=EXPORT_RETENTION_DAYS)
-        jobs_to_delete = []
+        Returns:
+            The number of jobs deleted and the bytes freed
+        """
+        deleted = 0
+        freed = 0
         
-        for export_id, job in EXPORT_JOBS.items():
-            created_at = job.get("created_at", datetime.utcnow())
-            
-            if created_at < retention_date:
-                # Delete file if it exists
-                if job.get("filepath") and os.path.exists(job["filepath"]):
-                    try:
-                        os.remove(job["filepath"])
-                        logger.info(f"Cleanup: Deleted export file for job {export_id}")
-                    except Exception as e:
-                        logger.error(f"Cleanup: Error deleting export file for job {export_id}: {str(e)}")
-                
-                jobs_to_delete.append(export_id)
-        
-        # Delete jobs from store
-        for export_id in jobs_to_delete:
-            del EXPORT_JOBS[export_id]
-            logger.info(f"Cleanup: Deleted export job {export_id}")
-        
-        logger.info(f"Cleanup: Deleted {len(jobs_to_delete)} old export jobs")
-    
-    @staticmethod
-    async def schedule_cleanup(background_tasks: BackgroundTasks) -> None:
-        """Schedule periodic cleanup of old export jobs"""
+        # The expires_at index returns exactly the expired jobs, in batches
+        while True:
+            jobs_to_delete = await asyncio.to_thread(job_store.expired)
+            for job in jobs_to_delete:
+                freed += await ExportManager.remove_export(job)
+            deleted += len(jobs_to_delete)
+            if not jobs_to_delete:
+                break
         
-        async def periodic_cleanup():
-            while True:
-                await asyncio.sleep(86400)  # 24 hours
-                await ExportManager.cleanup_old_exports()
+        if deleted:
+            logger.info(f"Cleanup: Deleted {deleted} expired export jobs, freeing {freed} bytes")
         
-        background_tasks.add_task(periodic_cleanup) 
\ No newline at end of file
+        return {"jobs": deleted, "bytes": freed}
+
+class PendingJobPoller:
+    """
+    Background task that claims jobs no worker is running
+
+    The worker that accepts an export starts it right away; the poller picks
+    up jobs that were left pending or abandoned by a restart, on any replica.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                await ExportManager.process_pending_jobs()
+            except Exception as e:
+                logger.error(f"Error polling for pending export jobs: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+job_poller = PendingJobPoller(EXPORT_WORKER_POLL_SECONDS)
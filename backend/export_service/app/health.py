@@ -1,8 +1,18 @@
 import os
+import asyncio
 import logging
 import httpx
 from datetime import datetime
-from fastapi import APIRouter
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.readiness import warmup
+from app.job_store import job_store
+from app.progress import progress_hub
+from app.render_cache import render_cache
+from app.janitor import janitor
+from app.scheduler import export_scheduler
+from app.render_pool import render_pool
 
 # Set up logging
 logger = logging.getLogger("export_service.health")
@@ -14,6 +24,17 @@ EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
 # Create router
 router = APIRouter()
 
+@router.get("/api/ready")
+async def readiness_check():
+    """
+    Readiness check endpoint.
+    Returns 503 until the rendering libraries, templates and fonts are loaded.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if warmup is None or warmup.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready", "steps": {}} if warmup is None else warmup.status()
+    )
+
 @router.get("/api/health")
 async def health_check():
     """
@@ -64,8 +85,17 @@ async def health_check():
         cv_service_details["error"] = str(e)
         logger.error(f"CV service health check failed: {str(e)}")
     
+    # Check the job store
+    job_store_status = "ok"
+    try:
+        job_store_details = await asyncio.to_thread(job_store.status)
+    except Exception as e:
+        job_store_status = "error"
+        job_store_details = {"error": str(e)}
+        logger.error(f"Job store health check failed: {str(e)}")
+    
     # Overall service status
-    status = "healthy" if export_dir_status == "ok" and cv_service_status == "ok" else "unhealthy"
+    status = "healthy" if export_dir_status == "ok" and cv_service_status == "ok" and job_store_status == "ok" else "unhealthy"
     
     return {
         "status": status,
@@ -78,5 +108,14 @@ async def health_check():
         "cv_service": {
             "status": cv_service_status,
             "details": cv_service_details
-        }
+        },
+        "job_store": {
+            "status": job_store_status,
+            "details": job_store_details
+        },
+        "render_pool": render_pool.status(),
+        "render_cache": render_cache.status(),
+        "progress_streams": progress_hub.status(),
+        "scheduler": export_scheduler.status(),
+        "janitor": janitor.status()
     } 
\ No newline at end of file
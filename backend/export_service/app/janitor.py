@@ -0,0 +1,167 @@
+"""
+Housekeeping of the export directory.
+
+The janitor runs in the background from startup to shutdown:
+
+- Expired exports, job and file, are deleted as they come due. The job
+  store's expires_at index returns exactly the expired jobs and the time of
+  the next expiry, so the janitor sleeps until then (at most
+  EXPORT_JANITOR_INTERVAL_SECONDS) instead of scanning every job.
+- With EXPORT_DIR_MAX_BYTES set, export files and cached renders together are
+  kept under that size. The least recently used are deleted first, along
+  with their jobs (downloads and cache hits mark a file used). An export
+  file and the cache entry it was linked from share their storage, so they
+  are counted, and evicted, together.
+
+Reclaimed bytes are logged, counted in export_janitor_reclaimed_bytes_total
+and shown in /api/health.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from app.downloads import MEDIA_TYPES
+from app.export_manager import EXPORT_DIR, ExportManager
+from app.job_store import job_store
+from app.render_cache import render_cache
+
+# Set up logging
+logger = logging.getLogger("export_service.janitor")
+
+# Environment variables
+EXPORT_DIR_MAX_BYTES = int(os.getenv("EXPORT_DIR_MAX_BYTES", "0"))
+EXPORT_JANITOR_INTERVAL_SECONDS = float(os.getenv("EXPORT_JANITOR_INTERVAL_SECONDS", "300"))
+
+RECLAIMED = Counter(
+    "export_janitor_reclaimed_bytes_total", "Disk space freed by the export janitor", ["reason"]
+)
+
+def _scan_artifacts() -> List[Dict[str, Any]]:
+    """
+    Export files and cache entries, grouped by the storage they share.
+
+    Returns:
+        One dict per inode with its `paths`, `size` and `last_used` time
+    """
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    extensions = tuple(f".{format}" for format in MEDIA_TYPES)
+    for directory, wanted in ((EXPORT_DIR, extensions), (render_cache.directory, None)):
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            if wanted is not None and not entry.name.endswith(wanted):
+                continue
+            stat = entry.stat()
+            group = groups.setdefault(
+                (stat.st_dev, stat.st_ino), {"paths": [], "size": stat.st_size, "last_used": 0.0}
+            )
+            group["paths"].append(entry.path)
+            # Downloads set only the atime, so a file's ETag doesn't change
+            group["last_used"] = max(group["last_used"], stat.st_atime, stat.st_mtime)
+    return list(groups.values())
+
+class ExportJanitor:
+    """Background task that deletes expired exports and keeps EXPORT_DIR under its quota"""
+
+    def __init__(self, max_bytes: int, interval: float):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.stats = {
+            "expired_jobs": 0, "evicted_files": 0, "reclaimed_bytes": 0, "disk_usage_bytes": None, "last_run": None
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            delay = self.interval
+            try:
+                await self.run_once()
+                next_expiry = await asyncio.to_thread(job_store.next_expiry)
+                if next_expiry is not None:
+                    delay = min(delay, max((next_expiry - datetime.utcnow()).total_seconds(), 1))
+            except Exception as e:
+                logger.error(f"Error cleaning up exports: {str(e)}")
+            await asyncio.sleep(delay)
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        Delete expired exports, then evict exports over the disk quota
+
+        Returns:
+            The number of expired jobs and evicted files, and the bytes freed
+        """
+        expired = await ExportManager.cleanup_old_exports()
+        RECLAIMED.labels("expired").inc(expired["bytes"])
+        evicted = await self.enforce_quota()
+        RECLAIMED.labels("quota").inc(evicted["bytes"])
+
+        reclaimed = expired["bytes"] + evicted["bytes"]
+        self.stats["expired_jobs"] += expired["jobs"]
+        self.stats["evicted_files"] += evicted["files"]
+        self.stats["reclaimed_bytes"] += reclaimed
+        self.stats["last_run"] = datetime.utcnow().isoformat()
+        if expired["jobs"] or evicted["files"]:
+            logger.info(
+                f"Cleanup: Deleted {expired['jobs']} expired exports and evicted {evicted['files']} files, "
+                f"reclaiming {reclaimed} bytes"
+            )
+        return {"expired_jobs": expired["jobs"], "evicted_files": evicted["files"], "reclaimed_bytes": reclaimed}
+
+    async def enforce_quota(self) -> Dict[str, int]:
+        """Evict least recently used exports and cache entries until EXPORT_DIR fits its quota"""
+        groups = await asyncio.to_thread(_scan_artifacts)
+        usage = sum(group["size"] for group in groups)
+        evicted = freed = 0
+        if self.max_bytes > 0:
+            for group in sorted(groups, key=lambda group: group["last_used"]):
+                if usage <= self.max_bytes:
+                    break
+                for path in group["paths"]:
+                    await self._evict(path)
+                    evicted += 1
+                usage -= group["size"]
+                freed += group["size"]
+        self.stats["disk_usage_bytes"] = usage
+        return {"files": evicted, "bytes": freed}
+
+    async def _evict(self, path: str) -> None:
+        directory, name = os.path.split(path)
+        if os.path.abspath(directory) == os.path.abspath(render_cache.directory):
+            await asyncio.to_thread(render_cache.remove, name)
+            return
+        # Export files are named after their job
+        job = await asyncio.to_thread(job_store.get, os.path.splitext(name)[0])
+        if job is None:
+            try:
+                os.remove(path)  # Left behind by a deleted job
+            except FileNotFoundError:
+                pass
+        elif job.get("filepath") and os.path.abspath(job["filepath"]) == os.path.abspath(path):
+            logger.info(f"Evicting export job {job['id']} to stay within the disk quota")
+            await ExportManager.remove_export(job)
+
+    def status(self) -> Dict[str, Any]:
+        return {"max_bytes": self.max_bytes, **self.stats}
+
+janitor = ExportJanitor(EXPORT_DIR_MAX_BYTES, EXPORT_JANITOR_INTERVAL_SECONDS)
@@ -0,0 +1,294 @@
+"""
+Persistent store of export jobs.
+
+Jobs live in an `export_jobs` table instead of a process-local dict, so they
+survive restarts, and every worker process (or replica) sees the same jobs.
+The table is SQLite by default (EXPORT_DATABASE_URL, next to the exported
+files), or PostgreSQL when EXPORT_DATABASE_URL points at one (needs
+psycopg2). Indexes:
+
+- (user_id, created_at) for listing a user's exports, newest first, with
+  the filters and pagination done in SQL;
+- (status, created_at) for workers looking for pending jobs;
+- expires_at for the retention cleanup.
+
+Work is handed out by atomic claim: a worker moves a job from pending to
+processing with a conditional UPDATE, and only the worker whose UPDATE
+matched the row runs it. A claim is a lease. If the worker dies, the job
+becomes claimable again once EXPORT_JOB_LEASE_SECONDS pass, up to
+EXPORT_JOB_MAX_ATTEMPTS claims. Each claim is recorded in claimed_by under
+its own lease ID: the worker renews the lease while it runs the job, and
+its updates only apply while it still holds the claim, so a worker whose
+lease ran out can't overwrite the work of the worker that took the job over.
+
+No credentials are stored with a job. A worker that picks up a job it
+didn't accept fetches the CV with a short-lived service token (see
+cv_service_client.service_token).
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Float, Index, Integer, MetaData, String, Table, Text,
+    and_, create_engine, delete, event, func, or_, select, update
+)
+from sqlalchemy.engine import Engine
+
+# Set up logging
+logger = logging.getLogger("export_service.job_store")
+
+# Environment variables
+EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
+EXPORT_DATABASE_URL = os.getenv("EXPORT_DATABASE_URL") or f"sqlite:///{os.path.join(EXPORT_DIR, 'export_jobs.db')}"
+JOB_LEASE_SECONDS = int(os.getenv("EXPORT_JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("EXPORT_JOB_MAX_ATTEMPTS", "3"))
+
+# Identifies this process in claimed_by, followed by the claim's lease ID
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+metadata = MetaData()
+
+export_jobs = Table(
+    "export_jobs", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("user_id", String(64), nullable=False),
+    Column("cv_id", String(64), nullable=False),
+    Column("format", String(16), nullable=False),
+    Column("template_options", JSON, nullable=False, default=dict),
+    Column("status", String(16), nullable=False, default="pending"),
+    Column("progress", Float, nullable=False, default=0),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Column("completed_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+    Column("download_url", String(255)),
+    Column("filepath", String(1024)),
+    Column("error", Text),
+    Column("claimed_by", String(255)),
+    Column("lease_expires_at", DateTime),
+    Column("attempts", Integer, nullable=False, default=0),
+    Index("ix_export_jobs_user_created", "user_id", "created_at"),
+    Index("ix_export_jobs_status_created", "status", "created_at"),
+    Index("ix_export_jobs_expires_at", "expires_at"),
+)
+
+JOB_COLUMNS = list(export_jobs.c)
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL and a busy timeout let several worker processes share the file."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+class JobStore:
+    """Export jobs in a SQL table. Every method is blocking; call them from a thread."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> Engine:
+        """The store's engine, created along with the table on first use."""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    if self.url.startswith("sqlite:"):
+                        os.makedirs(EXPORT_DIR, exist_ok=True)
+                        engine = create_engine(self.url, connect_args={"check_same_thread": False})
+                        event.listen(engine, "connect", _sqlite_pragmas)
+                    else:
+                        engine = create_engine(self.url, pool_pre_ping=True, pool_size=5, max_overflow=10)
+                    metadata.create_all(engine)
+                    self._engine = engine
+        return self._engine
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(export_jobs.insert().values(**job))
+
+    def get(self, export_id: str) -> Optional[Dict[str, Any]]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(*JOB_COLUMNS).where(export_jobs.c.id == export_id)).mappings().first()
+        return dict(row) if row else None
+
+    def list_for_user(
+        self, user_id: str, status: Optional[str] = None, format: Optional[str] = None,
+        limit: Optional[int] = None, offset: int = 0
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        A user's jobs, newest first.
+
+        Returns:
+            The requested page of jobs and the total number matching the filters
+        """
+        conditions = [export_jobs.c.user_id == user_id]
+        if status:
+            conditions.append(export_jobs.c.status == status.lower())
+        if format:
+            conditions.append(export_jobs.c.format == format.lower())
+        query = select(*JOB_COLUMNS).where(*conditions).order_by(export_jobs.c.created_at.desc()).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.engine.connect() as conn:
+            jobs = [dict(row) for row in conn.execute(query).mappings()]
+            total = conn.execute(select(func.count()).select_from(export_jobs).where(*conditions)).scalar_one()
+        return jobs, total
+
+    def changed_since(self, user_id: str, since: Optional[datetime], limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        A user's jobs updated after `since`, oldest change first.
+
+        Without `since`, the user's most recently updated jobs.
+        """
+        query = select(*JOB_COLUMNS).where(export_jobs.c.user_id == user_id)
+        if since is not None:
+            query = query.where(export_jobs.c.updated_at > since).order_by(export_jobs.c.updated_at).limit(limit)
+            with self.engine.connect() as conn:
+                return [dict(row) for row in conn.execute(query).mappings()]
+        query = query.order_by(export_jobs.c.updated_at.desc()).limit(limit)
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(query).mappings()][::-1]
+
+    def update(self, export_id: str, claim: Optional[str] = None, **values) -> bool:
+        """
+        Change a job.
+
+        Args:
+            claim: The claim the change belongs to (the claimed job's
+                claimed_by); the change is dropped if the claim was lost
+
+        Returns:
+            Whether the job was changed
+        """
+        values.setdefault("updated_at", datetime.utcnow())
+        conditions = [export_jobs.c.id == export_id]
+        if claim is not None:
+            conditions.append(export_jobs.c.claimed_by == claim)
+        with self.engine.begin() as conn:
+            return conn.execute(update(export_jobs).where(*conditions).values(**values)).rowcount == 1
+
+    def finish(self, export_id: str, status: str, claim: Optional[str] = None, **values) -> bool:
+        """Record a job's outcome and release its claim; False if the claim was lost."""
+        now = datetime.utcnow()
+        return self.update(
+            export_id, claim, status=status, updated_at=now, claimed_by=None, lease_expires_at=None,
+            **({"completed_at": now} if status == "completed" else {}), **values
+        )
+
+    def renew(self, export_id: str, claim: str) -> bool:
+        """Extend a claim's lease by EXPORT_JOB_LEASE_SECONDS; False if the claim was lost."""
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(export_jobs)
+                .where(
+                    export_jobs.c.id == export_id, export_jobs.c.claimed_by == claim,
+                    export_jobs.c.status == "processing",
+                )
+                .values(lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS))
+            ).rowcount == 1
+
+    def release(self, export_id: str, claim: str) -> bool:
+        """Give a claimed job back unstarted, without counting the claim as an attempt."""
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(export_jobs)
+                .where(export_jobs.c.id == export_id, export_jobs.c.claimed_by == claim)
+                .values(status="pending", claimed_by=None, lease_expires_at=None, attempts=export_jobs.c.attempts - 1)
+            ).rowcount == 1
+
+    def _claimable(self, now: datetime):
+        return and_(
+            export_jobs.c.attempts < JOB_MAX_ATTEMPTS,
+            or_(
+                export_jobs.c.status == "pending",
+                and_(export_jobs.c.status == "processing", export_jobs.c.lease_expires_at < now),
+            ),
+        )
+
+    def claim(self, export_id: str, worker_id: str = WORKER_ID) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take a job for processing.
+
+        Returns:
+            The job, whose claimed_by identifies the claim, or None if the
+            job is gone or another worker holds it
+        """
+        now = datetime.utcnow()
+        claimed_by = f"{worker_id}/{uuid4().hex[:12]}"
+        with self.engine.begin() as conn:
+            claimed = conn.execute(
+                update(export_jobs)
+                .where(export_jobs.c.id == export_id, self._claimable(now))
+                .values(
+                    status="processing", claimed_by=claimed_by, attempts=export_jobs.c.attempts + 1,
+                    lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS), updated_at=now,
+                )
+            ).rowcount
+            if claimed != 1:
+                return None
+            row = conn.execute(select(*JOB_COLUMNS).where(export_jobs.c.id == export_id)).mappings().one()
+        return dict(row)
+
+    def claim_next(self, worker_id: str = WORKER_ID) -> Optional[Dict[str, Any]]:
+        """Claim the oldest claimable job: pending, or abandoned by a worker whose lease ran out."""
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            # Abandoned too often; give up on it rather than let it crash another worker
+            conn.execute(
+                update(export_jobs)
+                .where(
+                    export_jobs.c.status == "processing", export_jobs.c.lease_expires_at < now,
+                    export_jobs.c.attempts >= JOB_MAX_ATTEMPTS,
+                )
+                .values(status="failed", error="Export was abandoned by its worker", updated_at=now,
+                        claimed_by=None, lease_expires_at=None)
+            )
+            candidates = conn.execute(
+                select(export_jobs.c.id).where(self._claimable(now)).order_by(export_jobs.c.created_at).limit(10)
+            ).scalars().all()
+        # Another worker may win any one of these; the conditional UPDATE decides
+        for export_id in candidates:
+            claimed = self.claim(export_id, worker_id)
+            if claimed is not None:
+                return claimed
+        return None
+
+    def delete(self, export_id: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(export_jobs).where(export_jobs.c.id == export_id))
+
+    def expired(self, now: Optional[datetime] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """Jobs past their expiry time, oldest first."""
+        query = (
+            select(*JOB_COLUMNS)
+            .where(export_jobs.c.expires_at < (now or datetime.utcnow()))
+            .order_by(export_jobs.c.expires_at)
+            .limit(limit)
+        )
+        with self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(query).mappings()]
+
+    def next_expiry(self) -> Optional[datetime]:
+        """When the next job expires, or None if there are no jobs"""
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.min(export_jobs.c.expires_at))).scalar()
+
+    def status(self) -> Dict[str, Any]:
+        """Job counts by status, for the health check."""
+        with self.engine.connect() as conn:
+            counts = conn.execute(
+                select(export_jobs.c.status, func.count()).group_by(export_jobs.c.status)
+            ).all()
+        return {"backend": self.engine.dialect.name, "jobs": {status: count for status, count in counts}}
+
+job_store = JobStore(EXPORT_DATABASE_URL)
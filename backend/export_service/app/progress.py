@@ -0,0 +1,158 @@
+"""
+Export progress as server-sent events.
+
+Instead of polling GET /api/export/{id}, a client opens one stream, either
+for one export or for all of a user's exports. It receives an
+`export.progress` event whenever a job's status or progress changes. The job
+store is the source of truth, and events are snapshots of the job:
+
+- Each event's id is the job's updated_at, in microseconds. A reconnecting
+  EventSource sends Last-Event-ID, and the stream resumes with whatever
+  changed after it.
+- ExportManager publishes every change it makes, which wakes this process's
+  streams at once. Changes made by other workers are picked up by checking
+  the store every EXPORT_STREAM_POLL_SECONDS.
+- An idle stream sends a comment line every EXPORT_STREAM_HEARTBEAT_SECONDS
+  so proxies keep it open, and a stream ends after EXPORT_STREAM_MAX_SECONDS.
+  The client then reconnects and resumes.
+- At most EXPORT_MAX_STREAMS streams are open per process, and
+  EXPORT_MAX_STREAMS_PER_USER per user. Beyond that, opening a stream fails
+  with TooManyStreams (the route answers 429).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.job_store import job_store
+
+# Set up logging
+logger = logging.getLogger("export_service.progress")
+
+# Environment variables
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("EXPORT_STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_POLL_SECONDS = float(os.getenv("EXPORT_STREAM_POLL_SECONDS", "2"))
+STREAM_MAX_SECONDS = float(os.getenv("EXPORT_STREAM_MAX_SECONDS", "600"))
+MAX_STREAMS = int(os.getenv("EXPORT_MAX_STREAMS", "500"))
+MAX_STREAMS_PER_USER = int(os.getenv("EXPORT_MAX_STREAMS_PER_USER", "5"))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Job fields sent in events
+EVENT_FIELDS = ("id", "cv_id", "format", "status", "progress", "download_url", "error", "updated_at", "completed_at")
+
+class TooManyStreams(Exception):
+    """The process or the user already has the maximum number of open streams."""
+
+def event_id(updated_at: datetime) -> int:
+    """SSE id of a job snapshot: its updated_at in microseconds since the epoch"""
+    return int((updated_at - datetime(1970, 1, 1)).total_seconds() * 1_000_000)
+
+def parse_event_id(value: Optional[str]) -> Optional[datetime]:
+    """The updated_at a Last-Event-ID stands for, or None if it isn't one of ours"""
+    if not value or not value.isdigit():
+        return None
+    return datetime.utcfromtimestamp(int(value) / 1_000_000)
+
+def format_event(job: Dict[str, Any]) -> str:
+    data = {field: job.get(field) for field in EVENT_FIELDS}
+    return f"id: {event_id(job['updated_at'])}\nevent: export.progress\ndata: {json.dumps(data, default=str)}\n\n"
+
+class ProgressHub:
+    """Wakes a user's open streams when one of their jobs changes, and counts open streams."""
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self._streams: Dict[str, int] = {}
+
+    def publish(self, user_id: str) -> None:
+        """Signal that one of a user's jobs changed. Call from the event loop."""
+        event = self._events.pop(user_id, None)
+        if event is not None:
+            event.set()
+
+    def subscribe(self, user_id: str) -> asyncio.Event:
+        """
+        An event set by the user's next change.
+
+        Take it before reading the store, so a change made in between still
+        wakes the stream.
+        """
+        event = self._events.get(user_id)
+        if event is None:
+            event = self._events[user_id] = asyncio.Event()
+        return event
+
+    def acquire(self, user_id: str) -> None:
+        """
+        Take one of the open-stream slots; stream_progress() releases it.
+
+        Raises:
+            TooManyStreams: The process or the user is at the limit
+        """
+        if sum(self._streams.values()) >= MAX_STREAMS or self._streams.get(user_id, 0) >= MAX_STREAMS_PER_USER:
+            raise TooManyStreams()
+        self._streams[user_id] = self._streams.get(user_id, 0) + 1
+
+    def release(self, user_id: str) -> None:
+        self._streams[user_id] -= 1
+        if not self._streams[user_id]:
+            del self._streams[user_id]
+
+    def status(self) -> Dict[str, Any]:
+        return {"open_streams": sum(self._streams.values()), "max_streams": MAX_STREAMS}
+
+progress_hub = ProgressHub()
+
+async def _wait(event: asyncio.Event, timeout: float) -> bool:
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+async def stream_progress(
+    user_id: str,
+    export_id: Optional[str],
+    after: Optional[datetime],
+    is_disconnected: Callable[[], Awaitable[bool]]
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for one export, or all of a user's exports, until the client disconnects.
+
+    The caller takes a stream slot with progress_hub.acquire() before
+    starting the response; the stream releases it when it ends.
+
+    Args:
+        user_id: The owner of the exports
+        export_id: Stream only this export; it ends once the export completes or fails
+        after: Only send changes made after this time (from Last-Event-ID)
+        is_disconnected: The request's disconnect check
+    """
+    try:
+        yield "retry: 3000\n\n"
+        started = last_sent = time.monotonic()
+        while not await is_disconnected() and time.monotonic() - started < STREAM_MAX_SECONDS:
+            woken = progress_hub.subscribe(user_id)
+            if export_id is not None:
+                job = await asyncio.to_thread(job_store.get, export_id)
+                if job is None or job["user_id"] != user_id:
+                    yield f"event: export.missing\ndata: {json.dumps({'id': export_id})}\n\n"
+                    return
+                jobs: List[Dict[str, Any]] = [job] if after is None or job["updated_at"] > after else []
+            else:
+                jobs = await asyncio.to_thread(job_store.changed_since, user_id, after)
+            for job in jobs:
+                yield format_event(job)
+                after = job["updated_at"] if after is None else max(after, job["updated_at"])
+                last_sent = time.monotonic()
+            if export_id is not None and job["status"] in TERMINAL_STATUSES:
+                return
+            if not await _wait(woken, STREAM_POLL_SECONDS) and time.monotonic() - last_sent >= STREAM_HEARTBEAT_SECONDS:
+                yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+    finally:
+        progress_hub.release(user_id)
@@ -0,0 +1,34 @@
+"""
+Startup warm-up and readiness for the Export Service.
+
+The render workers start in the background after the port is bound, and each
+loads the rendering libraries, templates and fonts. `/api/ready` returns 503
+until they have all done so, while `/api/health` keeps checking the export
+directory and the CV service. A failed step is retried every WARMUP_RETRY_SECONDS.
+The steps are run by shared.readiness.WarmUp; without it, `warmup` is None,
+the render workers start with the first export and the service is ready at once.
+"""
+import logging
+
+from app.job_store import job_store
+from app.render_pool import render_pool
+
+# Warm-up runner shared by the backend services (needs backend/ on PYTHONPATH)
+try:
+    from shared.readiness import WarmUp
+except ImportError:
+    WarmUp = None
+
+# Set up logging
+logger = logging.getLogger("export_service.readiness")
+
+# The job store creates its table on first use, and the render workers load the
+# libraries, templates and fonts (see app/render_pool.py)
+if WarmUp is not None:
+    warmup = WarmUp([
+        ("job_store", job_store.status),
+        ("render_pool", render_pool.warm),
+    ])
+else:
+    warmup = None
+    logger.warning("shared.readiness not available - the service is ready without a warm-up")
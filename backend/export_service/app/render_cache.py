@@ -0,0 +1,244 @@
+"""
+Content-addressed cache of rendered exports.
+
+Exporting an unchanged CV again with the same format and template options
+produces the same document, so the rendered file is kept under a key
+derived from:
+
+- the CV id and its version (`metadata.version`), or a hash of the CV's
+  content when the CV service doesn't send a version;
+- the format, the template name and a hash of the template's source, so a
+  redeployed template doesn't serve stale renders;
+- a hash of the remaining template options.
+
+A job whose key is cached links the stored file to its own path instead of
+rendering. Linking is instant, and the job's file outlives the cache entry.
+Concurrent jobs with the same key in one process wait for a single render.
+
+Entries are evicted least recently used first once the cache holds more than
+EXPORT_CACHE_MAX_BYTES (0 disables the cache). Using an entry touches its
+atime, so the LRU order is shared by every process that uses the directory.
+The mtime is left alone: jobs' export files share the entry's inode, and
+their ETags are derived from it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger("export_service.render_cache")
+
+# Environment variables
+EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(EXPORT_DIR, "cache"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Bump when a renderer change should invalidate every cached file
+CACHE_FORMAT_VERSION = 1
+
+def _place(source: str, destination: str) -> None:
+    """Hard-link source to destination, copying where links aren't supported."""
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+class RenderCache:
+    """Rendered documents on disk, evicted LRU by total size."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # key -> size in bytes, least recently used first
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._template_hashes: Dict[Tuple[str, float], str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # --- Keys ---
+
+    def _template_hash(self, template_name: str) -> str:
+        from app.document_generator import TEMPLATES_DIR
+
+        path = os.path.join(TEMPLATES_DIR, template_name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return "none"  # ReportLab and DOCX renders don't use a template file
+        digest = self._template_hashes.get((template_name, mtime))
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self._template_hashes[(template_name, mtime)] = digest
+        return digest
+
+    def key(self, cv_id: str, cv_data: Dict[str, Any], format: str, template_options: Optional[Dict[str, Any]]) -> str:
+        """
+        Cache key of a render.
+
+        Args:
+            cv_id: The ID of the CV
+            cv_data: The CV as fetched from the CV service
+            format: pdf or docx
+            template_options: The job's template options
+
+        Returns:
+            A hex digest identifying the rendered output
+        """
+        options = dict(template_options or {})
+        template_name = options.pop("template_name", "default.html")
+        version = (cv_data.get("metadata") or {}).get("version")
+        if version is None:
+            content = json.dumps(cv_data, sort_keys=True, default=str).encode("utf-8")
+            version = "sha256:" + hashlib.sha256(content).hexdigest()
+        material = {
+            "v": CACHE_FORMAT_VERSION,
+            "cv_id": cv_id,
+            "cv_version": version,
+            "format": format.lower(),
+            "template": template_name,
+            "template_hash": self._template_hash(template_name),
+            "options": hashlib.sha256(json.dumps(options, sort_keys=True, default=str).encode("utf-8")).hexdigest(),
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # --- Storage (blocking; call from a thread) ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(last used, key, size) of every file in the cache directory, least recently used first."""
+        files = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    files.append((max(stat.st_atime, stat.st_mtime), entry.name, stat.st_size))
+        return sorted(files)
+
+    def _load(self) -> None:
+        if self._entries is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._entries = OrderedDict((key, size) for _, key, size in self._scan())
+            self._bytes = sum(self._entries.values())
+
+    def fetch(self, key: str, destination: str) -> bool:
+        """
+        Place the cached render for key at destination.
+
+        Returns:
+            True on a hit, False if the key isn't cached
+        """
+        if not self.enabled:
+            return False
+        path = self._path(key)
+        with self._lock:
+            self._load()
+            try:
+                _place(path, destination)
+                stat = os.stat(path)
+                # Mark the entry used; the mtime, and so the linked exports' ETags, stays the same
+                os.utime(path, (time.time(), stat.st_mtime))
+            except FileNotFoundError:
+                # Evicted, possibly by another process
+                self._bytes -= self._entries.pop(key, 0)
+                self.stats["misses"] += 1
+                return False
+            if key not in self._entries:
+                self._entries[key] = stat.st_size
+                self._bytes += self._entries[key]
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return True
+
+    def store(self, key: str, source: str) -> None:
+        """Add a freshly rendered file to the cache, evicting old entries if over the quota."""
+        if not self.enabled:
+            return
+        size = os.stat(source).st_size
+        if size > self.max_bytes:
+            return
+        path = self._path(key)
+        with self._lock:
+            self._load()
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            _place(source, tmp)
+            os.replace(tmp, path)
+            self._bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.stats["stores"] += 1
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used files until the cache is under the quota."""
+        # Rescan, so files written and used by other processes are counted too
+        files = self._scan()
+        total = sum(size for _, _, size in files)
+        for _, key, size in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats["evictions"] += 1
+        self._entries = None
+        self._load()
+
+    def remove(self, key: str) -> None:
+        """Delete one entry, for the janitor's disk quota"""
+        with self._lock:
+            self._load()
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self._bytes -= self._entries.pop(key, 0)
+            self.stats["evictions"] += 1
+
+    @asynccontextmanager
+    async def rendering(self, key: str) -> AsyncIterator[None]:
+        """Serialize renders of the same key in this process, so duplicates become cache hits."""
+        lock, waiters = self._flights.get(key, (asyncio.Lock(), 0))
+        self._flights[key] = (lock, waiters + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, waiters = self._flights[key]
+            if waiters == 1:
+                del self._flights[key]
+            else:
+                self._flights[key] = (lock, waiters - 1)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.enabled:
+                self._load()
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries or {}),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self.stats,
+            }
+
+render_cache = RenderCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES)
@@ -0,0 +1,91 @@
+"""
+What WeasyPrint renders reuse within a process.
+
+Every render process (each render worker, or the service process with
+RENDER_WORKERS=0) keeps:
+
+- compiled Jinja templates, in the template environment's cache. Jinja
+  checks a template's file when the template is fetched, and recompiles it
+  if the file changed, so an edited template is picked up without a
+  restart;
+- parsed stylesheets (the `custom_css` template option), keyed by a hash of
+  their source. At most RENDER_CSS_CACHE_SIZE are kept; the least recently
+  used are dropped first;
+- one FontConfiguration, so fonts from @font-face rules are loaded once per
+  process rather than once per render. Stylesheets are parsed with it,
+  which is why both are kept here.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+# Set up logging
+logger = logging.getLogger("export_service.render_context")
+
+# Environment variables
+RENDER_CSS_CACHE_SIZE = int(os.getenv("RENDER_CSS_CACHE_SIZE", "64"))
+
+class RenderContext:
+    """Per-process cache of parsed stylesheets and the shared font configuration"""
+
+    def __init__(self, css_cache_size: int):
+        self.css_cache_size = css_cache_size
+        self.stats = {"css_hits": 0, "css_misses": 0}
+        self._font_config = None
+        # sha256 of the source -> weasyprint.CSS, least recently used first
+        self._stylesheets: "OrderedDict[str, Any]" = OrderedDict()
+        # With RENDER_WORKERS=0, renders run in threads
+        self._lock = threading.Lock()
+
+    def font_config(self):
+        """The process's weasyprint FontConfiguration"""
+        if self._font_config is None:
+            from weasyprint.text.fonts import FontConfiguration
+
+            with self._lock:
+                if self._font_config is None:
+                    self._font_config = FontConfiguration()
+        return self._font_config
+
+    def stylesheet(self, source: str):
+        """
+        A parsed stylesheet, from the cache when the same source was parsed before.
+
+        Args:
+            source: CSS source
+
+        Returns:
+            A weasyprint CSS object bound to the process's font configuration
+        """
+        from weasyprint import CSS
+
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        with self._lock:
+            css = self._stylesheets.get(key)
+            if css is not None:
+                self._stylesheets.move_to_end(key)
+                self.stats["css_hits"] += 1
+                return css
+            self.stats["css_misses"] += 1
+
+        css = CSS(string=source, font_config=self.font_config())
+        if self.css_cache_size > 0:
+            with self._lock:
+                self._stylesheets[key] = css
+                while len(self._stylesheets) > self.css_cache_size:
+                    self._stylesheets.popitem(last=False)
+        return css
+
+    def clear(self) -> None:
+        """Drop the stylesheets and the font configuration"""
+        with self._lock:
+            self._stylesheets.clear()
+            self._font_config = None
+
+    def status(self) -> Dict[str, Any]:
+        return {"stylesheets": len(self._stylesheets), "max_stylesheets": self.css_cache_size, **self.stats}
+
+render_context = RenderContext(RENDER_CSS_CACHE_SIZE)
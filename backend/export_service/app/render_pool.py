@@ -0,0 +1,190 @@
+"""
+Process pool for document rendering.
+
+WeasyPrint, ReportLab and python-docx are synchronous and CPU-bound. Running
+them on the event loop stalls every other request, status polls included,
+for the whole render, and a thread pool doesn't help because of the GIL. Renders
+go to a ProcessPoolExecutor instead:
+
+- RENDER_WORKERS processes (0 renders in a thread of the service process,
+  for development). At most that many renders are in flight. Callers beyond
+  that wait their turn, so the pool's own queue stays empty.
+- Each worker imports the rendering libraries, compiles the templates and
+  loads the fonts once, when it starts. The startup warm-up starts every
+  worker, so the first exports don't pay for it.
+- A worker is replaced after RENDER_MAX_JOBS_PER_WORKER renders, which
+  bounds WeasyPrint's memory growth.
+- A render that takes longer than RENDER_TIMEOUT_SECONDS fails with
+  RenderTimeout. A running process can't be cancelled, so the pool is torn
+  down and replaced. Renders that were in flight on the old pool are retried
+  once on the new one.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+# Set up logging
+logger = logging.getLogger("export_service.render_pool")
+
+# Environment variables
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "60"))
+RENDER_MAX_JOBS_PER_WORKER = int(os.getenv("RENDER_MAX_JOBS_PER_WORKER", "50"))
+
+class RenderTimeout(Exception):
+    """A render ran past RENDER_TIMEOUT_SECONDS and its worker was killed."""
+
+# --- Worker side ---
+
+# Warm-up steps that failed in this worker, by step name
+_worker_errors: Dict[str, str] = {}
+
+def _init_worker() -> None:
+    """Load libraries, templates and fonts once per worker process."""
+    from app import document_generator
+
+    for name, step in (
+        ("libraries", document_generator.load_libraries),
+        ("templates", document_generator.compile_templates),
+        ("fonts", document_generator.load_fonts),
+    ):
+        try:
+            step()
+        except Exception as e:
+            # Keep the worker: a missing WeasyPrint still leaves ReportLab and DOCX working
+            _worker_errors[name] = str(e)
+
+def _worker_status() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "errors": dict(_worker_errors)}
+
+def _render(method: str, *args) -> str:
+    from app.document_generator import DocumentGenerator
+
+    return getattr(DocumentGenerator, method)(*args)
+
+# --- Service side ---
+
+class RenderPool:
+    """Bounded process pool that runs DocumentGenerator.render_* methods with a timeout."""
+
+    def __init__(self, workers: int, timeout: float, max_jobs_per_worker: int):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.stats = {"completed": 0, "failed": 0, "timed_out": 0, "pool_restarts": 0}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max(workers, 1))
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # Workers start from a clean interpreter: forking would copy the
+                    # event loop and the service's threads into them
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    max_tasks_per_child=self.max_jobs_per_worker or None,
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Kill an executor's workers and make the next render start a new pool."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.stats["pool_restarts"] += 1
+        # shutdown() can't stop a running task, so kill the processes first
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, method: str, *args) -> Any:
+        """
+        Run a DocumentGenerator render method in a worker process.
+
+        Args:
+            method: Name of the render method, e.g. "render_docx"
+            *args: Its arguments; they must be picklable
+
+        Returns:
+            The method's return value
+
+        Raises:
+            RenderTimeout: The render took longer than RENDER_TIMEOUT_SECONDS
+        """
+        if self.workers <= 0:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, _render, method, *args)
+
+        async with self._slots:
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    future = asyncio.wrap_future(executor.submit(_render, method, *args))
+                    result = await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self.stats["timed_out"] += 1
+                    logger.error(f"{method} timed out after {self.timeout:g}s, restarting the render pool")
+                    self._discard(executor)
+                    raise RenderTimeout(f"Rendering took longer than {self.timeout:g}s")
+                except BrokenProcessPool:
+                    # Another render's timeout killed this pool, or a worker crashed
+                    self._discard(executor)
+                    if attempt == 0:
+                        logger.warning(f"Render pool was restarted during {method}, retrying")
+                        continue
+                    self.stats["failed"] += 1
+                    raise
+                except Exception:
+                    self.stats["failed"] += 1
+                    raise
+                self.stats["completed"] += 1
+                return result
+
+    def warm(self) -> Dict[str, Any]:
+        """
+        Start every worker and wait for them to load libraries, templates and fonts.
+
+        Blocking; the startup warm-up runs it in a thread.
+
+        Raises:
+            RuntimeError: A worker failed to load something
+        """
+        if self.workers <= 0:
+            from app import document_generator
+
+            document_generator.load_libraries()
+            document_generator.load_fonts()
+            return {"workers": 0, **document_generator.compile_templates()}
+
+        executor = self._get_executor()
+        # Submitting as many tasks as workers makes the pool start all of them
+        statuses = [future.result() for future in [executor.submit(_worker_status) for _ in range(self.workers)]]
+        errors = {name: error for status in statuses for name, error in status["errors"].items()}
+        if errors:
+            raise RuntimeError(f"render workers failed to load: {errors}")
+        return {"workers": len({status["pid"] for status in statuses})}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "timeout_seconds": self.timeout,
+            "max_jobs_per_worker": self.max_jobs_per_worker,
+            **self.stats,
+        }
+
+render_pool = RenderPool(RENDER_WORKERS, RENDER_TIMEOUT_SECONDS, RENDER_MAX_JOBS_PER_WORKER)
@@ -1,13 +1,18 @@
 import os
 import logging
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 from datetime import datetime
 import jwt
 
 from app.export_manager import ExportManager
+from app.batch_export import EXPORT_BATCH_MAX_DOCUMENTS, stream_batch_zip
+from app.downloads import ArtifactResponse, MEDIA_TYPES, document_response, export_filename
+from app.scheduler import QueueFull, export_scheduler
+from app.progress import TooManyStreams, parse_event_id, progress_hub, stream_progress
 
 # Set up logging
 logger = logging.getLogger("export_service.routes")
@@ -16,6 +21,7 @@ logger = logging.getLogger("export_service.routes")
 JWT_SECRET = os.getenv("JWT_SECRET", "development_secret_key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
+EXPORT_SYNC_BUDGET_SECONDS = float(os.getenv("EXPORT_SYNC_BUDGET_SECONDS", "2"))
 
 # Create router
 router = APIRouter()
@@ -26,6 +32,11 @@ class ExportRequest(BaseModel):
     format: str = "pdf"
     template_options: Optional[Dict[str, Any]] = None
 
+class BatchExportRequest(BaseModel):
+    cv_ids: List[str]
+    formats: List[str] = ["pdf"]
+    template_options: Optional[Dict[str, Any]] = None
+
 class ExportResponse(BaseModel):
     id: str
     status: str
@@ -95,7 +106,8 @@ async def verify_token(authorization: str = None):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        return {"user_id": user_id, "token": token}
+        # Subscription plan, for export scheduling; tokens without one count as basic
+        return {"user_id": user_id, "token": token, "plan": payload.get("plan")}
     
     except (jwt.PyJWTError, ValueError) as e:
         raise HTTPException(
@@ -104,17 +116,39 @@ async def verify_token(authorization: str = None):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def _queue_full(error: QueueFull) -> HTTPException:
+    """The 429 for an export refused by admission control"""
+    detail = (
+        "Too many exports in progress for this user" if error.reason == "user_limit"
+        else "The export queue is full"
+    )
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"{detail}, please retry later",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 # Routes
-@router.post("/api/export", response_model=ExportResponse, status_code=status.HTTP_202_ACCEPTED)
+@router.post(
+    "/api/export",
+    response_model=ExportResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={200: {"description": "The exported document, when `wait` is set and it rendered in time"}}
+)
 async def create_export(
     export_req: ExportRequest,
-    background_tasks: BackgroundTasks,
+    wait: bool = Query(False, description="Return the document itself if it renders within the sync budget"),
     auth = Depends(verify_token)
 ):
     """
     Create a new export job
     
-    This will start a background task to generate the export file.
+    The export is queued by the scheduler and generated in the background.
+    A full queue, or too many of the user's exports in flight, is answered
+    with 429 and Retry-After. With `wait=true` the export runs while the request waits, for up to
+    EXPORT_SYNC_BUDGET_SECONDS: a document ready by then is returned
+    directly (200), otherwise the usual 202 and job ID are returned and the
+    export carries on in the background.
     """
     user_id = auth["user_id"]
     token = auth["token"]
@@ -126,20 +160,55 @@ async def create_export(
             detail="Unsupported format. Supported formats: pdf, docx"
         )
     
+    # Admission control: refuse rather than queue without bound
+    try:
+        ticket = export_scheduler.admit(user_id, auth["plan"])
+    except QueueFull as e:
+        raise _queue_full(e)
+    
     # Create export job
-    job = await ExportManager.create_export_job(
-        cv_id=export_req.cv_id,
-        format=export_req.format,
-        user_id=user_id,
-        template_options=export_req.template_options
-    )
+    try:
+        job = await ExportManager.create_export_job(
+            cv_id=export_req.cv_id,
+            format=export_req.format,
+            user_id=user_id,
+            template_options=export_req.template_options
+        )
+    except BaseException:
+        ticket.cancel()
+        raise
     
-    # Start background task to process the job
-    background_tasks.add_task(
-        ExportManager.process_export_job,
-        export_id=job["id"],
-        token=token
-    )
+    if wait and EXPORT_SYNC_BUDGET_SECONDS > 0:
+        try:
+            result = await ExportManager.export_inline(job["id"], token, EXPORT_SYNC_BUDGET_SECONDS, ticket=ticket)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Export failed: {str(e)}"
+            )
+        
+        if result is not None:
+            headers = {"X-Export-ID": job["id"]}
+            if "content" in result:
+                # Sent from memory; the export file and cache entry are written after the response
+                response = document_response(result["content"], job["format"], export_filename(job))
+                response.headers.update(headers)
+                response.background = BackgroundTask(ExportManager.persist_render, result)
+                return response
+            return ArtifactResponse(
+                result["filepath"],
+                media_type=MEDIA_TYPES[job["format"]],
+                filename=export_filename(job),
+                headers=headers
+            )
+        
+        # Over budget: the render continues in the background
+        job["status"] = "processing"
+    else:
+        # Queue the job now rather than after the response, so its ticket is always used
+        ExportManager.start_export_job(job["id"], token, ticket)
     
     # Return job details
     return {
@@ -151,6 +220,119 @@ async def create_export(
         "download_url": job["download_url"]
     }
 
+@router.post(
+    "/api/export/batch",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/zip": {}}, "description": "A ZIP archive of the exported documents"}}
+)
+async def create_batch_export(
+    batch_req: BatchExportRequest,
+    auth = Depends(verify_token)
+):
+    """
+    Export several CVs, each in one or more formats, as one ZIP archive
+    
+    The archive is streamed while the documents are rendered. Documents
+    that fail are listed in an `errors.json` entry instead of failing the
+    whole batch. Each document is admitted by the scheduler like a single
+    export; a batch that can't be admitted is answered with 429 and Retry-After.
+    """
+    formats = list(dict.fromkeys(format.lower() for format in batch_req.formats))
+    cv_ids = list(dict.fromkeys(batch_req.cv_ids))
+    
+    # Validate formats
+    if not formats or any(format not in ["pdf", "docx"] for format in formats):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported format. Supported formats: pdf, docx"
+        )
+    
+    if not cv_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No CVs to export"
+        )
+    
+    if len(cv_ids) * len(formats) > EXPORT_BATCH_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch export is limited to {EXPORT_BATCH_MAX_DOCUMENTS} documents"
+        )
+    
+    # Every document counts against the queue and the user's allowance
+    try:
+        tickets = export_scheduler.admit_batch(auth["user_id"], auth["plan"], len(cv_ids) * len(formats))
+    except QueueFull as e:
+        raise _queue_full(e)
+    
+    def cancel_tickets() -> None:
+        # The stream cancels them itself, unless the client left before it started
+        for ticket in tickets:
+            ticket.cancel()
+    
+    logger.info(f"Starting batch export of {len(cv_ids)} CVs as {', '.join(formats)} for user {auth['user_id']}")
+    filename = f"cv_export_{datetime.utcnow().strftime('%Y%m%d')}.zip"
+    return StreamingResponse(
+        stream_batch_zip(cv_ids, formats, batch_req.template_options, auth["token"], tickets),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "private, no-store"},
+        background=BackgroundTask(cancel_tickets),
+    )
+
+def _event_stream(request: Request, user_id: str, export_id: Optional[str], last_event_id: Optional[str]) -> StreamingResponse:
+    """Open a progress stream, or refuse with 429 if too many are open"""
+    try:
+        progress_hub.acquire(user_id)
+    except TooManyStreams:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open progress streams",
+            headers={"Retry-After": "30"},
+        )
+    return StreamingResponse(
+        stream_progress(user_id, export_id, parse_event_id(last_event_id), request.is_disconnected),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding back events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/api/export/events", response_class=StreamingResponse)
+async def stream_export_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    auth = Depends(verify_token)
+):
+    """
+    Stream progress of all the current user's exports as server-sent events
+    
+    Starts with the user's recent exports, or with what changed since
+    Last-Event-ID when reconnecting, then sends an `export.progress` event
+    whenever an export changes.
+    """
+    return _event_stream(request, auth["user_id"], None, last_event_id)
+
+@router.get("/api/export/{export_id}/events", response_class=StreamingResponse)
+async def stream_export_job_events(
+    export_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    auth = Depends(verify_token)
+):
+    """
+    Stream progress of one export as server-sent events
+    
+    The stream ends once the export completes or fails.
+    """
+    user_id = auth["user_id"]
+    
+    if not await ExportManager.get_export_job(export_id, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Export job with ID {export_id} not found"
+        )
+    
+    return _event_stream(request, user_id, export_id, last_event_id)
+
 @router.get("/api/export/{export_id}", response_model=ExportStatusResponse)
 async def get_export_status(
     export_id: str,
@@ -185,21 +367,10 @@ async def list_exports(
     """
     user_id = auth["user_id"]
     
-    # Get user's export jobs
-    jobs = await ExportManager.get_user_export_jobs(user_id)
-    
-    # Apply filters
-    if status:
-        jobs = [job for job in jobs if job["status"].lower() == status.lower()]
-    
-    if format:
-        jobs = [job for job in jobs if job["format"].lower() == format.lower()]
-    
-    # Get total count before pagination
-    total_count = len(jobs)
-    
-    # Apply pagination
-    jobs = jobs[offset:offset+limit]
+    # Get the requested page of the user's export jobs, filtered and counted by the store
+    jobs, total_count = await ExportManager.get_user_export_jobs(
+        user_id, status=status, format=format, limit=limit, offset=offset
+    )
     
     return {
         "exports": jobs,
@@ -209,12 +380,14 @@ async def list_exports(
 @router.get("/api/export/download/{export_id}")
 async def download_export(
     export_id: str,
+    request: Request,
     auth = Depends(verify_token)
 ):
     """
     Download an export file
     
     The file will be served as an attachment with the appropriate Content-Type.
+    A `Range` header requests part of the file.
     """
     user_id = auth["user_id"]
     
@@ -242,17 +415,17 @@ async def download_export(
             detail="Export file not found"
         )
     
-    # Determine content type based on format
-    content_type = "application/pdf" if job["format"] == "pdf" else "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    
-    # Generate filename
-    filename = f"cv_{job['cv_id']}_{datetime.utcnow().strftime('%Y%m%d')}.{job['format']}"
+    # Mark the file used for the janitor's LRU eviction; the mtime, and so the ETag, stays the same
+    stat = os.stat(filepath)
+    os.utime(filepath, (datetime.now().timestamp(), stat.st_mtime))
     
-    # Return file
-    return FileResponse(
-        path=filepath,
-        media_type=content_type,
-        filename=filename
+    # Serve the file, with Range support for resumed downloads
+    return ArtifactResponse(
+        filepath,
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+        media_type=MEDIA_TYPES[job["format"]],
+        filename=export_filename(job)
     )
 
 @router.delete("/api/export/{export_id}", status_code=status.HTTP_204_NO_CONTENT)
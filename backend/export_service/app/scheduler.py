@@ -0,0 +1,259 @@
+"""
+Admission control and fair scheduling of exports.
+
+Every document export must be admitted before it runs: single exports
+before their job is created, batch exports (one ticket per document) before
+the archive is streamed, and jobs picked up by the poller once claimed.
+Admission fails with QueueFull, and the route answers 429 with Retry-After,
+when:
+
+- the documents waiting in this process would exceed EXPORT_QUEUE_MAX, or
+- the user's documents waiting or running would exceed
+  EXPORT_MAX_INFLIGHT_PER_USER. A batch larger than that allowance is only
+  admitted when the user has nothing else in flight.
+
+Admitted exports run at most EXPORT_SCHEDULER_CONCURRENCY at a time
+(default: one per render worker). When a slot frees up, the next export is
+chosen by weighted fair queuing across users. Each admission gets a virtual
+finish tag, 1/weight after the later of the scheduler's virtual time and the
+user's previous tag. The smallest tag runs first, so:
+
+- one user's burst is interleaved with other users' exports instead of
+  running ahead of them;
+- a user's plan (the `plan` claim of their token) sets their weight. With
+  the default EXPORT_PLAN_WEIGHTS, enterprise users get four times the
+  throughput of basic users when both are queued, and pro users twice as
+  much. Nobody is starved.
+
+Queue depth, queue wait and rejections are exported as Prometheus metrics.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.render_pool import RENDER_WORKERS
+
+# Set up logging
+logger = logging.getLogger("export_service.scheduler")
+
+# Environment variables
+EXPORT_QUEUE_MAX = int(os.getenv("EXPORT_QUEUE_MAX", "200"))
+EXPORT_MAX_INFLIGHT_PER_USER = int(os.getenv("EXPORT_MAX_INFLIGHT_PER_USER", "5"))
+EXPORT_SCHEDULER_CONCURRENCY = int(os.getenv("EXPORT_SCHEDULER_CONCURRENCY", str(max(RENDER_WORKERS, 1))))
+EXPORT_PLAN_WEIGHTS = os.getenv("EXPORT_PLAN_WEIGHTS", "basic:1,pro:2,enterprise:4")
+
+DEFAULT_PLAN = "basic"
+
+QUEUE_DEPTH = Gauge(
+    "export_queue_depth", "Exports admitted and waiting for a slot", ["plan"], multiprocess_mode="livesum"
+)
+RUNNING = Gauge(
+    "export_scheduler_running", "Exports holding a scheduler slot", multiprocess_mode="livesum"
+)
+QUEUE_WAIT = Histogram(
+    "export_queue_wait_seconds", "Time from admission to the start of an export", ["plan"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+REJECTED = Counter(
+    "export_rejected_total", "Export requests refused by admission control", ["plan", "reason"]
+)
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        plan, _, weight = item.partition(":")
+        if plan.strip() and weight.strip():
+            weights[plan.strip().lower()] = max(float(weight), 0.01)
+    return weights
+
+class QueueFull(Exception):
+    """The export can't be admitted now; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class Ticket:
+    """
+    An admitted export's place in the scheduler.
+
+    `async with ticket:` waits for the export's turn and holds a slot while
+    the export runs. A ticket that will never be used must be cancelled.
+    """
+
+    def __init__(self, scheduler: "ExportScheduler", user_id: str, plan: str, tag: float):
+        self.user_id = user_id
+        self.plan = plan
+        self.tag = tag
+        self.admitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.state = "queued"  # queued, running or done
+        self._scheduler = scheduler
+        self._turn: Optional[asyncio.Future] = None
+
+    async def __aenter__(self) -> "Ticket":
+        await self._scheduler._wait_turn(self)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._scheduler._release(self)
+
+    def cancel(self) -> None:
+        self._scheduler._release(self)
+
+class ExportScheduler:
+    """Bounded, weighted-fair queue of exports in front of rendering."""
+
+    def __init__(self, concurrency: int, max_queue: int, max_per_user: int, weights: Dict[str, float]):
+        self.concurrency = max(concurrency, 1)
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.weights = weights
+        self.stats = {"admitted": 0, "rejected": 0}
+        self._heap: List[Tuple[float, int, Ticket]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        # Per user: the last virtual finish tag, and tickets not yet done
+        self._user_tags: Dict[str, float] = {}
+        self._user_tickets: Dict[str, int] = {}
+        self._queued = 0
+        self._running = 0
+        # Moving average of how long an export holds its slot, for Retry-After
+        self._average_seconds = 5.0
+
+    def _weight(self, plan: str) -> float:
+        return self.weights.get(plan, self.weights.get(DEFAULT_PLAN, 1.0))
+
+    def _retry_after(self) -> int:
+        backlog = (self._queued + self._running) / self.concurrency
+        return min(max(math.ceil(backlog * self._average_seconds), 1), 300)
+
+    def admit(self, user_id: str, plan: Optional[str] = None) -> Ticket:
+        """
+        Admit an export, or refuse it if the queue or the user's allowance is full.
+
+        Args:
+            user_id: The ID of the user requesting the export
+            plan: The user's subscription plan; unknown plans get the basic weight
+
+        Returns:
+            The export's ticket
+
+        Raises:
+            QueueFull: The export can't be admitted now
+        """
+        return self.admit_batch(user_id, plan, 1)[0]
+
+    def admit_batch(self, user_id: str, plan: Optional[str], documents: int) -> List[Ticket]:
+        """
+        Admit all the documents of a batch export, or none of them.
+
+        Args:
+            user_id: The ID of the user requesting the export
+            plan: The user's subscription plan; unknown plans get the basic weight
+            documents: The number of documents in the batch
+
+        Returns:
+            One ticket per document, in order
+
+        Raises:
+            QueueFull: The batch can't be admitted now
+        """
+        plan = (plan or DEFAULT_PLAN).lower()
+        inflight = self._user_tickets.get(user_id, 0)
+        reason = None
+        if self._queued + documents > self.max_queue:
+            reason = "queue_full"
+        elif inflight and inflight + documents > self.max_per_user:
+            reason = "user_limit"
+        if reason is not None:
+            self.stats["rejected"] += documents
+            REJECTED.labels(plan, reason).inc(documents)
+            raise QueueFull(reason, self._retry_after())
+
+        tickets = []
+        tag = max(self._virtual_time, self._user_tags.get(user_id, 0.0))
+        for _ in range(documents):
+            tag += 1 / self._weight(plan)
+            tickets.append(Ticket(self, user_id, plan, tag))
+        self._user_tags[user_id] = tag
+        self._user_tickets[user_id] = inflight + documents
+        self._queued += documents
+        self.stats["admitted"] += documents
+        QUEUE_DEPTH.labels(plan).inc(documents)
+        return tickets
+
+    async def _wait_turn(self, ticket: Ticket) -> None:
+        if ticket.state != "queued":
+            raise RuntimeError("ticket was already used")
+        ticket._turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (ticket.tag, next(self._sequence), ticket))
+        self._dispatch()
+        try:
+            await ticket._turn
+        except asyncio.CancelledError:
+            # Gave up waiting, or was cancelled right after getting the slot
+            self._release(ticket)
+            raise
+
+    def _dispatch(self) -> None:
+        """Start the waiting exports with the smallest tags while slots are free."""
+        while self._running < self.concurrency and self._heap:
+            tag, _, ticket = heapq.heappop(self._heap)
+            if ticket.state != "queued" or ticket._turn.done():
+                continue
+            ticket.state = "running"
+            ticket.started_at = time.monotonic()
+            self._queued -= 1
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, tag)
+            QUEUE_DEPTH.labels(ticket.plan).dec()
+            QUEUE_WAIT.labels(ticket.plan).observe(ticket.started_at - ticket.admitted_at)
+            RUNNING.inc()
+            ticket._turn.set_result(None)
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket.state == "done":
+            return
+        if ticket.state == "running":
+            self._running -= 1
+            RUNNING.dec()
+            self._average_seconds = 0.8 * self._average_seconds + 0.2 * (time.monotonic() - ticket.started_at)
+        else:
+            self._queued -= 1
+            QUEUE_DEPTH.labels(ticket.plan).dec()
+        ticket.state = "done"
+        remaining = self._user_tickets[ticket.user_id] - 1
+        if remaining:
+            self._user_tickets[ticket.user_id] = remaining
+        else:
+            del self._user_tickets[ticket.user_id]
+            del self._user_tags[ticket.user_id]
+        self._dispatch()
+
+    def idle(self) -> bool:
+        """Whether a slot is free and nothing admitted is waiting for one"""
+        return self._queued == 0 and self._running < self.concurrency
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queued,
+            "running": self._running,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "max_inflight_per_user": self.max_per_user,
+            "average_export_seconds": round(self._average_seconds, 3),
+            **self.stats,
+        }
+
+export_scheduler = ExportScheduler(
+    EXPORT_SCHEDULER_CONCURRENCY, EXPORT_QUEUE_MAX, EXPORT_MAX_INFLIGHT_PER_USER, _parse_weights(EXPORT_PLAN_WEIGHTS)
+)
@@ -0,0 +1,119 @@
+"""
+WeasyPrint render benchmark: cold render setup against the warm render context.
+
+Renders the default template with a custom stylesheet to memory, the way a
+render worker does. "cold" builds everything per render, as renders did
+before the render context: a freshly compiled template, a new
+FontConfiguration and a newly parsed stylesheet. "warm" reuses the cached
+template, stylesheet and font configuration. The setup steps are also
+timed on their own. Needs WeasyPrint and its system libraries:
+
+    cd backend/export_service
+    python -m benchmarks.render_context
+"""
+import argparse
+import io
+import sys
+import timeit
+from typing import Any, Callable, Dict
+
+import jinja2
+
+from app.document_generator import TEMPLATES_DIR, DocumentGenerator, template_env
+from app.render_context import render_context
+
+# Web fonts and a few dozen rules, like a user's theme
+CUSTOM_CSS = """
+@font-face { font-family: "Body"; src: local("DejaVu Sans"), local("Arial"); }
+@font-face { font-family: "Heading"; src: local("DejaVu Serif"), local("Georgia"); }
+body { font-family: "Body", sans-serif; font-size: 10.5pt; color: #222; }
+h1, h2, h3 { font-family: "Heading", serif; color: #1f6feb; }
+""" + "\n".join(
+    f".section-{i} {{ margin: {i % 4}mm 0; padding: 2mm; border-left: 1pt solid #ccc; }}" for i in range(40)
+)
+
+def cv_data(sections: int) -> Dict[str, Any]:
+    return {
+        "title": "Senior Software Engineer",
+        "personal_info": {
+            "first_name": "Jane", "last_name": "Smith", "email": "jane@example.com",
+            "phone": "+44 20 7946 0000", "location": "London, UK",
+        },
+        "summary": "Engineer with ten years of experience in distributed systems. " * 4,
+        "experience": [
+            {
+                "title": "Senior Software Engineer", "company": f"Company {i} Ltd", "location": "London",
+                "start_date": f"{2012 + i}-03", "end_date": f"{2013 + i}-02", "current": False,
+                "description": "Led the migration of a monolith to event-driven services. " * 3,
+            }
+            for i in range(sections)
+        ],
+        "education": [
+            {"degree": "MSc", "field_of_study": "Computer Science", "institution": "University of Leeds",
+             "start_date": "2009", "end_date": "2011", "description": "Distributed systems"}
+        ],
+        "skills": [f"Skill {i}" for i in range(sections * 3)],
+        "certifications": [],
+    }
+
+def cold_render(cv: Dict[str, Any], options: Dict[str, Any]) -> None:
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=TEMPLATES_DIR))
+    html = HTML(string=env.get_template("default.html").render(cv=cv, options=options), base_url=TEMPLATES_DIR)
+    font_config = FontConfiguration()
+    css = CSS(string=options["custom_css"], font_config=font_config)
+    html.write_pdf(io.BytesIO(), stylesheets=[css], font_config=font_config)
+
+def warm_render(cv: Dict[str, Any], options: Dict[str, Any]) -> None:
+    DocumentGenerator.render_pdf_weasyprint(cv, io.BytesIO(), options)
+
+def measure(fn: Callable[[], Any], number: int) -> float:
+    """Best per-call time in milliseconds over three runs."""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e3
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sections", type=int, default=6, help="Experiences in the CV (skills are 3x this)")
+    parser.add_argument("--number", type=int, default=10, help="Renders per timing run")
+    args = parser.parse_args()
+
+    try:
+        from weasyprint import CSS, __version__ as weasyprint_version
+        from weasyprint.text.fonts import FontConfiguration
+    except (ImportError, OSError) as e:
+        print(f"WeasyPrint is not available: {e}")
+        return 1
+
+    cv = cv_data(args.sections)
+    options = {"template_name": "default.html", "custom_css": CUSTOM_CSS}
+    # Fill the caches, as the render worker warm-up and the first render do
+    warm_render(cv, options)
+
+    steps = {
+        "template": (
+            lambda: jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=TEMPLATES_DIR)).get_template("default.html"),
+            lambda: template_env.get_template("default.html"),
+        ),
+        "stylesheet": (
+            lambda: CSS(string=CUSTOM_CSS, font_config=FontConfiguration()),
+            lambda: render_context.stylesheet(CUSTOM_CSS),
+        ),
+        "full render": (
+            lambda: cold_render(cv, options),
+            lambda: warm_render(cv, options),
+        ),
+    }
+    print(f"WeasyPrint {weasyprint_version}, {args.sections} experiences, {len(CUSTOM_CSS)} bytes of custom CSS")
+    print(f"{'step':<12} {'cold':>10} {'warm':>10} {'saved':>10}")
+    for name, (cold, warm) in steps.items():
+        number = args.number if name == "full render" else args.number * 20
+        cold_ms = measure(cold, number)
+        warm_ms = measure(warm, number)
+        print(f"{name:<12} {cold_ms:8.2f}ms {warm_ms:8.2f}ms {cold_ms - warm_ms:8.2f}ms")
+    print(f"render context: {render_context.status()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,7 +27,7 @@ from app import app as export_app
 # Add request ID and logging middleware
 @export_app.middleware("http")
 async def add_request_id_and_log(request: Request, call_next):
-    request_id = str(uuid.uuid4())
+    request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
     request.state.request_id = request_id
     
     start_time = time.time()
@@ -0,0 +1,43 @@
+"""
+Test setup for the export service.
+
+The service reads its configuration from the environment when it is
+imported, so exports go to a temporary directory and renders run in the
+test process (RENDER_WORKERS=0). Run from backend/export_service:
+
+    python -m pytest
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The service's `app` package, and `shared` from backend/
+sys.path[:0] = [SERVICE_DIR, os.path.dirname(SERVICE_DIR)]
+os.environ.setdefault("EXPORT_DIR", tempfile.mkdtemp())
+os.environ.setdefault("RENDER_WORKERS", "0")
+
+from app.job_store import JobStore
+
+@pytest.fixture
+def store(tmp_path):
+    """A job store of its own, on a fresh SQLite file"""
+    return JobStore(f"sqlite:///{tmp_path / 'export_jobs.db'}")
+
+@pytest.fixture
+def new_job(store):
+    """Add a pending job to the store and return its ID"""
+    def create(user_id: str = "user-1", created_at: datetime = None) -> str:
+        now = created_at or datetime.utcnow()
+        export_id = str(uuid4())
+        store.create({
+            "id": export_id, "user_id": user_id, "cv_id": str(uuid4()), "format": "pdf",
+            "template_options": {}, "status": "pending", "progress": 0,
+            "created_at": now, "updated_at": now, "expires_at": now + timedelta(days=1),
+        })
+        return export_id
+    return create
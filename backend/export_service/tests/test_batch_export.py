@@ -0,0 +1,88 @@
+"""Batch exports: the streamed archive, errors.json, and cleanup when the client goes away."""
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+from app import batch_export
+from app.batch_export import stream_batch_zip
+from app.scheduler import ExportScheduler
+
+class CVNotFound(Exception):
+    detail = "CV not found"
+
+@pytest.fixture
+def renders(monkeypatch):
+    """CV fetches and renders the test controls; returns the renders that were started"""
+    started = []
+
+    async def fetch_cv_data(cv_id, token):
+        if cv_id == "missing":
+            raise CVNotFound()
+        return {"id": cv_id}
+
+    async def generate_document_bytes(cv_data, format, template_options=None):
+        started.append((cv_data["id"], format))
+        if cv_data["id"] == "broken" and format == "pdf":
+            raise RuntimeError("template broke")
+        if cv_data["id"] == "slow":
+            await asyncio.sleep(60)
+        return f"{cv_data['id']}.{format}".encode()
+
+    monkeypatch.setattr(batch_export, "fetch_cv_data", fetch_cv_data)
+    monkeypatch.setattr(batch_export.DocumentGenerator, "generate_document_bytes", generate_document_bytes)
+    return started
+
+def test_archive_holds_every_document_and_lists_the_failures(renders):
+    scheduler = ExportScheduler(2, 100, 100, {"basic": 1})
+    cv_ids, formats = ["cv-1", "missing", "broken"], ["pdf", "docx"]
+
+    async def run():
+        tickets = scheduler.admit_batch("user-1", None, len(cv_ids) * len(formats))
+        return b"".join([chunk async for chunk in stream_batch_zip(cv_ids, formats, None, "token", tickets)])
+
+    archive = zipfile.ZipFile(io.BytesIO(asyncio.run(run())))
+
+    assert sorted(archive.namelist()) == ["cv_broken.docx", "cv_cv-1.docx", "cv_cv-1.pdf", "errors.json"]
+    assert archive.read("cv_cv-1.pdf") == b"cv-1.pdf"
+    assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+    errors = sorted(json.loads(archive.read("errors.json")), key=lambda error: (error["cv_id"], error["format"]))
+    assert errors == [
+        {"cv_id": "broken", "format": "pdf", "error": "Failed to render: template broke"},
+        {"cv_id": "missing", "format": "docx", "error": "Failed to fetch CV: CV not found"},
+        {"cv_id": "missing", "format": "pdf", "error": "Failed to fetch CV: CV not found"},
+    ]
+    assert scheduler.status()["queued"] == scheduler.status()["running"] == 0
+
+def test_archive_without_failures_has_no_errors_entry(renders):
+    scheduler = ExportScheduler(1, 100, 100, {"basic": 1})
+
+    async def run():
+        tickets = scheduler.admit_batch("user-1", None, 1)
+        return b"".join([chunk async for chunk in stream_batch_zip(["cv-1"], ["pdf"], None, "token", tickets)])
+
+    assert zipfile.ZipFile(io.BytesIO(asyncio.run(run()))).namelist() == ["cv_cv-1.pdf"]
+
+def test_disconnect_cancels_renders_and_tickets(renders):
+    scheduler = ExportScheduler(1, 100, 100, {"basic": 1})
+    cv_ids = ["cv-1", "slow", "cv-2", "cv-3"]
+
+    async def run():
+        tickets = scheduler.admit_batch("user-1", None, len(cv_ids))
+        stream = stream_batch_zip(cv_ids, ["pdf"], None, "token", tickets)
+        first = await stream.__anext__()
+        # The client goes away while "slow" holds the only render slot
+        await asyncio.sleep(0.05)
+        await stream.aclose()
+        await asyncio.sleep(0)
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return first, tickets
+
+    first, tickets = asyncio.run(run())
+
+    assert b"cv_cv-1.pdf" in first
+    assert renders == [("cv-1", "pdf"), ("slow", "pdf")]
+    assert [ticket.state for ticket in tickets] == ["done"] * len(cv_ids)
+    assert scheduler.status()["queued"] == scheduler.status()["running"] == 0
@@ -0,0 +1,30 @@
+"""Service tokens for fetching CVs, and the secret they are signed with."""
+import jwt
+import pytest
+
+from app import cv_service_client
+from app.cv_service_client import JWT_ALGORITHM, check_jwt_secret, service_token
+
+def test_service_token_is_a_short_lived_token_for_the_user():
+    token = service_token("user-1")
+
+    claims = jwt.decode(token, cv_service_client.JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    assert claims["user_id"] == claims["sub"] == "user-1"
+    assert claims["iss"] == "export_service"
+    assert claims["exp"] - claims["iat"] == cv_service_client.SERVICE_TOKEN_SECONDS
+
+def test_startup_fails_without_jwt_secret_outside_development(monkeypatch):
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    monkeypatch.setattr(cv_service_client, "ENVIRONMENT", "production")
+
+    with pytest.raises(RuntimeError, match="JWT_SECRET"):
+        check_jwt_secret()
+
+    monkeypatch.setenv("JWT_SECRET", "a-real-secret")
+    check_jwt_secret()
+
+def test_development_may_use_the_default_secret(monkeypatch):
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    monkeypatch.setattr(cv_service_client, "ENVIRONMENT", "development")
+
+    check_jwt_secret()
@@ -0,0 +1,100 @@
+"""Stored export downloads: byte ranges, If-Range and zero-copy sending."""
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.downloads import ArtifactResponse, parse_range
+
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "export.pdf"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+@pytest.fixture
+def client(artifact):
+    app = FastAPI()
+
+    @app.get("/download")
+    async def download(request: Request):
+        return ArtifactResponse(
+            artifact, range_header=request.headers.get("range"), if_range=request.headers.get("if-range"),
+            media_type="application/pdf", filename="cv.pdf",
+        )
+
+    return TestClient(app)
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=90-500", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    # Several ranges and malformed headers get the whole file
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("bytes=a-b", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(ValueError):
+        parse_range("bytes=20-10", 100)
+
+def test_whole_file(client):
+    response = client.get("/download")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+def test_range_is_sent_as_partial_content(client):
+    response = client.get("/download", headers={"Range": "bytes=1000-1999"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[1000:2000]
+    assert response.headers["content-range"] == f"bytes 1000-1999/{len(CONTENT)}"
+    assert response.headers["content-length"] == "1000"
+
+def test_range_past_the_end_is_not_satisfiable(client):
+    response = client.get("/download", headers={"Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.content == b""
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+def test_if_range_sends_the_part_only_while_the_file_is_unchanged(client, artifact):
+    etag = client.get("/download").headers["etag"]
+
+    assert client.get("/download", headers={"Range": "bytes=0-99", "If-Range": etag}).status_code == 206
+
+    with open(artifact, "wb") as f:
+        f.write(CONTENT[::-1])
+    os.utime(artifact, (1_000_000, 1_000_000))
+    stale = client.get("/download", headers={"Range": "bytes=0-99", "If-Range": etag})
+
+    assert stale.status_code == 200
+    assert stale.content == CONTENT[::-1]
+    assert stale.headers["etag"] != etag
+
+def test_range_is_handed_to_the_server_for_zero_copy_sending(artifact):
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            os.lseek(message["file"], message["offset"], os.SEEK_SET)
+            message = {**message, "body": os.read(message["file"], message["count"])}
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(ArtifactResponse(artifact, range_header="bytes=100-199")(scope, None, send))
+
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == "http.response.zerocopysend"
+    assert messages[1]["body"] == CONTENT[100:200]
+    assert messages[1]["more_body"] is False
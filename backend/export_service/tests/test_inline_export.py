@@ -0,0 +1,81 @@
+"""Inline exports: rendered while the client waits, finished in the background past the budget."""
+import asyncio
+import os
+
+import pytest
+
+from app import export_manager
+from app.export_manager import ExportManager
+from app.render_cache import RenderCache
+
+@pytest.fixture
+def render(store, tmp_path, monkeypatch):
+    """Run exports against the test's store, with a CV fetch and a render the test controls"""
+    control = {"seconds": 0.0, "error": None}
+
+    async def fetch_cv_data(cv_id, token):
+        return {"id": cv_id, "metadata": {"version": 1}}
+
+    async def generate_document_bytes(cv_data, format, template_options=None):
+        await asyncio.sleep(control["seconds"])
+        if control["error"]:
+            raise control["error"]
+        return b"%PDF-1.7 " + cv_data["id"].encode()
+
+    monkeypatch.setattr(export_manager, "job_store", store)
+    monkeypatch.setattr(export_manager, "fetch_cv_data", fetch_cv_data)
+    monkeypatch.setattr(export_manager, "render_cache", RenderCache(str(tmp_path / "cache"), 0))
+    monkeypatch.setattr(export_manager.DocumentGenerator, "generate_document_bytes", generate_document_bytes)
+    return control
+
+def test_render_within_the_budget_is_returned_and_then_stored(store, new_job, render):
+    export_id = new_job()
+
+    async def export():
+        result = await ExportManager.export_inline(export_id, "token", budget=5)
+        assert store.get(export_id)["status"] == "processing"
+        await ExportManager.persist_render(result)
+        return result
+
+    result = asyncio.run(export())
+
+    job = store.get(export_id)
+    assert result["content"].startswith(b"%PDF")
+    assert job["status"] == "completed"
+    with open(job["filepath"], "rb") as f:
+        assert f.read() == result["content"]
+
+def test_render_past_the_budget_finishes_in_the_background(store, new_job, render):
+    export_id = new_job()
+    render["seconds"] = 0.5
+
+    async def export():
+        result = await ExportManager.export_inline(export_id, "token", budget=0.05)
+        assert len(export_manager._background_tasks) == 1
+        while export_manager._background_tasks:
+            await asyncio.sleep(0.05)
+        return result
+
+    assert asyncio.run(export()) is None
+    job = store.get(export_id)
+    assert job["status"] == "completed"
+    assert os.path.getsize(job["filepath"]) > 0
+
+def test_failed_render_within_the_budget_fails_the_job(store, new_job, render):
+    export_id = new_job()
+    render["error"] = RuntimeError("template broke")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ExportManager.export_inline(export_id, "token", budget=5))
+
+    job = store.get(export_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "template broke"
+
+def test_job_claimed_by_another_worker_is_not_rendered(store, new_job, render):
+    export_id = new_job()
+    claim = store.claim(export_id, "worker-elsewhere")
+
+    assert asyncio.run(ExportManager.export_inline(export_id, "token", budget=5)) is None
+    assert store.get(export_id)["claimed_by"] == claim["claimed_by"]
+    assert store.get(export_id)["status"] == "processing"
@@ -0,0 +1,74 @@
+"""Export janitor: expired exports and the disk quota."""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import export_manager, janitor as janitor_module
+from app.janitor import ExportJanitor
+from app.render_cache import RenderCache
+
+@pytest.fixture
+def exports(store, tmp_path, monkeypatch):
+    """An export directory and render cache of the test's own; returns the directory"""
+    directory = tmp_path / "exports"
+    directory.mkdir()
+    cache = RenderCache(str(directory / "cache"), max_bytes=10_000)
+    monkeypatch.setattr(janitor_module, "EXPORT_DIR", str(directory))
+    monkeypatch.setattr(janitor_module, "render_cache", cache)
+    monkeypatch.setattr(janitor_module, "job_store", store)
+    monkeypatch.setattr(export_manager, "job_store", store)
+    return directory
+
+def completed_export(store, new_job, exports, size: int, last_used: float) -> str:
+    """A completed job with an export file of `size` bytes, last used at `last_used`"""
+    export_id = new_job()
+    path = exports / f"{export_id}.pdf"
+    path.write_bytes(b"x" * size)
+    os.utime(path, (last_used, last_used))
+    store.update(export_id, status="completed", filepath=str(path))
+    return export_id
+
+def test_least_recently_used_exports_are_evicted_with_their_cache_entry(store, new_job, exports):
+    old = completed_export(store, new_job, exports, 400, 1_000_000)
+    janitor_module.render_cache.store("old-key", str(exports / f"{old}.pdf"))
+    cache_entry = os.path.join(janitor_module.render_cache.directory, "old-key")
+    os.utime(cache_entry, (1_000_000, 1_000_000))
+    orphan = exports / "orphan.pdf"
+    orphan.write_bytes(b"x" * 100)
+    os.utime(orphan, (2_000_000, 2_000_000))
+    recent = completed_export(store, new_job, exports, 400, datetime.utcnow().timestamp())
+
+    # The old export and its cache entry share an inode, so they count once
+    assert asyncio.run(ExportJanitor(max_bytes=900, interval=60).enforce_quota()) == {"files": 0, "bytes": 0}
+
+    janitor = ExportJanitor(max_bytes=600, interval=60)
+    assert asyncio.run(janitor.enforce_quota()) == {"files": 2, "bytes": 400}
+
+    assert store.get(old) is None
+    assert not os.path.exists(exports / f"{old}.pdf") and not os.path.exists(cache_entry)
+    assert janitor_module.render_cache.status()["entries"] == 0
+    assert store.get(recent) is not None and orphan.exists()
+    assert janitor.status()["disk_usage_bytes"] == 500
+
+def test_orphaned_export_file_is_evicted(store, new_job, exports):
+    orphan = exports / "left-behind.pdf"
+    orphan.write_bytes(b"x" * 500)
+    os.utime(orphan, (1_000_000, 1_000_000))
+    completed_export(store, new_job, exports, 100, datetime.utcnow().timestamp())
+
+    assert asyncio.run(ExportJanitor(max_bytes=200, interval=60).enforce_quota()) == {"files": 1, "bytes": 500}
+    assert not orphan.exists()
+
+def test_expired_exports_are_deleted(store, new_job, exports):
+    expired = completed_export(store, new_job, exports, 100, datetime.utcnow().timestamp())
+    store.update(expired, expires_at=datetime.utcnow() - timedelta(minutes=1))
+    kept = completed_export(store, new_job, exports, 100, datetime.utcnow().timestamp())
+
+    janitor = ExportJanitor(max_bytes=0, interval=60)
+    result = asyncio.run(janitor.run_once())
+
+    assert result == {"expired_jobs": 1, "evicted_files": 0, "reclaimed_bytes": 100}
+    assert store.get(expired) is None and store.get(kept) is not None
+    assert not os.path.exists(exports / f"{expired}.pdf")
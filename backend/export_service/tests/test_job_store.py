@@ -0,0 +1,109 @@
+"""Job claims: one worker per job, leases, and updates guarded by the claim."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.job_store import JOB_MAX_ATTEMPTS
+
+WORKERS = 8
+
+def race(fn, workers: int = WORKERS) -> list:
+    """Call fn(worker_id) from several threads at once and return the results"""
+    start = threading.Barrier(workers)
+
+    def run(worker_id):
+        start.wait()
+        return fn(f"worker-{worker_id}")
+
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(run, range(workers)))
+
+def expire_lease(store, export_id):
+    store.update(export_id, lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+def test_only_one_concurrent_claim_wins(store, new_job):
+    export_id = new_job()
+
+    claims = race(lambda worker_id: store.claim(export_id, worker_id))
+
+    winners = [claim for claim in claims if claim is not None]
+    assert len(winners) == 1
+    job = store.get(export_id)
+    assert job["status"] == "processing"
+    assert job["claimed_by"] == winners[0]["claimed_by"]
+    assert job["attempts"] == 1
+
+def test_claim_next_hands_each_job_to_one_worker(store, new_job):
+    start = datetime.utcnow()
+    export_ids = [new_job(created_at=start + timedelta(seconds=i)) for i in range(20)]
+
+    def drain(worker_id):
+        claimed = []
+        while True:
+            job = store.claim_next(worker_id)
+            if job is None:
+                return claimed
+            claimed.append(job["id"])
+
+    claimed = [export_id for worker in race(drain) for export_id in worker]
+    assert sorted(claimed) == sorted(export_ids)
+
+def test_claim_next_takes_the_oldest_job(store, new_job):
+    start = datetime.utcnow()
+    newer = new_job(created_at=start)
+    older = new_job(created_at=start - timedelta(minutes=1))
+
+    assert store.claim_next("worker")["id"] == older
+    assert store.claim_next("worker")["id"] == newer
+    assert store.claim_next("worker") is None
+
+def test_lost_claim_cannot_change_the_job(store, new_job):
+    export_id = new_job()
+    first = store.claim(export_id, "first")["claimed_by"]
+    assert store.claim(export_id, "second") is None
+
+    # The first worker stalls past its lease and the job is taken over
+    expire_lease(store, export_id)
+    second = store.claim(export_id, "second")["claimed_by"]
+
+    assert not store.renew(export_id, first)
+    assert not store.update(export_id, first, progress=50)
+    assert not store.finish(export_id, "failed", first, error="stale")
+    assert store.renew(export_id, second)
+    assert store.update(export_id, second, progress=90)
+    assert store.finish(export_id, "completed", second, download_url="/download")
+
+    job = store.get(export_id)
+    assert (job["status"], job["progress"], job["error"]) == ("completed", 90, None)
+    assert job["claimed_by"] is None and job["completed_at"] is not None
+    assert job["attempts"] == 2
+
+def test_finished_job_is_not_claimed_again(store, new_job):
+    export_id = new_job()
+    claim = store.claim(export_id, "worker")["claimed_by"]
+    store.finish(export_id, "completed", claim)
+
+    assert store.claim(export_id, "other") is None
+    assert store.claim_next("other") is None
+
+def test_release_gives_the_job_back_without_using_an_attempt(store, new_job):
+    export_id = new_job()
+    claim = store.claim(export_id, "worker")["claimed_by"]
+
+    assert store.release(export_id, claim)
+    assert not store.release(export_id, claim)
+
+    job = store.get(export_id)
+    assert (job["status"], job["claimed_by"], job["attempts"]) == ("pending", None, 0)
+    assert store.claim_next("other")["id"] == export_id
+
+def test_job_abandoned_too_often_fails(store, new_job):
+    export_id = new_job()
+    for attempt in range(JOB_MAX_ATTEMPTS):
+        assert store.claim_next(f"worker-{attempt}")["id"] == export_id
+        expire_lease(store, export_id)
+
+    assert store.claim_next("last") is None
+    job = store.get(export_id)
+    assert job["status"] == "failed"
+    assert job["claimed_by"] is None
@@ -0,0 +1,104 @@
+"""Progress streams: resuming from Last-Event-ID, heartbeats, and ending on a terminal status."""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import progress
+from app.progress import ProgressHub, TooManyStreams, event_id, parse_event_id, stream_progress
+
+@pytest.fixture(autouse=True)
+def hub(store, monkeypatch):
+    """Streams over the test's store, with a hub of their own (its events belong to one loop)"""
+    hub = ProgressHub()
+    monkeypatch.setattr(progress, "job_store", store)
+    monkeypatch.setattr(progress, "progress_hub", hub)
+    monkeypatch.setattr(progress, "STREAM_POLL_SECONDS", 0.05)
+    return hub
+
+def connected_for(checks: int):
+    """A disconnect check that reports the client gone after `checks` calls"""
+    remaining = iter(range(checks, -1, -1))
+
+    async def is_disconnected():
+        return next(remaining, 0) == 0
+    return is_disconnected
+
+async def collect(stream) -> list:
+    return [message async for message in stream]
+
+def events(messages: list) -> list:
+    return [json.loads(message.split("data: ", 1)[1]) for message in messages if "\ndata: " in message]
+
+def test_event_ids_round_trip():
+    updated_at = datetime(2026, 1, 2, 3, 4, 5, 678901)
+
+    assert parse_event_id(str(event_id(updated_at))) == updated_at
+    assert parse_event_id("not-ours") is None
+
+def test_export_stream_ends_when_the_export_completes(store, new_job, hub):
+    export_id = new_job()
+    hub.acquire("user-1")
+
+    async def run():
+        async def finish():
+            await asyncio.sleep(0.05)
+            store.update(export_id, progress=50)
+            hub.publish("user-1")
+            await asyncio.sleep(0.05)
+            store.finish(export_id, "completed", progress=100, download_url=f"/api/export/download/{export_id}")
+            hub.publish("user-1")
+
+        finishing = asyncio.create_task(finish())
+        messages = await asyncio.wait_for(collect(stream_progress("user-1", export_id, None, connected_for(100))), 5)
+        await finishing
+        return messages
+
+    messages = asyncio.run(run())
+
+    assert messages[0] == "retry: 3000\n\n"
+    assert [(event["status"], event["progress"]) for event in events(messages)] == [
+        ("pending", 0), ("pending", 50), ("completed", 100)
+    ]
+    assert hub.status()["open_streams"] == 0
+
+def test_user_stream_resumes_after_the_last_event_id(store, new_job, hub):
+    start = datetime.utcnow() - timedelta(minutes=5)
+    first, second, third = (new_job(created_at=start + timedelta(seconds=i)) for i in range(3))
+    last_event_id = str(event_id(store.get(first)["updated_at"]))
+    hub.acquire("user-1")
+
+    messages = asyncio.run(collect(stream_progress("user-1", None, parse_event_id(last_event_id), connected_for(1))))
+
+    assert [event["id"] for event in events(messages)] == [second, third]
+
+def test_idle_stream_sends_heartbeats(new_job, monkeypatch, hub):
+    monkeypatch.setattr(progress, "STREAM_HEARTBEAT_SECONDS", 0)
+    export_id = new_job()
+    hub.acquire("user-1")
+
+    messages = asyncio.run(collect(stream_progress("user-1", export_id, None, connected_for(3))))
+
+    assert len(events(messages)) == 1
+    assert messages.count(": heartbeat\n\n") == 3
+
+def test_stream_for_another_users_export_reports_it_missing(new_job, hub):
+    export_id = new_job(user_id="user-2")
+    hub.acquire("user-1")
+
+    messages = asyncio.run(collect(stream_progress("user-1", export_id, None, connected_for(100))))
+
+    assert messages[-1].startswith("event: export.missing")
+    assert events(messages) == [{"id": export_id}]
+
+def test_open_streams_are_limited_per_user(hub, monkeypatch):
+    monkeypatch.setattr(progress, "MAX_STREAMS_PER_USER", 2)
+    hub.acquire("user-1")
+    hub.acquire("user-1")
+
+    with pytest.raises(TooManyStreams):
+        hub.acquire("user-1")
+    hub.acquire("user-2")
+    hub.release("user-1")
+    hub.acquire("user-1")
@@ -0,0 +1,84 @@
+"""Render cache: keys, hits that leave the file's mtime alone, and LRU eviction."""
+import os
+
+import pytest
+
+from app import document_generator
+from app.render_cache import RenderCache
+
+CV = {"metadata": {"version": 3}, "personal_info": {"first_name": "Jane"}}
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(str(tmp_path / "cache"), max_bytes=1000)
+
+@pytest.fixture
+def templates(tmp_path, monkeypatch):
+    """A templates directory of the test's own with a default.html"""
+    directory = tmp_path / "templates"
+    directory.mkdir()
+    (directory / "default.html").write_text("<h1>{{ name }}</h1>")
+    monkeypatch.setattr(document_generator, "TEMPLATES_DIR", str(directory))
+    return directory
+
+def rendered(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+def test_key_follows_the_cv_version_format_and_options(cache, templates):
+    key = cache.key("cv-1", CV, "pdf", {"font": "Arial"})
+
+    assert cache.key("cv-1", CV, "PDF", {"font": "Arial"}) == key
+    assert cache.key("cv-1", {"metadata": {"version": 4}}, "pdf", {"font": "Arial"}) != key
+    assert cache.key("cv-2", CV, "pdf", {"font": "Arial"}) != key
+    assert cache.key("cv-1", CV, "docx", {"font": "Arial"}) != key
+    assert cache.key("cv-1", CV, "pdf", {"font": "Georgia"}) != key
+
+def test_unversioned_cv_is_keyed_by_its_content(cache, templates):
+    key = cache.key("cv-1", {"summary": "a"}, "pdf", None)
+
+    assert cache.key("cv-1", {"summary": "a"}, "pdf", None) == key
+    assert cache.key("cv-1", {"summary": "b"}, "pdf", None) != key
+
+def test_key_changes_when_the_template_source_changes(cache, templates):
+    key = cache.key("cv-1", CV, "pdf", None)
+    template = templates / "default.html"
+    template.write_text("<h2>{{ name }}</h2>")
+    stat = template.stat()
+    os.utime(template, (stat.st_atime, stat.st_mtime + 10))
+
+    assert cache.key("cv-1", CV, "pdf", None) != key
+
+def test_hit_links_the_file_and_keeps_its_mtime(cache, tmp_path):
+    cache.store("key", rendered(tmp_path, "job-1.pdf", 100))
+    entry = os.path.join(cache.directory, "key")
+    os.utime(entry, (1_000_000, 1_000_000))
+
+    assert cache.fetch("key", str(tmp_path / "job-2.pdf"))
+
+    assert os.stat(tmp_path / "job-2.pdf").st_ino == os.stat(entry).st_ino
+    assert os.stat(entry).st_mtime == 1_000_000
+    assert os.stat(entry).st_atime > 1_000_000
+    assert not cache.fetch("other", str(tmp_path / "job-3.pdf"))
+    assert cache.status()["hits"] == 1
+
+def test_least_recently_used_entries_are_evicted(cache, tmp_path):
+    for age, key in enumerate(("old", "used", "new")):
+        cache.store(key, rendered(tmp_path, f"{key}.pdf", 400))
+        os.utime(os.path.join(cache.directory, key), (1_000_000 + age, 1_000_000 + age))
+    # Only two fit: the third store evicted "old"
+    assert sorted(os.listdir(cache.directory)) == ["new", "used"]
+
+    cache.fetch("used", str(tmp_path / "again.pdf"))
+    cache.store("newest", rendered(tmp_path, "newest.pdf", 400))
+
+    assert sorted(os.listdir(cache.directory)) == ["newest", "used"]
+    assert cache.status()["evictions"] == 2
+
+def test_entry_evicted_by_another_process_is_a_miss(cache, tmp_path):
+    cache.store("key", rendered(tmp_path, "job-1.pdf", 100))
+    os.remove(os.path.join(cache.directory, "key"))
+
+    assert not cache.fetch("key", str(tmp_path / "job-2.pdf"))
+    assert cache.status()["bytes"] == 0
@@ -0,0 +1,47 @@
+"""What renders reuse within a process: compiled templates, parsed stylesheets and fonts."""
+import pytest
+
+from app import document_generator
+from app.render_context import RenderContext
+
+@pytest.fixture
+def weasyprint():
+    return pytest.importorskip("weasyprint")
+
+def test_templates_are_compiled_once():
+    names = document_generator.template_env.list_templates(extensions=["html"])
+
+    assert document_generator.compile_templates() == {"templates": len(names)}
+    for name in names:
+        assert document_generator.template_env.get_template(name) is document_generator.template_env.get_template(name)
+
+def test_stylesheet_is_parsed_once_per_source(weasyprint):
+    context = RenderContext(css_cache_size=8)
+
+    first = context.stylesheet("h1 { color: red }")
+
+    assert context.stylesheet("h1 { color: red }") is first
+    assert context.stylesheet("h1 { color: blue }") is not first
+    assert context.status() == {"stylesheets": 2, "max_stylesheets": 8, "css_hits": 1, "css_misses": 2}
+
+def test_least_recently_used_stylesheets_are_dropped(weasyprint):
+    context = RenderContext(css_cache_size=2)
+    a = context.stylesheet("a { color: red }")
+    context.stylesheet("b { color: red }")
+    context.stylesheet("a { color: red }")
+    context.stylesheet("c { color: red }")
+
+    assert context.stylesheet("a { color: red }") is a
+    assert context.stats["css_misses"] == 3
+    context.stylesheet("b { color: red }")
+    assert context.stats["css_misses"] == 4
+
+def test_font_configuration_is_shared_until_cleared(weasyprint):
+    context = RenderContext(css_cache_size=8)
+    fonts = context.font_config()
+    context.stylesheet("h1 { color: red }")
+
+    assert context.font_config() is fonts
+    context.clear()
+    assert context.font_config() is not fonts
+    assert context.status()["stylesheets"] == 0
@@ -0,0 +1,57 @@
+"""Render pool: renders run in worker processes, and a timeout replaces the pool."""
+import asyncio
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+from app import render_pool as render_pool_module
+from app.render_pool import RenderPool, RenderTimeout
+
+CV_DATA = {"title": "CV", "personal_info": {"first_name": "Jane", "last_name": "Smith", "email": "jane@example.com"}}
+
+def _sleep_render(method: str, seconds: float = 0):
+    """Worker-side stand-in for a render: sleeps, then reports the worker's pid"""
+    time.sleep(seconds)
+    return os.getpid()
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, timeout=5, max_jobs_per_worker=0)
+    yield pool
+    pool.shutdown()
+
+def test_render_runs_in_a_worker_process(pool):
+    document = asyncio.run(pool.run("render_bytes", CV_DATA, "docx", None))
+
+    assert zipfile.ZipFile(io.BytesIO(document)).testzip() is None
+    assert pool.status()["completed"] == 1
+
+def test_renders_without_workers_run_in_the_service_process():
+    document = asyncio.run(RenderPool(workers=0, timeout=5, max_jobs_per_worker=0).run("render_bytes", CV_DATA, "docx", None))
+
+    assert document.startswith(b"PK")
+
+def test_timed_out_render_replaces_the_pool(pool, monkeypatch):
+    monkeypatch.setattr(render_pool_module, "_render", _sleep_render)
+    pool.timeout = 2
+    first_pid = asyncio.run(pool.run("sleep"))
+
+    with pytest.raises(RenderTimeout):
+        asyncio.run(pool.run("sleep", 60))
+
+    assert asyncio.run(pool.run("sleep")) != first_pid
+    assert pool.status()["timed_out"] == 1
+    assert pool.status()["pool_restarts"] == 1
+
+def test_workers_are_replaced_after_their_job_limit(monkeypatch):
+    monkeypatch.setattr(render_pool_module, "_render", _sleep_render)
+    pool = RenderPool(workers=1, timeout=30, max_jobs_per_worker=2)
+    try:
+        pids = [asyncio.run(pool.run("sleep")) for _ in range(3)]
+    finally:
+        pool.shutdown()
+
+    assert pids[0] == pids[1] != pids[2]
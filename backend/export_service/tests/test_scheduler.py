@@ -0,0 +1,139 @@
+"""Export admission control and weighted fair queuing."""
+import asyncio
+
+import pytest
+
+from app.scheduler import ExportScheduler, QueueFull
+
+WEIGHTS = {"basic": 1, "pro": 2, "enterprise": 4}
+
+def scheduler(concurrency: int = 1, max_queue: int = 100, max_per_user: int = 5) -> ExportScheduler:
+    return ExportScheduler(concurrency, max_queue, max_per_user, WEIGHTS)
+
+def run_order(scheduler: ExportScheduler, admissions) -> list:
+    """
+    Admit (user_id, plan, documents) batches while a slot is held, then
+    release the slot and return the users in the order their exports ran.
+    """
+    async def main():
+        order = []
+        blocker = scheduler.admit("blocker")
+
+        async def export(user_id, ticket):
+            async with ticket:
+                order.append(user_id)
+                await asyncio.sleep(0)
+
+        async with blocker:
+            tasks = [
+                asyncio.create_task(export(user_id, ticket))
+                for user_id, plan, documents in admissions
+                for ticket in scheduler.admit_batch(user_id, plan, documents)
+            ]
+            # Let every export queue up behind the blocker
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    return asyncio.run(main())
+
+def test_user_allowance_is_enforced():
+    exports = scheduler(max_per_user=2)
+    tickets = [exports.admit("alice"), exports.admit("alice")]
+
+    with pytest.raises(QueueFull) as refused:
+        exports.admit("alice")
+    assert refused.value.reason == "user_limit"
+    assert refused.value.retry_after >= 1
+    # Other users are unaffected
+    exports.admit("bob").cancel()
+
+    tickets[0].cancel()
+    exports.admit("alice").cancel()
+    assert exports.status()["rejected"] == 1
+
+def test_queue_limit_counts_every_document():
+    exports = scheduler(max_queue=5, max_per_user=10)
+    exports.admit_batch("alice", None, 4)
+
+    with pytest.raises(QueueFull) as refused:
+        exports.admit_batch("bob", None, 2)
+    assert refused.value.reason == "queue_full"
+    assert exports.status()["queued"] == 4
+
+def test_batch_counts_as_one_export_per_document():
+    exports = scheduler(max_per_user=3)
+
+    # Larger than the allowance, but nothing else is in flight
+    tickets = exports.admit_batch("alice", None, 4)
+    assert len(tickets) == 4
+    with pytest.raises(QueueFull):
+        exports.admit("alice")
+
+    for ticket in tickets:
+        ticket.cancel()
+    exports.admit_batch("alice", None, 3)
+    with pytest.raises(QueueFull):
+        exports.admit_batch("alice", None, 1)
+
+def test_cancelled_tickets_free_their_place():
+    exports = scheduler()
+    tickets = exports.admit_batch("alice", "pro", 3)
+
+    for ticket in tickets:
+        ticket.cancel()
+        ticket.cancel()  # Cancelling twice is harmless
+
+    assert exports.status()["queued"] == 0
+    assert exports.idle()
+
+def test_users_are_interleaved():
+    order = run_order(scheduler(max_per_user=10), [("alice", None, 4), ("bob", None, 2)])
+
+    assert order == ["alice", "bob", "alice", "bob", "alice", "alice"]
+
+def test_plan_weight_sets_the_share_of_slots():
+    order = run_order(scheduler(max_per_user=10), [("basic", "basic", 5), ("enterprise", "enterprise", 5)])
+
+    # Four enterprise exports for each basic one while both are queued
+    assert order[:5].count("enterprise") == 4
+    assert sorted(order) == ["basic"] * 5 + ["enterprise"] * 5
+
+def test_concurrency_limits_running_exports():
+    exports = scheduler(concurrency=2, max_per_user=10)
+
+    async def main():
+        running = peak = 0
+
+        async def export(ticket):
+            nonlocal running, peak
+            async with ticket:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(export(ticket) for ticket in exports.admit_batch("alice", None, 6)))
+        return peak
+
+    assert asyncio.run(main()) == 2
+    assert exports.idle()
+    assert exports.status()["admitted"] == 6
+
+def test_waiting_export_that_is_cancelled_gives_up_its_place():
+    exports = scheduler(max_per_user=10)
+
+    async def main():
+        holder, waiter, after = exports.admit_batch("alice", None, 3)
+        async with holder:
+            waiting = asyncio.create_task(waiter.__aenter__())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+        async with after:
+            return exports.status()
+
+    status = asyncio.run(main())
+    assert (status["queued"], status["running"]) == (0, 1)
+    assert exports.idle()
@@ -11,6 +11,12 @@ from app.config import settings
 from supabase import create_client, Client
 from datetime import datetime
 
+# Outgoing calls join the request's trace (needs backend/ on PYTHONPATH)
+try:
+    from shared.tracing import traced_transport
+except ImportError:
+    traced_transport = None
+
 # Configure logger
 logger = logging.getLogger("payment_service")
 
@@ -308,7 +314,7 @@ async def notify_subscription_update(user_id, subscription, is_deleted=False, is
         # Send notification to Auth Service
         # (This would update user's permissions/roles based on subscription)
         auth_service_url = f"{settings.AUTH_SERVICE_URL}/api/users/{user_id}/subscription"
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=10.0, transport=traced_transport() if traced_transport else None) as client:
             headers = {"Content-Type": "application/json"}
             try:
                 response = await client.post(auth_service_url, json=payload, headers=headers)
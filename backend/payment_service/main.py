@@ -15,11 +15,19 @@ from app.config import LogConfig
 dictConfig(LogConfig().dict())
 logger = logging.getLogger("payment_service")
 
+# Fast JSON encoding shared by the backend services (needs backend/ on PYTHONPATH)
+try:
+    from shared.responses import FastJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+    logger.warning("shared.responses not available - using FastAPI's default JSON encoding")
+
 # Initialize FastAPI app
 app = FastAPI(
     title="CandidateV Payment Service",
     description="API for managing payments and subscriptions for the CandidateV platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS Configuration
@@ -35,7 +43,7 @@ app.add_middleware(
 # Request ID middleware for tracking
 @app.middleware("http")
 async def add_request_id_and_log(request: Request, call_next):
-    request_id = str(uuid.uuid4())
+    request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
     request.state.request_id = request_id
     
     start_time = time.time()
@@ -76,6 +84,20 @@ async def shutdown():
 async def root():
     return {"message": "CandidateV Payment Service"}
 
+# Prometheus metrics at /metrics, outside the other middleware
+try:
+    from shared.metrics import instrument
+    instrument(app, "payment_service")
+except ImportError:
+    logger.warning("shared.metrics not available - /metrics is disabled")
+
+# Tracing goes outermost, so its span covers the metrics middleware as well
+try:
+    from shared.tracing import setup_tracing
+    setup_tracing(app, "payment_service")
+except ImportError:
+    logger.warning("shared.tracing not available - requests are not traced")
+
 # Run debug server if executed directly
 if __name__ == "__main__":
     import uvicorn
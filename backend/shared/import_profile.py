@@ -0,0 +1,120 @@
+"""
+Import-time profile of the backend services.
+
+Imports each service's entry module in a fresh interpreter under
+`python -X importtime` and reports how long the imports took in total, which
+packages the time went to, and the slowest individual modules. Time is
+attributed by self time, so a package is charged only for its own modules,
+not for the dependencies it pulls in.
+
+    cd backend
+    python -m shared.import_profile                       # every service
+    python -m shared.import_profile export_service --top 20
+    python -m shared.import_profile --json > import_profile.json
+
+A service whose dependencies are not installed is reported as failed, with
+the import error.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statement that loads each service the way its server does, without starting it
+SERVICES = {
+    "cv_service": "import app.main",
+    # app.py is shadowed by the app/ package, so load it by path
+    "export_service": "import runpy; runpy.run_path('app.py')",
+    "ai_service": "import main",
+    "payment_service": "import main",
+}
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into one dict per imported module."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return modules
+
+def profile_service(service: str, statement: str) -> Dict[str, Any]:
+    """Import one service in a fresh interpreter and summarize where the time went."""
+    service_dir = os.path.join(BACKEND_DIR, service)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([service_dir, BACKEND_DIR]), PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=service_dir, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    modules = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        return {"service": service, "ok": False, "error": errors[-1] if errors else f"exit status {result.returncode}"}
+
+    packages: Dict[str, Dict[str, float]] = defaultdict(lambda: {"self_ms": 0.0, "modules": 0})
+    for module in modules:
+        package = packages[module["module"].split(".")[0]]
+        package["self_ms"] += module["self_ms"]
+        package["modules"] += 1
+    return {
+        "service": service,
+        "ok": True,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(module["self_ms"] for module in modules), 1),
+        "modules": len(modules),
+        "packages": sorted(
+            ({"package": name, "self_ms": round(p["self_ms"], 1), "modules": p["modules"]} for name, p in packages.items()),
+            key=lambda p: p["self_ms"], reverse=True
+        ),
+        "slowest_modules": sorted(
+            ({"module": m["module"], "self_ms": m["self_ms"]} for m in modules),
+            key=lambda m: m["self_ms"], reverse=True
+        ),
+    }
+
+def print_report(report: Dict[str, Any], top: int) -> None:
+    if not report["ok"]:
+        print(f"{report['service']}: import failed: {report['error']}\n")
+        return
+    print(f"{report['service']}: {report['import_ms']:.0f}ms importing {report['modules']} modules "
+          f"({report['wall_ms']:.0f}ms wall including interpreter start)")
+    print(f"  {'package':<28} {'self':>9} {'share':>6} {'modules':>8}")
+    for package in report["packages"][:top]:
+        share = package["self_ms"] / report["import_ms"] * 100 if report["import_ms"] else 0.0
+        print(f"  {package['package']:<28} {package['self_ms']:7.1f}ms {share:5.1f}% {package['modules']:8d}")
+    print("  slowest modules: " + ", ".join(f"{m['module']} {m['self_ms']:.1f}ms" for m in report["slowest_modules"][:5]))
+    print()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("services", nargs="*", help=f"Services to profile: {', '.join(SERVICES)} (default: all)")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed per service")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args()
+    unknown = set(args.services) - set(SERVICES)
+    if unknown:
+        parser.error(f"unknown services: {', '.join(sorted(unknown))}")
+
+    reports = [profile_service(service, SERVICES[service]) for service in (args.services or SERVICES)]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report, args.top)
+    return 0 if all(report["ok"] for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Prometheus metrics for the backend services.
+
+MetricsMiddleware is plain ASGI middleware. `@app.middleware("http")` runs on
+BaseHTTPMiddleware, which pipes every response through an extra task and
+memory stream. This middleware only wraps `receive` and `send`, to count body
+bytes and catch the response status. Requests are labelled by route template
+(`/api/cv/{cv_id}`) rather than by path, so ids don't create new series.
+Requests that match no route are counted under "unmatched".
+
+instrument(app, service) adds the middleware and a `/metrics` endpoint
+exposing:
+
+- http_requests_total{service, method, route, status}
+- http_request_duration_seconds{service, method, route} (histogram)
+- http_requests_in_progress{service, method}
+- http_request_size_bytes and http_response_size_bytes{service, method, route}
+  (histograms)
+
+With several worker processes, point PROMETHEUS_MULTIPROC_DIR at an empty
+directory shared by the workers and clear it on deploy. That is
+prometheus_client's multiprocess mode, and /metrics then sums across the
+workers. If METRICS_TOKEN is set, /metrics requires it as a bearer token.
+"""
+import hmac
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("shared.metrics")
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Exports and AI calls take seconds, so the buckets reach well past the usual 10s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+UNMATCHED = "unmatched"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["service", "method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response",
+    ["service", "method", "route"], buckets=LATENCY_BUCKETS
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled", ["service", "method"], multiprocess_mode="livesum"
+)
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "Request body size", ["service", "method", "route"], buckets=SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size", ["service", "method", "route"], buckets=SIZE_BUCKETS
+)
+
+class MetricsMiddleware:
+    """ASGI middleware that records request count, latency, size and concurrency per route."""
+
+    def __init__(self, app: ASGIApp, service: str):
+        self.app = app
+        self.service = service
+        # Label lookups take a lock in prometheus_client, so keep the children per route
+        self._route_metrics: Dict[Tuple[str, str], Tuple[Any, Any, Any]] = {}
+        self._counters: Dict[Tuple[str, str, int], Any] = {}
+        self._in_progress: Dict[str, Any] = {}
+        self._endpoint_paths: Optional[Dict[Any, str]] = None
+
+    def _route(self, scope: Scope) -> str:
+        """The path template of the route that handled the request."""
+        route = scope.get("route")  # Set by FastAPI's APIRoute
+        if route is not None:
+            return getattr(route, "path_format", route.path)
+        endpoint = scope.get("endpoint")  # Plain Starlette routes (docs, /metrics)
+        if endpoint is None or "app" not in scope:
+            return UNMATCHED
+        if self._endpoint_paths is None:
+            self._endpoint_paths = {
+                route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._endpoint_paths.get(endpoint, UNMATCHED)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_progress = self._in_progress.get(method)
+        if in_progress is None:
+            in_progress = self._in_progress[method] = IN_PROGRESS.labels(self.service, method)
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_counted() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+            route = self._route(scope)
+            children = self._route_metrics.get((method, route))
+            if children is None:
+                labels = (self.service, method, route)
+                children = self._route_metrics[(method, route)] = (
+                    LATENCY.labels(*labels), REQUEST_SIZE.labels(*labels), RESPONSE_SIZE.labels(*labels)
+                )
+            counter = self._counters.get((method, route, status_code))
+            if counter is None:
+                counter = self._counters[(method, route, status_code)] = REQUESTS.labels(
+                    self.service, method, route, str(status_code)
+                )
+            counter.inc()
+            children[0].observe(duration)
+            children[1].observe(request_bytes)
+            children[2].observe(response_bytes)
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus text exposition of this process's (or all workers') metrics."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+def instrument(app: FastAPI, service: str) -> None:
+    """
+    Record Prometheus metrics for an app's requests and serve them at /metrics.
+
+    Call it after the app's other middleware is added, so the measurements
+    include that middleware too.
+
+    Args:
+        app: The FastAPI application
+        service: Value of the `service` label
+    """
+    app.add_middleware(MetricsMiddleware, service=service)
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    logger.info(f"Prometheus metrics enabled for {service} at /metrics"
+                f"{' (multiprocess)' if MULTIPROC_DIR else ''}")
@@ -0,0 +1,126 @@
+"""
+Local stand-in for an OpenTelemetry collector.
+
+Accepts OTLP/HTTP trace exports (protobuf or JSON) on POST /v1/traces and
+prints one line per span, grouped by trace, so a request can be followed
+through the gateway and the services without running Jaeger or Tempo:
+
+    cd backend
+    python -m shared.otlp_collector --port 4318 --jsonl /tmp/spans.jsonl
+    OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318 uvicorn app.main:app ...
+
+Needs opentelemetry-proto, which opentelemetry-exporter-otlp-proto-http
+installs.
+"""
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, TextIO
+
+from google.protobuf import json_format
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest, ExportTraceServiceResponse
+)
+
+def _value(any_value) -> Any:
+    kind = any_value.WhichOneof("value")
+    return getattr(any_value, kind) if kind in ("string_value", "bool_value", "int_value", "double_value") else None
+
+def _attributes(key_values) -> Dict[str, Any]:
+    return {kv.key: _value(kv.value) for kv in key_values}
+
+def flatten(request: ExportTraceServiceRequest) -> List[Dict[str, Any]]:
+    """One dict per span, with its service name and attributes."""
+    spans = []
+    for resource_spans in request.resource_spans:
+        service = _attributes(resource_spans.resource.attributes).get("service.name", "unknown")
+        for scope_spans in resource_spans.scope_spans:
+            for s in scope_spans.spans:
+                spans.append({
+                    "trace_id": s.trace_id.hex(),
+                    "span_id": s.span_id.hex(),
+                    "parent_span_id": s.parent_span_id.hex() or None,
+                    "service": service,
+                    "name": s.name,
+                    "start_unix_nano": s.start_time_unix_nano,
+                    "duration_ms": round((s.end_time_unix_nano - s.start_time_unix_nano) / 1e6, 2),
+                    "error": s.status.code == s.status.STATUS_CODE_ERROR,
+                    "attributes": _attributes(s.attributes),
+                })
+    return spans
+
+class Collector:
+    """Prints received spans and optionally appends them to a JSON Lines file."""
+
+    def __init__(self, jsonl: Optional[TextIO] = None):
+        self.jsonl = jsonl
+        self._lock = threading.Lock()
+
+    def receive(self, spans: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for s in sorted(spans, key=lambda s: (s["trace_id"], s["start_unix_nano"])):
+                request_id = s["attributes"].get("request.id")
+                parent = s["parent_span_id"] or "root"
+                print(f"{s['trace_id'][:16]} {s['span_id'][:8]}<{parent[:8]:<8} {s['service']:<16} "
+                      f"{s['name']:<40} {s['duration_ms']:9.2f}ms"
+                      f"{' ERROR' if s['error'] else ''}"
+                      f"{f' request={request_id}' if request_id else ''}")
+                if self.jsonl is not None:
+                    self.jsonl.write(json.dumps(s) + "\n")
+            sys.stdout.flush()
+            if self.jsonl is not None:
+                self.jsonl.flush()
+
+def make_handler(collector: Collector):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/traces":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            request = ExportTraceServiceRequest()
+            try:
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    json_format.Parse(body, request)
+                else:
+                    request.ParseFromString(body)
+            except Exception as e:
+                self.send_error(400, str(e))
+                return
+            collector.receive(flatten(request))
+            payload = ExportTraceServiceResponse().SerializeToString()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-protobuf")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # The spans are the output
+
+    return Handler
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318, help="OTLP/HTTP's standard port")
+    parser.add_argument("--jsonl", help="Also append every span to this JSON Lines file")
+    args = parser.parse_args()
+
+    jsonl = open(args.jsonl, "a") if args.jsonl else None
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(Collector(jsonl)))
+    print(f"Collecting OTLP traces on http://{args.host}:{args.port}/v1/traces", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if jsonl is not None:
+            jsonl.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Startup warm-up for the backend services.
+
+A service starts serving as soon as it is imported, so nothing slow runs
+before uvicorn binds the port. Its warm-up steps (checking the schema,
+starting render workers, loading a client library) then run in the
+background, one after another, in a worker thread. `/api/ready` answers 503
+until all of them have succeeded, while `/api/health` stays a plain
+liveness check.
+
+A failed step is retried every WARMUP_RETRY_SECONDS, together with the steps
+after it, which may depend on it. A replica that boots before a dependency
+is reachable becomes ready by itself once it is.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("shared.readiness")
+
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+class WarmUp:
+    """Runs named warm-up steps in order, in a worker thread, and reports their progress."""
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any]]]):
+        self.steps = steps
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.ready_after_ms: Optional[float] = None
+        self._started = time.perf_counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._started = time.perf_counter()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            for name, step in self.steps:
+                if self.results.get(name, {}).get("status") == "ok":
+                    continue
+                start = time.perf_counter()
+                try:
+                    detail = await loop.run_in_executor(None, step)
+                except Exception as e:
+                    self.results[name] = {"status": "failed", "error": str(e)}
+                    logger.warning(f"Warm-up step {name} failed, retrying in {WARMUP_RETRY_SECONDS:g}s: {str(e)}")
+                    # Later steps depend on the earlier ones
+                    break
+                self.results[name] = {"status": "ok", "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+                if detail is not None:
+                    self.results[name]["detail"] = detail
+            else:
+                self.ready = True
+                self.ready_after_ms = round((time.perf_counter() - self._started) * 1000, 1)
+                logger.info(f"Warm-up finished in {self.ready_after_ms:.0f}ms, service is ready")
+                return
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "starting",
+            "ready_after_ms": self.ready_after_ms,
+            "steps": {name: self.results.get(name, {"status": "pending"}) for name, _ in self.steps},
+        }
@@ -0,0 +1,73 @@
+"""
+Fast JSON responses for the backend services.
+
+FastJSONResponse encodes with orjson when it is installed. orjson handles
+datetimes, dates, UUIDs, enums and dataclasses natively, and Pydantic models,
+Decimals and sets are converted by `_default`. Without orjson it falls back to
+the stdlib encoder with the same conversions.
+
+Services pass it as their app's `default_response_class`, so every JSON
+route is encoded with it. FastAPI still runs a route's returned value through
+`jsonable_encoder` first. That walk rebuilds the whole payload in Python, and
+for large CV payloads it costs more than the encoding itself, so hot routes
+return a FastJSONResponse themselves and their dict goes straight to the
+encoder.
+"""
+import dataclasses
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Convert values the encoder doesn't handle itself, the way jsonable_encoder would."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump() if hasattr(obj, "model_dump") else obj.dict()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, PurePath):
+        return str(obj)
+    # Handled natively by orjson; needed for the stdlib fallback
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        """Encode a value as compact UTF-8 JSON."""
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Encode a value as compact UTF-8 JSON."""
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with `dumps` (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,241 @@
+"""
+Distributed tracing for the backend services (OpenTelemetry, W3C trace context).
+
+setup_tracing(app, service) adds TracingMiddleware. It is plain ASGI, like
+MetricsMiddleware. It continues the trace from an incoming `traceparent`
+header, or starts one, and wraps each request in a SERVER span named after
+its route. The request's `X-Request-ID` is recorded as the `request.id`
+attribute. When the caller didn't send that header, one is generated and
+added to the request, so the service's own request-id logging uses the same
+value.
+
+Inside a request:
+
+- traced_transport() gives httpx clients a transport that opens a CLIENT
+  span per call and sends `traceparent` and `X-Request-ID` on, so calls
+  between services join one trace;
+- instrument_engine(engine) adds a span for every SQL statement;
+- span(name, attributes) wraps any other block: LLM calls, rendering, and
+  so on.
+
+Spans are exported over OTLP/HTTP when OTEL_EXPORTER_OTLP_ENDPOINT (or
+OTEL_EXPORTER_OTLP_TRACES_ENDPOINT) is set, e.g. http://localhost:4318 for
+the collector stand-in in shared/otlp_collector.py. Sampling follows the
+standard OTEL_TRACES_SAMPLER variables. With no endpoint, spans are not
+recorded, but trace context is still passed on, so a trace survives a
+service that isn't exporting. Without the opentelemetry packages every
+helper is a no-op.
+"""
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None
+
+logger = logging.getLogger("shared.tracing")
+
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+# Longer statements are truncated in the db.statement attribute
+MAX_STATEMENT_LENGTH = 2000
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+def current_request_id() -> Optional[str]:
+    """The X-Request-ID of the request being handled, if any."""
+    return _request_id.get()
+
+def _tracer():
+    return trace.get_tracer("candidatev")
+
+def configure_exporter(service: str) -> bool:
+    """Install a tracer provider that exports to the configured OTLP endpoint; returns whether it did."""
+    if trace is None or not OTLP_ENDPOINT:
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTLP endpoint is set but opentelemetry-sdk or the OTLP exporter is not installed")
+        return False
+    resource = Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service)})
+    provider = TracerProvider(resource=resource)
+    # Batching keeps the export off the request path
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return True
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, kind: Any = None) -> Iterator[Any]:
+    """
+    Run a block inside a child span of the current one.
+
+    Exceptions are recorded on the span and re-raised. Yields the span (or
+    None without OpenTelemetry), so results such as token counts can be added
+    as attributes.
+    """
+    if trace is None:
+        yield None
+        return
+    with _tracer().start_as_current_span(name, kind=kind or SpanKind.INTERNAL, attributes=attributes) as current:
+        yield current
+
+def _route(scope: Scope) -> Optional[str]:
+    route = scope.get("route")  # Set by FastAPI's APIRoute
+    return getattr(route, "path_format", None) if route is not None else None
+
+class TracingMiddleware:
+    """ASGI middleware that opens a SERVER span per request, continuing the caller's trace."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        request_id = headers.get("x-request-id")
+        if not request_id:
+            request_id = str(uuid.uuid4())
+            scope["headers"] = [*scope["headers"], (b"x-request-id", request_id.encode("latin-1"))]
+        token = _request_id.set(request_id)
+        if trace is None:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _request_id.reset(token)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_traced(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        attributes = {
+            "http.request.method": method,
+            "url.path": scope["path"],
+            "request.id": request_id,
+        }
+        try:
+            with _tracer().start_as_current_span(
+                method, context=propagate.extract(headers), kind=SpanKind.SERVER, attributes=attributes
+            ) as current:
+                try:
+                    await self.app(scope, receive, send_traced)
+                finally:
+                    route = _route(scope)
+                    if route:
+                        current.update_name(f"{method} {route}")
+                        current.set_attribute("http.route", route)
+                    current.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:
+                        current.set_status(Status(StatusCode.ERROR))
+        finally:
+            _request_id.reset(token)
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """httpx transport that traces each request and propagates trace context and the request id."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request_id = current_request_id()
+        if request_id and REQUEST_ID_HEADER not in request.headers:
+            request.headers[REQUEST_ID_HEADER] = request_id
+        if trace is None:
+            return await self._transport.handle_async_request(request)
+
+        attributes = {
+            "http.request.method": request.method,
+            "server.address": request.url.host,
+            "url.full": str(request.url.copy_with(query=None)),
+        }
+        with span(f"{request.method} {request.url.host}", attributes, kind=SpanKind.CLIENT) as current:
+            carrier: Dict[str, str] = {}
+            propagate.inject(carrier)
+            request.headers.update(carrier)
+            response = await self._transport.handle_async_request(request)
+            current.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 400:
+                current.set_status(Status(StatusCode.ERROR))
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+def traced_transport(**kwargs) -> httpx.AsyncBaseTransport:
+    """A traced AsyncHTTPTransport; pass it as `transport=` to httpx.AsyncClient."""
+    return TracingTransport(httpx.AsyncHTTPTransport(**kwargs))
+
+def instrument_engine(engine) -> None:
+    """Record a CLIENT span for every statement an SQLAlchemy engine executes."""
+    if trace is None:
+        return
+    from sqlalchemy import event
+
+    system = engine.dialect.name
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._trace_span = _tracer().start_span(
+            f"db {statement.split(None, 1)[0].upper() if statement else 'query'}",
+            kind=SpanKind.CLIENT,
+            attributes={"db.system": system, "db.statement": statement[:MAX_STATEMENT_LENGTH]}
+        )
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        current = getattr(context, "_trace_span", None)
+        if current is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                current.set_attribute("db.rows", cursor.rowcount)
+            current.end()
+
+    def handle_error(exception_context):
+        current = getattr(exception_context.execution_context, "_trace_span", None)
+        if current is not None:
+            current.record_exception(exception_context.original_exception)
+            current.set_status(Status(StatusCode.ERROR))
+            current.end()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+def setup_tracing(app: FastAPI, service: str) -> None:
+    """
+    Trace an app's requests and export the spans when an OTLP endpoint is configured.
+
+    Call it after the app's other middleware is added, so the server span
+    covers that middleware too.
+
+    Args:
+        app: The FastAPI application
+        service: The service.name resource attribute (OTEL_SERVICE_NAME overrides it)
+    """
+    app.add_middleware(TracingMiddleware)
+    if trace is None:
+        logger.warning("opentelemetry is not installed - requests keep their X-Request-ID but are not traced")
+    elif configure_exporter(service):
+        logger.info(f"Tracing {service}, exporting spans to {OTLP_ENDPOINT}")
+    else:
+        logger.info(f"Propagating trace context for {service}; set OTEL_EXPORTER_OTLP_ENDPOINT to export spans")
@@ -29,6 +29,16 @@ class BaseConfig:
     POSTGRES_SERVER: str = "localhost"  # Will be overridden by environment
     POSTGRES_PORT: int = 5432
     
+    # Connection pool ("default" or "pgbouncer" for transaction-mode PgBouncer)
+    DB_POOL_PROFILE: str = "default"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_SLOW_CHECKOUT_MS: int = 100
+    DB_MAX_CONNECTIONS: int = 0  # Total budget across workers; 0 uses the pool size above
+    WEB_CONCURRENCY: int = 1
+    
     # Email Settings (non-sensitive)
     SMTP_TLS: bool = True
     SMTP_PORT: int = 587
@@ -34,6 +34,14 @@ class ConfigurationLoader:
         "SMTP_USER",
         "SMTP_PASSWORD",
         "EMAILS_FROM_EMAIL",
+        "DB_POOL_PROFILE",
+        "DB_POOL_SIZE",
+        "DB_MAX_OVERFLOW",
+        "DB_POOL_TIMEOUT",
+        "DB_POOL_RECYCLE",
+        "DB_POOL_SLOW_CHECKOUT_MS",
+        "DB_MAX_CONNECTIONS",
+        "WEB_CONCURRENCY",
     ]
     
     @classmethod